@@ -0,0 +1,121 @@
+from openai import AsyncOpenAI
+from typing import Callable, Dict, Any, List, Optional, Union
+
+from agent.conversation_history import ConversationHistory
+from agent.llm_chat_session import (StreamedAssistantMessage, assistant_message_from_response, routed_turn_messages,
+                                    tool_result_messages, unpack_assistant_message)
+from agent.system_prompt_provider import SystemPromptProvider
+from utils.logger import logger
+from utils.tracing import tracer
+
+
+class AsyncLLMChatSession:
+    """Asyncio counterpart of LLMChatSession built on AsyncOpenAI.
+
+    Requests are awaited instead of blocking, so many sessions can share one event loop
+    and the client's connection pool. Messages, responses and history handling are the
+    same as in LLMChatSession.
+    """
+
+    def __init__(self, system_prompt_provider: SystemPromptProvider, client: AsyncOpenAI, model: str = "gpt-4o",
+                 history: Optional[ConversationHistory] = None, summary_client: Optional[AsyncOpenAI] = None):
+        self.client = client
+        self.model = model
+
+        # Old turns are summarized by a task on the event loop, through `summary_client` when given
+        self.history = history if history is not None else ConversationHistory(
+            system_prompt_provider.get_agent_prompt(), client=summary_client or client)
+
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """Messages sent to the model on the next request."""
+        return self.history.messages
+
+    def add_message_to_history(self, message: Dict[str, Any]) -> None:
+        """Add a message to the conversation history."""
+        self.history.append(message)
+
+    def record_routed_turn(self, message: str, function_name: str, arguments: Dict[str, Any],
+                           result: Dict[str, Any], response: str) -> None:
+        """Record a turn answered without the model; see LLMChatSession.record_routed_turn."""
+        for history_message in routed_turn_messages(message, function_name, arguments, result, response):
+            self.add_message_to_history(history_message)
+
+    async def _create_completion(self, tools: Optional[List[Dict[str, Any]]], max_tokens: int,
+                                 on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Request the next assistant message, streaming content deltas to `on_token` if given."""
+        with tracer.span("llm.chat_completion", model=self.model, stream=on_token is not None) as span:
+            if on_token is None:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self.conversation_history,
+                    tools=tools,
+                    max_tokens=max_tokens
+                )
+                span.record_usage(response.usage)
+                return assistant_message_from_response(response.choices[0].message)
+
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self.conversation_history,
+                tools=tools,
+                max_tokens=max_tokens,
+                stream=True,
+                # Only traced turns need the final usage chunk. The pinned SDK has no stream_options
+                # parameter, so the option goes into the request body directly.
+                extra_body={"stream_options": {"include_usage": True}} if tracer.enabled else None
+            )
+            streamed = StreamedAssistantMessage()
+            async for chunk in stream:
+                token = streamed.add_chunk(chunk)
+                if token:
+                    on_token(token)
+            span.record_usage(streamed.usage)
+            return streamed.to_message()
+
+    async def _complete(self, tools: Optional[List[Dict[str, Any]]], max_tokens: int,
+                        on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
+        assistant_message = await self._create_completion(tools, max_tokens, on_token)
+        self.add_message_to_history(assistant_message)
+        return unpack_assistant_message(assistant_message)
+
+    async def send_user_message(self, message: str, tools: List[Dict[str, Any]] = None, max_tokens: int = 10000,
+                                on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
+        """Generate a response from the AI model with function calling capability.
+
+        Args:
+            message: The user's message
+            max_tokens: Maximum number of tokens in the response
+            on_token: Optional callback that receives response text as it is streamed
+
+        Returns:
+            Either a text response or a {"function_calls": [...]} object
+        """
+        try:
+            self.add_message_to_history({"role": "user", "content": message})
+            return await self._complete(tools, max_tokens, on_token)
+        except Exception as e:
+            logger.error(f"Error in response generation: {e}")
+            return "I apologize, but I'm having trouble generating a response right now."
+
+    async def submit_tool_results(self, tool_results: List[Dict[str, Any]], tools: List[Dict[str, Any]] = None,
+                                  max_tokens: int = 10000,
+                                  on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
+        """Submit the results of every tool call from one assistant message in a single completion.
+
+        Args:
+            tool_results: Dicts with the tool_call_id, function_name and result of each call
+            max_tokens: Maximum number of tokens in the response
+            on_token: Optional callback that receives response text as it is streamed
+
+        Returns:
+            The model's response after receiving the function results, or another
+            function call object if the model needs further tools
+        """
+        try:
+            for tool_message in tool_result_messages(tool_results):
+                self.add_message_to_history(tool_message)
+            return await self._complete(tools, max_tokens, on_token)
+        except Exception as e:
+            logger.error(f"Error in tool result submission: {e}")
+            return "I apologize, but I'm having trouble processing the function result."
@@ -0,0 +1,107 @@
+import asyncio
+from openai import AsyncOpenAI
+from typing import Callable, Optional
+
+from agent.async_llm_chat_session import AsyncLLMChatSession
+from agent.intent_router import IntentRouter
+from agent.speculative_executor import SpeculativeExecutor
+from agent.system_prompt_provider import SystemPromptProvider
+from tools.function_tools import FunctionTools
+from utils.logger import logger
+from utils.tracing import tracer
+
+
+class AsyncSupportAgent:
+    """Asyncio counterpart of SupportAgent.
+
+    Each conversation gets its own agent, while the AsyncOpenAI client, the tools and the
+    stores behind them are shared, so thousands of conversations can run on one event loop.
+    """
+
+    def __init__(self, system_prompt_provider: SystemPromptProvider, function_tools: FunctionTools, openai_client: AsyncOpenAI,
+                 intent_router: Optional[IntentRouter] = None,
+                 speculative_executor: Optional[SpeculativeExecutor] = None,
+                 summary_client: Optional[AsyncOpenAI] = None):
+        """Initialize the conversation manager.
+
+        Args:
+            system_prompt_provider: Source of the agent's system prompt
+            function_tools: Tools the model may call
+            openai_client: Async client shared across conversations
+            intent_router: Optional router answering plain order-status questions without the LLM
+            speculative_executor: Optional executor starting likely tool calls alongside the first completion
+            summary_client: Optional client for background history summaries, defaults to `openai_client`
+        """
+        self.function_tools = function_tools
+        self.intent_router = intent_router
+        self.speculative_executor = speculative_executor
+        self.llm_chat_session = AsyncLLMChatSession(system_prompt_provider=system_prompt_provider, client=openai_client,
+                                                    summary_client=summary_client)
+
+    async def process_message(self, message: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Process a user message, running any requested tools until a user-facing response is received.
+
+        Args:
+            message: The user's message
+            on_token: Optional callback that receives the response text as it is streamed
+
+        Returns:
+            A user-facing response string
+        """
+        with tracer.span("agent.turn"):
+            return await self._process_message(message, on_token)
+
+    async def _process_message(self, message: str, on_token: Optional[Callable[[str], None]]) -> str:
+        speculation = None
+        try:
+            # The routed lookup may hit a disk-backed order store, so it runs on a worker thread
+            # like FunctionTool.execute_async
+            turn = await asyncio.to_thread(self.intent_router.route, message) if self.intent_router is not None else None
+            if turn is not None:
+                self.llm_chat_session.record_routed_turn(message, turn.function_name, turn.arguments, turn.result,
+                                                         turn.response)
+                if on_token is not None:
+                    on_token(turn.response)
+                return turn.response
+
+            if self.speculative_executor is not None:
+                speculation = self.speculative_executor.speculate(message)
+
+            response = await self.llm_chat_session.send_user_message(message=message, tools=self.function_tools.get_available_tools(),
+                                                                      on_token=on_token)
+
+            while isinstance(response, dict) and "function_calls" in response:
+                function_calls = response["function_calls"]
+
+                # Execute every requested function concurrently; failures come back as error results
+                calls = [(call["function_tool"], call["function_arguments"]) for call in function_calls]
+                if self.speculative_executor is not None:
+                    results = await self.speculative_executor.execute_functions_async(speculation, calls)
+                else:
+                    results = await self.function_tools.execute_functions_async(calls)
+
+                response = await self.llm_chat_session.submit_tool_results(
+                    [{"tool_call_id": call["tool_call_id"], "function_name": call["function_tool"], "result": result}
+                     for call, result in zip(function_calls, results)],
+                    tools=self.function_tools.get_available_tools(),
+                    on_token=on_token
+                )
+
+            return response
+
+        except Exception as e:
+            logger.error(f"Error in process_message: {e}")
+            return "I'm sorry, I couldn't process that request. Could you try again?"
+        finally:
+            if self.speculative_executor is not None:
+                self.speculative_executor.finish(speculation)
+
+    async def generate_response(self, instruction: str, max_tokens: int = 100,
+                                on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Generate a simple response without function calling, such as a greeting."""
+        try:
+            return await self.llm_chat_session.send_user_message(f"{instruction.lower()}.", max_tokens=max_tokens,
+                                                                 on_token=on_token)
+        except Exception as e:
+            logger.error(f"Error in generate_response: {e}")
+            return "Welcome to Sierra Outfitters! How can I help you today?"
@@ -0,0 +1,227 @@
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+
+from openai import AsyncOpenAI, OpenAI
+
+from utils.logger import logger
+from utils.token_estimator import CHARS_PER_TOKEN, estimate_message_tokens, estimate_tokens
+from utils.tracing import run_in_context, tracer
+
+# Summaries from sync clients are requested here, off the request path
+_summary_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="history-summary")
+
+
+class ConversationHistory:
+    """Chat history kept under a prompt token budget.
+
+    Token counts are estimated once per message as it is appended. When the running total
+    crosses `max_prompt_tokens`, the history is compacted in two steps:
+        1. Tool results outside the most recent turns are replaced by a short placeholder
+        2. The oldest whole turns are rolled into a running summary message
+
+    Turns always start at a user message, so an assistant tool call and its tool results
+    are either kept together or summarized together, and the message sequence sent to the
+    API stays valid.
+
+    Summarizing never blocks `append`: the summarized turns are first condensed into a
+    transcript excerpt, and when a client is given, an LLM summary requested in the
+    background replaces the excerpt once it arrives. Sync clients are called from a worker
+    thread, async clients from a task on the running event loop.
+    """
+
+    SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+    ELIDED_TOOL_RESULT = "[Earlier tool result removed to save space]"
+
+    def __init__(self, system_prompt: str, client: Optional[Union[OpenAI, AsyncOpenAI]] = None,
+                 summary_model: str = "gpt-4o-mini",
+                 max_prompt_tokens: int = 16000, keep_recent_turns: int = 2, max_tool_result_tokens: int = 2000,
+                 max_summary_tokens: int = 400):
+        """Initialize the history.
+
+        Args:
+            system_prompt: System message that always leads the prompt
+            client: OpenAI or AsyncOpenAI client used to summarize old turns, typically bound
+                to the scheduler's "background" priority. Without one, old turns are only
+                condensed into a plain transcript excerpt.
+            summary_model: Model used for summarization
+            max_prompt_tokens: Budget for the whole prompt; compaction starts when it is crossed
+            keep_recent_turns: Number of latest turns whose tool results are never elided
+            max_tool_result_tokens: Tool results larger than this are truncated as they are added
+            max_summary_tokens: Upper bound on the size of the running summary
+        """
+        self.client = client
+        self.summary_model = summary_model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.max_tool_result_tokens = max_tool_result_tokens
+        self.max_summary_tokens = max_summary_tokens
+
+        self._system_message = {"role": "system", "content": system_prompt}
+        self._system_tokens = estimate_message_tokens(self._system_message)
+        self._summary: Optional[str] = None
+        self._summary_tokens = 0
+        # Messages after the summary, with their token estimates kept alongside
+        self._messages: List[Dict[str, Any]] = []
+        self._message_tokens: List[int] = []
+        self._total_tokens = self._system_tokens
+        # Bumped on every compaction, so a background summary of older turns is discarded
+        self._summary_generation = 0
+        self._pending_summary: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """Messages to send to the model: system prompt, running summary, then recent turns."""
+        with self._lock:
+            messages = [self._system_message]
+            if self._summary:
+                messages.append({"role": "system", "content": self.SUMMARY_PREFIX + self._summary})
+            return messages + self._messages
+
+    @property
+    def token_count(self) -> int:
+        """Estimated prompt tokens of `messages`."""
+        return self._total_tokens
+
+    def append(self, message: Dict[str, Any]) -> None:
+        """Add a message, compacting older history if the token budget is exceeded."""
+        if message.get("role") == "tool":
+            message = self._truncate_tool_result(message)
+        tokens = estimate_message_tokens(message)
+        with self._lock:
+            self._messages.append(message)
+            self._message_tokens.append(tokens)
+            self._total_tokens += tokens
+
+            if self._total_tokens > self.max_prompt_tokens:
+                self._compact()
+
+    def _truncate_tool_result(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        content = message.get("content") or ""
+        if estimate_tokens(content) <= self.max_tool_result_tokens:
+            return message
+        limit = self.max_tool_result_tokens * CHARS_PER_TOKEN
+        return {**message, "content": content[:limit] + "... [truncated]"}
+
+    def _turn_starts(self) -> List[int]:
+        return [index for index, message in enumerate(self._messages) if message.get("role") == "user"]
+
+    def _set_message(self, index: int, message: Dict[str, Any]) -> None:
+        tokens = estimate_message_tokens(message)
+        self._total_tokens += tokens - self._message_tokens[index]
+        self._messages[index] = message
+        self._message_tokens[index] = tokens
+
+    def _compact(self) -> None:
+        turn_starts = self._turn_starts()
+        if self.keep_recent_turns <= 0:
+            recent_start = len(self._messages)
+        else:
+            recent_start = turn_starts[-self.keep_recent_turns] if len(turn_starts) >= self.keep_recent_turns else 0
+
+        # Step 1: elide old tool payloads, keeping the messages so tool call ids still pair up
+        for index in range(recent_start):
+            message = self._messages[index]
+            if message.get("role") == "tool" and message.get("content") != self.ELIDED_TOOL_RESULT:
+                self._set_message(index, {**message, "content": self.ELIDED_TOOL_RESULT})
+        if self._total_tokens <= self.max_prompt_tokens:
+            return
+
+        # Step 2: summarize whole turns, oldest first, always keeping the latest turn verbatim
+        cut = 0
+        remaining = self._total_tokens
+        for start in turn_starts[1:]:
+            if remaining <= self.max_prompt_tokens:
+                break
+            remaining -= sum(self._message_tokens[cut:start])
+            cut = start
+        if cut == 0:
+            return
+
+        transcript = self._transcript(self._messages[:cut])
+        if self._summary:
+            transcript = f"{self.SUMMARY_PREFIX}{self._summary}\n\n{transcript}"
+        self._total_tokens -= sum(self._message_tokens[:cut])
+        del self._messages[:cut]
+        del self._message_tokens[:cut]
+        self._set_summary(self._excerpt(transcript))
+        self._summary_generation += 1
+        if self.client is not None:
+            self._request_summary(self._summary_generation, transcript)
+
+    def _set_summary(self, summary: str) -> None:
+        tokens = estimate_message_tokens({"role": "system", "content": self.SUMMARY_PREFIX + summary})
+        self._total_tokens += tokens - self._summary_tokens
+        self._summary = summary
+        self._summary_tokens = tokens
+
+    @staticmethod
+    def _transcript(messages: List[Dict[str, Any]]) -> str:
+        lines = []
+        for message in messages:
+            role = message.get("role")
+            if role == "tool":
+                lines.append(f"tool {message.get('name', '')}: {message.get('content', '')}")
+            elif message.get("content"):
+                lines.append(f"{role}: {message['content']}")
+            for tool_call in message.get("tool_calls") or []:
+                function = tool_call.get("function", {})
+                lines.append(f"{role} called {function.get('name')}({function.get('arguments')})")
+        return "\n".join(lines)
+
+    def _excerpt(self, transcript: str) -> str:
+        # Keep the most recent part of the transcript within the summary budget
+        limit = self.max_summary_tokens * CHARS_PER_TOKEN
+        return transcript if len(transcript) <= limit else "..." + transcript[-limit:]
+
+    def _summary_request(self, transcript: str) -> Dict[str, Any]:
+        return {
+            "model": self.summary_model,
+            "messages": [
+                {"role": "system", "content": "Summarize this customer support conversation for the agent "
+                                              "continuing it. Keep customer names, emails, order numbers, "
+                                              "products discussed and any unresolved requests. Be brief."},
+                {"role": "user", "content": transcript},
+            ],
+            "max_tokens": self.max_summary_tokens,
+        }
+
+    def _request_summary(self, generation: int, transcript: str) -> None:
+        create = self.client.chat.completions.create
+        # SDK methods are wrapped by plain decorators, so look through to the coroutine function
+        if inspect.iscoroutinefunction(create) or inspect.iscoroutinefunction(getattr(create, "__wrapped__", None)):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                logger.error("No running event loop to summarize conversation history, keeping the excerpt")
+                return
+            self._pending_summary = loop.create_task(self._summarize_async(generation, transcript))
+        else:
+            self._pending_summary = _summary_pool.submit(run_in_context(self._summarize), generation, transcript)
+
+    def _summarize(self, generation: int, transcript: str) -> None:
+        try:
+            with tracer.span("llm.summary", model=self.summary_model) as span:
+                response = self.client.chat.completions.create(**self._summary_request(transcript))
+                span.record_usage(response.usage)
+            self._apply_summary(generation, response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error summarizing conversation history: {e}")
+
+    async def _summarize_async(self, generation: int, transcript: str) -> None:
+        try:
+            with tracer.span("llm.summary", model=self.summary_model) as span:
+                response = await self.client.chat.completions.create(**self._summary_request(transcript))
+                span.record_usage(response.usage)
+            self._apply_summary(generation, response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error summarizing conversation history: {e}")
+
+    def _apply_summary(self, generation: int, summary: Optional[str]) -> None:
+        with self._lock:
+            # A later compaction already folded these turns into a newer summary
+            if summary and generation == self._summary_generation:
+                self._set_summary(summary.strip())
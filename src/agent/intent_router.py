@@ -0,0 +1,129 @@
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from tools.function_tools import FunctionTools
+from utils.logger import logger
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+ORDER_NUMBER_PATTERN = re.compile(r"(?<![A-Za-z0-9])#?\s?([Ww]\d{3,})\b")
+SENTENCE_PATTERN = re.compile(r"[^.?!;\n]+[.?!;\n]*")
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+# Words that make a sentence ask about an order's progress
+ORDER_STATUS_WORDS = frozenset((
+    "status", "where", "shipped", "ship", "shipping", "shipment", "track", "tracking", "deliver", "delivered",
+    "delivery", "arrive", "arrived", "arriving"))
+# Every word of a routed message must come from this list, so any other request keeps it with the model
+ALLOWED_WORDS = ORDER_STATUS_WORDS | frozenset((
+    "hi", "hello", "hey", "there", "good", "morning", "afternoon", "evening", "please", "thanks", "thank", "you",
+    "much", "so", "i", "i'm", "im", "my", "me", "can", "could", "would", "will", "check", "tell", "let", "know",
+    "find", "look", "up", "see", "what", "what's", "whats", "when", "where's", "is", "it", "it's", "its", "has",
+    "have", "been", "did", "does", "do", "the", "a", "an", "of", "on", "for", "to", "with", "under", "and", "yet",
+    "order", "orders", "number", "package", "parcel", "email", "address", "placed", "current", "currently"))
+
+
+def _is_plain_status_question(text: str) -> bool:
+    """Whether `text`, with its email and order number removed, only asks for an order's status.
+
+    It must use nothing but allowlisted words, and only one of its sentences may ask
+    something: greetings, thanks and "my email is ..." may surround the question.
+    """
+    question_sentences = 0
+    for sentence in SENTENCE_PATTERN.findall(text):
+        words = WORD_PATTERN.findall(sentence.lower())
+        if any(word not in ALLOWED_WORDS for word in words):
+            return False
+        if sentence.rstrip().endswith("?") or ORDER_STATUS_WORDS.intersection(words):
+            question_sentences += 1
+    return question_sentences == 1
+
+
+class RoutedTurn:
+    """A turn answered without the LLM: the tool call that was made and the reply sent."""
+
+    def __init__(self, function_name: str, arguments: Dict[str, Any], result: Dict[str, Any], response: str):
+        self.function_name = function_name
+        self.arguments = arguments
+        self.result = result
+        self.response = response
+
+
+class IntentRouter:
+    """Answers plain order-status questions directly, before any model call.
+
+    A message is routed only when the whole of it is a status question: exactly one email
+    address and one order number, phrased only with allowlisted words, and no second
+    question. The order is looked up through the `lookup_order` tool and the reply comes
+    from a template, including when no such order exists. Everything else, and a lookup
+    that fails with an error, returns None and goes to the LLM as usual.
+    """
+
+    MAX_MESSAGE_LENGTH = 300
+
+    STATUS_TEMPLATES = {
+        "delivered": "Your order {order_number} has been delivered! 🏕️ {tracking}I hope it's already out on the trail with you.",
+        "in-transit": "Your order {order_number} is on its way! 🏔️ {tracking}Gear Up, Go Further!",
+        "fulfilled": "Your order {order_number} has been packed and is getting ready to ship. 🏕️ {tracking}Onward into the unknown!",
+        "error": "There was a problem processing your order {order_number}. 🏔️ {tracking}Please reply here and we'll blaze a trail to sort it out.",
+    }
+    DEFAULT_TEMPLATE = "Your order {order_number} is currently **{status}**. 🏔️ {tracking}"
+    NOT_FOUND_TEMPLATE = ("I couldn't find an order {order_number} for {email}. 🏔️ Could you double-check the order "
+                          "number (it looks like #W001) and the email address used at checkout?")
+
+    def __init__(self, function_tools: FunctionTools):
+        self.function_tools = function_tools
+        self._lock = threading.Lock()
+        self._stats = {"routed": 0, "fallback": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    @classmethod
+    def extract_order_query(cls, message: str) -> Optional[Dict[str, str]]:
+        """Email and order number of an unambiguous order-status message, or None."""
+        if len(message) > cls.MAX_MESSAGE_LENGTH:
+            return None
+        emails = set(email.lower() for email in EMAIL_PATTERN.findall(message))
+        # Remove emails first so an address such as w001@example.com is not read as an order number
+        without_emails = EMAIL_PATTERN.sub(" ", message)
+        order_numbers = set(number.upper() for number in ORDER_NUMBER_PATTERN.findall(without_emails))
+        if len(emails) != 1 or len(order_numbers) != 1:
+            return None
+        if not _is_plain_status_question(ORDER_NUMBER_PATTERN.sub(" ", without_emails)):
+            return None
+        return {"email": emails.pop(), "order_number": f"#{order_numbers.pop()}"}
+
+    def _render(self, arguments: Dict[str, str], result: Dict[str, Any]) -> str:
+        if not result.get("found"):
+            return self.NOT_FOUND_TEMPLATE.format(**arguments)
+        order = result["order"]
+        tracking = ""
+        if order.get("TrackingLink"):
+            tracking = f"You can follow it here: {order['TrackingLink']} "
+        status = order.get("Status") or "unknown"
+        template = self.STATUS_TEMPLATES.get(status, self.DEFAULT_TEMPLATE)
+        return template.format(order_number=order.get("OrderNumber") or arguments["order_number"],
+                               status=status, tracking=tracking).strip()
+
+    def route(self, message: str) -> Optional[RoutedTurn]:
+        """Answer `message` directly if it is a plain order-status question, else None."""
+        arguments = self.extract_order_query(message)
+        if arguments is None:
+            self._count("fallback")
+            return None
+        try:
+            result = self.function_tools.execute_function("lookup_order", arguments)
+        except Exception as e:
+            logger.error(f"Error in routed order lookup, falling back to the LLM: {e}")
+            self._count("fallback")
+            return None
+        if "error" in result:
+            self._count("fallback")
+            return None
+        self._count("routed")
+        return RoutedTurn("lookup_order", arguments, result, self._render(arguments, result))
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
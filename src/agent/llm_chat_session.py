@@ -1,115 +1,246 @@
 import json
+import uuid
 from openai import OpenAI
-from typing import Dict, Any, List, Union
+from typing import Callable, Dict, Any, List, Optional, Union
 
+from agent.conversation_history import ConversationHistory
 from agent.system_prompt_provider import SystemPromptProvider
 from utils.logger import logger
+from utils.tracing import tracer
+
+
+def assistant_message_from_response(response_message: Any) -> Dict[str, Any]:
+    """History entry for a non-streamed assistant message."""
+    assistant_message = {"role": "assistant", "content": response_message.content or ""}
+    if getattr(response_message, "tool_calls", None):
+        # Plain dicts so the history can measure and summarize tool calls
+        assistant_message["tool_calls"] = [tool_call.model_dump() for tool_call in response_message.tool_calls]
+    return assistant_message
+
+
+class StreamedAssistantMessage:
+    """Assembles an assistant message from streamed completion chunks."""
+
+    def __init__(self):
+        self._content_parts: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, Any]] = {}
+        # Sent in a final chunk without choices when the request asks for it
+        self.usage: Any = None
+
+    def add_chunk(self, chunk: Any) -> Optional[str]:
+        """Fold one chunk into the message, returning its content delta if it has one."""
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        # Tool calls arrive in fragments: the id and name first, then the arguments in pieces
+        for fragment in delta.tool_calls or []:
+            tool_call = self._tool_calls.setdefault(fragment.index, {
+                "id": None, "type": "function", "function": {"name": "", "arguments": ""}
+            })
+            if fragment.id:
+                tool_call["id"] = fragment.id
+            if fragment.function is not None:
+                if fragment.function.name:
+                    tool_call["function"]["name"] += fragment.function.name
+                if fragment.function.arguments:
+                    tool_call["function"]["arguments"] += fragment.function.arguments
+        if delta.content:
+            self._content_parts.append(delta.content)
+            return delta.content
+        return None
+
+    def to_message(self) -> Dict[str, Any]:
+        assistant_message = {"role": "assistant", "content": "".join(self._content_parts)}
+        if self._tool_calls:
+            assistant_message["tool_calls"] = [self._tool_calls[index] for index in sorted(self._tool_calls)]
+        return assistant_message
+
+
+def unpack_assistant_message(assistant_message: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    """Text reply, or a {"function_calls": [...]} object when the model requested tools."""
+    # Check if the model wants to call functions, it may request several at once
+    if assistant_message.get("tool_calls"):
+        return {
+            "function_calls": [{
+                "function_tool": tool_call["function"]["name"],
+                "function_arguments": json.loads(tool_call["function"]["arguments"] or "{}"),
+                "tool_call_id": tool_call["id"]
+            } for tool_call in assistant_message["tool_calls"]]
+        }
+    
+    # If no function call, return the text response
+    return assistant_message["content"].strip()
+
+
+def tool_result_messages(tool_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """History entries for tool results, the API requires one per tool call."""
+    return [{
+        "role": "tool",
+        "tool_call_id": tool_result["tool_call_id"],
+        "name": tool_result["function_name"],
+        "content": json.dumps(tool_result["result"])
+    } for tool_result in tool_results]
+
+
+def routed_turn_messages(message: str, function_name: str, arguments: Dict[str, Any], result: Dict[str, Any],
+                         response: str) -> List[Dict[str, Any]]:
+    """History entries for a turn answered without the model: user message, tool call, tool result and reply."""
+    tool_call_id = f"call_routed_{uuid.uuid4().hex[:24]}"
+    return [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": "",
+         "tool_calls": [{"id": tool_call_id, "type": "function",
+                         "function": {"name": function_name, "arguments": json.dumps(arguments)}}]},
+        *tool_result_messages([{"tool_call_id": tool_call_id, "function_name": function_name, "result": result}]),
+        {"role": "assistant", "content": response},
+    ]
+
 
 class LLMChatSession:
 
-    def __init__(self, system_prompt_provider: SystemPromptProvider, client: OpenAI, model: str = "gpt-4o"):
+    def __init__(self, system_prompt_provider: SystemPromptProvider, client: OpenAI, model: str = "gpt-4o",
+                 history: Optional[ConversationHistory] = None, summary_client: Optional[OpenAI] = None):
         # Initialize OpenAI client
         self.client = client
         self.model = model
         
-        # Initialize conversation history with system message
-        self.conversation_history = [
-            {"role": "system", "content": system_prompt_provider.get_agent_prompt()}
-        ]
+        # Initialize conversation history with system message; old turns are compacted to stay under a token budget
+        # and summarized in the background, through `summary_client` when given
+        self.history = history if history is not None else ConversationHistory(
+            system_prompt_provider.get_agent_prompt(), client=summary_client or client)
+
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """Messages sent to the model on the next request."""
+        return self.history.messages
 
     def add_message_to_history(self, message: Dict[str, Any]) -> None:
         """Add a message to the conversation history."""
+        self.history.append(message)
+
+    def record_routed_turn(self, message: str, function_name: str, arguments: Dict[str, Any],
+                           result: Dict[str, Any], response: str) -> None:
+        """Record a turn answered without the model, as if the model had made the tool call itself.
 
-        #GPT-4o: Supports up to 128,000 tokens, we need to compresss the chat history in future implementation to keep it within the limit
-        self.conversation_history.append(message)
+        Keeping the user message, tool call, tool result and reply in history lets later
+        turns refer back to it.
+        """
+        for history_message in routed_turn_messages(message, function_name, arguments, result, response):
+            self.add_message_to_history(history_message)
     
-    def send_user_message(self, message: str, tools: List[Dict[str, Any]] = None, max_tokens: int = 10000) -> Union[str, Dict[str, Any]]:
+    def _create_completion(self, tools: Optional[List[Dict[str, Any]]], max_tokens: int,
+                           on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Request the next assistant message for the current history.
+
+        With `on_token`, the completion is streamed: each content delta is passed to
+        `on_token` as it arrives, and tool call fragments are assembled by their index.
+
+        Returns:
+            The assistant message as a dict, with "tool_calls" only when the model made any
+        """
+        with tracer.span("llm.chat_completion", model=self.model, stream=on_token is not None) as span:
+            if on_token is None:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self.conversation_history,
+                    tools=tools,
+                    max_tokens=max_tokens
+                )
+                span.record_usage(response.usage)
+                return assistant_message_from_response(response.choices[0].message)
+
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=self.conversation_history,
+                tools=tools,
+                max_tokens=max_tokens,
+                stream=True,
+                # Only traced turns need the final usage chunk. The pinned SDK has no stream_options
+                # parameter, so the option goes into the request body directly.
+                extra_body={"stream_options": {"include_usage": True}} if tracer.enabled else None
+            )
+            streamed = StreamedAssistantMessage()
+            for chunk in stream:
+                token = streamed.add_chunk(chunk)
+                if token:
+                    on_token(token)
+            span.record_usage(streamed.usage)
+            return streamed.to_message()
+
+    def _complete(self, tools: Optional[List[Dict[str, Any]]], max_tokens: int,
+                  on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
+        """Get the next assistant message, record it in history and unpack it for the caller."""
+        assistant_message = self._create_completion(tools, max_tokens, on_token)
+        
+        # Add the assistant's response to history
+        self.add_message_to_history(assistant_message)
+        
+        return unpack_assistant_message(assistant_message)
+
+    def send_user_message(self, message: str, tools: List[Dict[str, Any]] = None, max_tokens: int = 10000,
+                          on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
         """Generate a response from the AI model with function calling capability.
         
         Args:
             prompt: The user's message
             max_tokens: Maximum number of tokens in the response
+            on_token: Optional callback that receives response text as it is streamed
             
         Returns:
-            Either a text response or a function call object
+            Either a text response or a {"function_calls": [...]} object listing every
+            requested call with its function_tool, function_arguments and tool_call_id
         """
         try:
             # Add the user message to history
             self.add_message_to_history({"role": "user", "content": message})
             
             # Call the model with tools defined
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                tools=tools,
-                max_tokens=max_tokens
-            )
-            
-            # Get the response message
-            response_message = response.choices[0].message
-            
-            # Add the assistant's response to history
-            self.add_message_to_history({
-                "role": "assistant",
-                "content": response_message.content or "",
-                "tool_calls": response_message.tool_calls if hasattr(response_message, "tool_calls") else None
-            })
-            
-            # Check if the model wants to call a function
-            if hasattr(response_message, "tool_calls") and response_message.tool_calls:
-                tool_call = response_message.tool_calls[0]
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                
-                return {
-                    "function_tool": function_name,
-                    "function_arguments": function_args,
-                    "tool_call_id": tool_call.id
-                }
-            
-            # If no function call, return the text response
-            return response_message.content.strip() if response_message.content else ""
+            return self._complete(tools, max_tokens, on_token)
             
         except Exception as e:
             logger.error(f"Error in response generation: {e}")
             return "I apologize, but I'm having trouble generating a response right now."
     
-    def submit_tool_result(self, tool_call_id: str, function_name: str, result: Dict[str, Any], tools: List[Dict[str, Any]] = None,max_tokens: int = 10000) -> str:
-        """Submit the result of a tool call back to the model.
+    def submit_tool_result(self, tool_call_id: str, function_name: str, result: Dict[str, Any], tools: List[Dict[str, Any]] = None,max_tokens: int = 10000,
+                           on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
+        """Submit the result of a single tool call back to the model.
         
         Args:
             tool_call_id: The ID of the tool call
             function_name: The name of the function that was called
             result: The result of the function call
             max_tokens: Maximum number of tokens in the response
+            on_token: Optional callback that receives response text as it is streamed
             
         Returns:
-            The model's response after receiving the function result
+            The model's response after receiving the function result, or another
+            function call object if the model needs further tools
         """
-        try:
-            # Add the function result to history
-            self.add_message_to_history({
-                "role": "tool",
-                "tool_call_id": tool_call_id,
-                "name": function_name,
-                "content": json.dumps(result)
-            })
-            
-            # Get the model's response to the function result
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                tools=tools,
-                max_tokens=max_tokens
-            )
-            
-            # Extract the response text
-            response_text = response.choices[0].message.content.strip() if response.choices[0].message.content else ""
+        return self.submit_tool_results([{"tool_call_id": tool_call_id, "function_name": function_name, "result": result}],
+                                        tools=tools, max_tokens=max_tokens, on_token=on_token)
+
+    def submit_tool_results(self, tool_results: List[Dict[str, Any]], tools: List[Dict[str, Any]] = None, max_tokens: int = 10000,
+                            on_token: Optional[Callable[[str], None]] = None) -> Union[str, Dict[str, Any]]:
+        """Submit the results of every tool call from one assistant message in a single completion.
+        
+        Args:
+            tool_results: Dicts with the tool_call_id, function_name and result of each call
+            max_tokens: Maximum number of tokens in the response
+            on_token: Optional callback that receives response text as it is streamed
             
-            # Add the assistant's response to history
-            self.add_message_to_history({"role": "assistant", "content": response_text})
+        Returns:
+            The model's response after receiving the function results, or another
+            function call object if the model needs further tools
+        """
+        try:
+            # Add the function results to history
+            for tool_message in tool_result_messages(tool_results):
+                self.add_message_to_history(tool_message)
             
-            return response_text
+            # Get the model's response to the function results
+            return self._complete(tools, max_tokens, on_token)
             
         except Exception as e:
             logger.error(f"Error in tool result submission: {e}")
@@ -0,0 +1,123 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from agent.support_agent import SupportAgent
+from utils.logger import logger
+
+
+class _Session:
+    """One customer conversation: its agent plus the lock serializing its turns."""
+
+    def __init__(self, agent: SupportAgent):
+        self.agent = agent
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionRegistry:
+    """Maps session IDs to per-conversation agents.
+
+    Agents are created by `agent_factory`, so every session shares the stores and tools
+    behind it while keeping its own chat history. Turns within a session run one at a
+    time; different sessions run in parallel. Sessions idle for longer than
+    `idle_timeout` seconds are evicted, and when `max_sessions` is reached the least
+    recently used idle session makes room for the new one.
+    """
+
+    def __init__(self, agent_factory: Callable[[], SupportAgent], idle_timeout: float = 1800.0,
+                 max_sessions: int = 10000):
+        self.agent_factory = agent_factory
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "closed": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def create(self) -> str:
+        """Start a new conversation and return its session ID."""
+        # Building the agent is independent of the registry, so do it outside the lock
+        session = _Session(self.agent_factory())
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict_idle_locked()
+            while len(self._sessions) >= self.max_sessions and self._evict_oldest_locked():
+                pass
+            if len(self._sessions) >= self.max_sessions:
+                logger.error(f"Session limit of {self.max_sessions} reached, every session is busy")
+                raise RuntimeError("Too many active sessions")
+            self._sessions[session_id] = session
+            self._stats["created"] += 1
+        return session_id
+
+    def _get(self, session_id: str) -> Optional[_Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_used > self.idle_timeout and not session.lock.locked():
+                del self._sessions[session_id]
+                self._stats["evicted"] += 1
+                return None
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def __contains__(self, session_id: str) -> bool:
+        return self._get(session_id) is not None
+
+    def process_message(self, session_id: str, message: str,
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Run one turn of a conversation.
+
+        Returns:
+            The agent's response, or None if the session does not exist or has expired
+        """
+        session = self._get(session_id)
+        if session is None:
+            return None
+        with session.lock:
+            try:
+                return session.agent.process_message(message, on_token=on_token)
+            finally:
+                session.last_used = time.monotonic()
+
+    def close(self, session_id: str) -> bool:
+        """End a conversation, returning False if it did not exist."""
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                return False
+            self._stats["closed"] += 1
+            return True
+
+    def evict_idle(self) -> int:
+        """Drop every session idle for longer than `idle_timeout`, returning how many were dropped."""
+        with self._lock:
+            return self._evict_idle_locked()
+
+    def _evict_idle_locked(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [session_id for session_id, session in self._sessions.items()
+                   if session.last_used < cutoff and not session.lock.locked()]
+        for session_id in expired:
+            del self._sessions[session_id]
+        self._stats["evicted"] += len(expired)
+        return len(expired)
+
+    def _evict_oldest_locked(self) -> bool:
+        for session_id, session in self._sessions.items():
+            if not session.lock.locked():
+                del self._sessions[session_id]
+                self._stats["evicted"] += 1
+                return True
+        return False
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "active": len(self._sessions), "max_sessions": self.max_sessions}
@@ -0,0 +1,167 @@
+import asyncio
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.intent_router import EMAIL_PATTERN, ORDER_NUMBER_PATTERN
+from store.order_backend import normalize_email, normalize_order_number
+from store.product_embedding_store import ProductEmbeddingStore
+from store.query_embedding_cache import normalize_query
+from tools.function_tools import FunctionTools
+from utils.logger import logger
+from utils.tracing import run_in_context
+
+# Phrasing that usually makes the model call recommend_product; the captured text is the likely preference
+PREFERENCE_PATTERN = re.compile(
+    r"\b(?:recommend|suggest|looking for|shopping for|in the market for|need (?=a |an |some |new ))"
+    r"\s*(?:me\s+)?(?:some\s+|a\s+|an\s+)?([^.?!\n]{3,120})",
+    re.IGNORECASE)
+MAX_SPECULATIVE_LOOKUPS = 3
+
+
+class Speculation:
+    """Tool work started for one user message before the model asked for it."""
+
+    def __init__(self):
+        # (email, order number) -> pending lookup_order result
+        self.lookups: Dict[Tuple[str, str], Future] = {}
+        # normalized preference -> pending query embedding
+        self.embeddings: Dict[str, Future] = {}
+        self.claimed = set()
+
+    def __len__(self) -> int:
+        return len(self.lookups) + len(self.embeddings)
+
+
+class SpeculativeExecutor:
+    """Starts likely tool work while the first completion of a turn is still running.
+
+    When the user message already holds what a tool needs, the work starts right away:
+    an email plus order numbers triggers `lookup_order`, and product-preference phrasing
+    pre-computes the query embedding `recommend_product` will search with. When the model
+    then asks for the same call, the precomputed result is handed back instead of running
+    the tool again. Work the model never asks for is discarded and counted as wasted.
+    """
+
+    def __init__(self, function_tools: FunctionTools, product_embedding_store: Optional[ProductEmbeddingStore] = None,
+                 max_workers: int = 4):
+        self.function_tools = function_tools
+        self.product_embedding_store = product_embedding_store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-tool")
+        self._lock = threading.Lock()
+        self._stats = {"speculations": 0, "hits": 0, "wasted": 0}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    @staticmethod
+    def _lookup_key(arguments: Dict[str, Any]) -> Tuple[str, str]:
+        return normalize_email(arguments.get("email", "")), normalize_order_number(arguments.get("order_number", ""))
+
+    def speculate(self, message: str) -> Speculation:
+        """Start the tool work `message` is likely to need; returns immediately."""
+        speculation = Speculation()
+        emails = set(normalize_email(email) for email in EMAIL_PATTERN.findall(message))
+        order_numbers = set(normalize_order_number(number)
+                            for number in ORDER_NUMBER_PATTERN.findall(EMAIL_PATTERN.sub(" ", message)))
+        if len(emails) == 1 and 0 < len(order_numbers) <= MAX_SPECULATIVE_LOOKUPS:
+            email = emails.pop()
+            for order_number in order_numbers:
+                arguments = {"email": email, "order_number": order_number}
+                speculation.lookups[(email, order_number)] = self._executor.submit(
+                    run_in_context(self.function_tools.execute_function), "lookup_order", arguments)
+
+        match = PREFERENCE_PATTERN.search(message) if self.product_embedding_store is not None else None
+        if match:
+            preference = normalize_query(match.group(1))
+            speculation.embeddings[preference] = self._executor.submit(
+                run_in_context(self.product_embedding_store.prefetch_query_embedding), preference)
+
+        self._count("speculations", len(speculation))
+        return speculation
+
+    def _claim(self, speculation: Speculation, function_name: str,
+               arguments: Dict[str, Any]) -> Optional[Tuple[str, Future]]:
+        """The unclaimed speculative work matching this call, if any, as ("lookup" or "embedding", future)."""
+        if function_name == "lookup_order":
+            kind, key = "lookup", self._lookup_key(arguments)
+            future = speculation.lookups.get(key)
+        elif function_name == "recommend_product":
+            kind, key = "embedding", normalize_query(str(arguments.get("preferences", "")))
+            future = speculation.embeddings.get(key)
+        else:
+            return None
+        if future is None or (kind, key) in speculation.claimed:
+            return None
+        speculation.claimed.add((kind, key))
+        return kind, future
+
+    def _reuse(self, kind: str, future: Future, function_name: str) -> Optional[Dict[str, Any]]:
+        """Wait for claimed work, returning the result to use in place of the call or None to run the tool.
+
+        A prefetched embedding only returns None: the tool then runs as usual and finds its
+        query embedding in the cache. Either way, the work counts as a hit only if it succeeded.
+        """
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Speculative {function_name} failed, running it again: {e}")
+            return None
+        self._count("hits")
+        return result if kind == "lookup" else None
+
+    def execute_functions(self, speculation: Optional[Speculation],
+                          calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Like `FunctionTools.execute_functions`, reusing speculative results that match a call."""
+        if not speculation:
+            return self.function_tools.execute_functions(calls)
+        results: List[Optional[Dict[str, Any]]] = []
+        for name, arguments in calls:
+            claim = self._claim(speculation, name, arguments)
+            results.append(self._reuse(*claim, name) if claim is not None else None)
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if remaining:
+            for i, result in zip(remaining, self.function_tools.execute_functions([calls[i] for i in remaining])):
+                results[i] = result
+        return results
+
+    async def execute_functions_async(self, speculation: Optional[Speculation],
+                                      calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Async variant of `execute_functions`."""
+        if not speculation:
+            return await self.function_tools.execute_functions_async(calls)
+        results: List[Optional[Dict[str, Any]]] = []
+        for name, arguments in calls:
+            claim = self._claim(speculation, name, arguments)
+            if claim is None:
+                results.append(None)
+                continue
+            # Wait on the event loop; once done, _reuse reads the outcome without blocking
+            await asyncio.wait([asyncio.wrap_future(claim[1])])
+            results.append(self._reuse(*claim, name))
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if remaining:
+            computed = await self.function_tools.execute_functions_async([calls[i] for i in remaining])
+            for i, result in zip(remaining, computed):
+                results[i] = result
+        return results
+
+    def finish(self, speculation: Optional[Speculation]) -> None:
+        """Discard unclaimed work of a finished turn and count it as wasted."""
+        if not speculation:
+            return
+        wasted = 0
+        for kind, pending in (("lookup", speculation.lookups), ("embedding", speculation.embeddings)):
+            for key, future in pending.items():
+                if (kind, key) not in speculation.claimed:
+                    future.cancel()
+                    wasted += 1
+        self._count("wasted", wasted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["speculations"] if stats["speculations"] else 0.0
+        return stats
@@ -1,24 +1,37 @@
 from openai import OpenAI
+from agent.intent_router import IntentRouter
 from agent.llm_chat_session import LLMChatSession
+from agent.speculative_executor import SpeculativeExecutor
 from tools.function_tools import FunctionTools
 from agent.system_prompt_provider import SystemPromptProvider
+from typing import Callable, Optional
 from utils.logger import logger
+from utils.tracing import tracer
 
 class SupportAgent:
     
-    def __init__(self, system_prompt_provider: SystemPromptProvider, function_tools: FunctionTools, openai_client: OpenAI):
+    def __init__(self, system_prompt_provider: SystemPromptProvider, function_tools: FunctionTools, openai_client: OpenAI,
+                 intent_router: Optional[IntentRouter] = None,
+                 speculative_executor: Optional[SpeculativeExecutor] = None,
+                 summary_client: Optional[OpenAI] = None):
         """Initialize the conversation manager.
         
         Args:
             ai_service: The AI service for generating responses
+            intent_router: Optional router answering plain order-status questions without the LLM
+            speculative_executor: Optional executor starting likely tool calls alongside the first completion
+            summary_client: Optional client for background history summaries, defaults to `openai_client`
         """
         
         self.function_tools = function_tools
+        self.intent_router = intent_router
+        self.speculative_executor = speculative_executor
         # constructing a new LLM chat session per support agent instance
-        self.llm_chat_session = LLMChatSession(system_prompt_provider=system_prompt_provider, client=openai_client)
+        self.llm_chat_session = LLMChatSession(system_prompt_provider=system_prompt_provider, client=openai_client,
+                                               summary_client=summary_client)
         
 
-    def process_message(self, message: str) -> str:
+    def process_message(self, message: str, on_token: Optional[Callable[[str], None]] = None) -> str:
         """
         Process a user message and handle any function tool requests.
         
@@ -27,34 +40,47 @@ class SupportAgent:
         
         Args:
             message: The user's message
+            on_token: Optional callback that receives the response text as it is streamed
             
         Returns:
             A user-facing response string
         """
+        with tracer.span("agent.turn"):
+            return self._process_message(message, on_token)
+
+    def _process_message(self, message: str, on_token: Optional[Callable[[str], None]]) -> str:
+        speculation = None
         try:
+            # Plain order-status questions are answered directly, without a model round trip
+            routed = self._route(message, on_token)
+            if routed is not None:
+                return routed
+
+            # Start tool work the message already has arguments for while the model decides
+            if self.speculative_executor is not None:
+                speculation = self.speculative_executor.speculate(message)
+
             # Send the user's message to the AI
-            response = self.llm_chat_session.send_user_message(message=message, tools=self.function_tools.get_available_tools())
+            response = self.llm_chat_session.send_user_message(message=message, tools=self.function_tools.get_available_tools(),
+                                                                on_token=on_token)
             
             # Enter a loop to process function calls
-            while isinstance(response, dict) and "function_tool" in response:
-                # Extract function details
-                function_name = response["function_tool"]
-                function_args = response["function_arguments"]
-                tool_call_id = response["tool_call_id"]
+            while isinstance(response, dict) and "function_calls" in response:
+                function_calls = response["function_calls"]
                 
-                # Execute the function
-                try:
-                    result = self.function_tools.execute_function(function_name, function_args)
-                except Exception as e:
-                    logger.error(f"Error executing function {function_name}: {e}")
-        
+                # Execute every requested function concurrently; failures come back as error results
+                calls = [(call["function_tool"], call["function_arguments"]) for call in function_calls]
+                if self.speculative_executor is not None:
+                    results = self.speculative_executor.execute_functions(speculation, calls)
+                else:
+                    results = self.function_tools.execute_functions(calls)
                 
-                # Submit the function result back to the AI
-                response = self.llm_chat_session.submit_tool_result(
-                    tool_call_id=tool_call_id,
-                    function_name=function_name,
-                    result=result,
-                    tools=self.function_tools.get_available_tools()
+                # Submit all function results back to the AI in one round trip
+                response = self.llm_chat_session.submit_tool_results(
+                    [{"tool_call_id": call["tool_call_id"], "function_name": call["function_tool"], "result": result}
+                     for call, result in zip(function_calls, results)],
+                    tools=self.function_tools.get_available_tools(),
+                    on_token=on_token
                 )
             
             # Return the final user-facing response
@@ -63,9 +89,23 @@ class SupportAgent:
         except Exception as e:
             logger.error(f"Error in process_message: {e}")
             return "I'm sorry, I couldn't process that request. Could you try again?"
+        finally:
+            if self.speculative_executor is not None:
+                self.speculative_executor.finish(speculation)
     
 
-    def generate_response(self, instruction: str, max_tokens: int = 100) -> str:
+    def _route(self, message: str, on_token: Optional[Callable[[str], None]]) -> Optional[str]:
+        if self.intent_router is None:
+            return None
+        turn = self.intent_router.route(message)
+        if turn is None:
+            return None
+        self.llm_chat_session.record_routed_turn(message, turn.function_name, turn.arguments, turn.result, turn.response)
+        if on_token is not None:
+            on_token(turn.response)
+        return turn.response
+
+    def generate_response(self, instruction: str, max_tokens: int = 100, on_token: Optional[Callable[[str], None]] = None) -> str:
         """
         Generate a simple response without function calling.
         
@@ -73,7 +113,7 @@ class SupportAgent:
         """
         try:
             prompt = f"{instruction.lower()}."
-            response = self.llm_chat_session.send_user_message(prompt, max_tokens=max_tokens)
+            response = self.llm_chat_session.send_user_message(prompt, max_tokens=max_tokens, on_token=on_token)
             return response
             
         except Exception as e:
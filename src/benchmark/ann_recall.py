@@ -0,0 +1,78 @@
+"""
+ANN Recall Benchmark
+
+Measures recall@k and per-query latency of the IVF index against exact brute-force
+search on a synthetic, clustered catalog of unit-length embeddings.
+
+Run from the src directory:
+    python -m benchmark.ann_recall --rows 1000000 --dim 256
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from store.ivf_index import IVFIndex, top_k_indices
+
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors drawn around random cluster centres, roughly like real product embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    matrix = np.empty((rows, dim), dtype=np.float32)
+    chunk_size = 100000
+    for start in range(0, rows, chunk_size):
+        size = min(chunk_size, rows - start)
+        labels = rng.integers(0, clusters, size=size)
+        matrix[start:start + size] = centres[labels] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def recall_at_k(approximate: list, exact: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
+
+
+def run(rows: int, dim: int, queries: int, top_k: int, n_lists: int, n_probes: list, seed: int = 0) -> dict:
+    matrix = synthetic_embeddings(rows, dim, clusters=max(8, rows // 1000), seed=seed)
+    # Queries are perturbed catalog rows, like a preference text close to some products
+    rng = np.random.default_rng(seed + 1)
+    query_vectors = matrix[rng.choice(rows, size=queries, replace=False)] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    exact = np.stack([top_k_indices(matrix @ query, top_k) for query in query_vectors])
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    index = IVFIndex.build(matrix, n_lists=n_lists or None)
+    build_s = time.perf_counter() - start
+
+    results = {"rows": rows, "dim": dim, "top_k": top_k, "n_lists": index.n_lists,
+               "build_seconds": round(build_s, 3), "exact_ms_per_query": round(exact_ms, 4), "ivf": []}
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        approximate = [indices for indices, _ in index.search(query_vectors, top_k, n_probe)]
+        ivf_ms = (time.perf_counter() - start) * 1000 / queries
+        results["ivf"].append({
+            "n_probe": n_probe,
+            "recall_at_k": round(recall_at_k(approximate, exact), 4),
+            "ms_per_query": round(ivf_ms, 4),
+            "speedup": round(exact_ms / ivf_ms, 2),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k of the IVF index against exact search")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=0, help="0 picks sqrt(rows)")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.dim, args.queries, args.top_k, args.n_lists, args.n_probe), indent=2))
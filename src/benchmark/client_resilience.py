@@ -0,0 +1,80 @@
+"""
+OpenAI Client Resilience Benchmark
+
+Sends embedding requests to the fake OpenAI server with injected failures and slow
+responses, once through a plain SDK client without retries and once through the clients
+from OpenAIClientFactory, and reports success rate and latency percentiles of each.
+
+Run from the src directory:
+    python -m benchmark.client_resilience --requests 200 --error-rate 0.1 --slow-rate 0.05
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+from openai import OpenAI
+
+from benchmark.fake_openai_server import FakeOpenAIServer, FaultProfile
+from utils.openai_client_factory import OpenAIClientFactory, RetryPolicy
+
+
+def measure(client: Any, requests: int, concurrency: int) -> Dict[str, Any]:
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        client.embeddings.create(input=[f"query {i}"], model="text-embedding-3-small")
+        return time.perf_counter() - start
+
+    def attempt(i: int):
+        try:
+            return call(i)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(attempt, range(requests)))
+    latencies = np.array([latency for latency in results if latency is not None]) * 1000
+    return {
+        "success_rate": round(len(latencies) / requests, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1) if len(latencies) else None,
+        "max_ms": round(float(latencies.max()), 1) if len(latencies) else None,
+    }
+
+
+def run(requests: int, concurrency: int, base_delay: float, slow_rate: float, slow_delay: float,
+        error_rate: float, hedge_after: float, deadline: float) -> Dict[str, Any]:
+    server = FakeOpenAIServer(("127.0.0.1", 0), FaultProfile(base_delay, slow_rate, slow_delay, error_rate)).start()
+    try:
+        plain = OpenAI(api_key="fake", base_url=server.base_url, max_retries=0, timeout=deadline)
+        retrying = OpenAIClientFactory(api_key="fake", base_url=server.base_url,
+                                       retry_policy=RetryPolicy(deadline=deadline)).client()
+        hedged = OpenAIClientFactory(api_key="fake", base_url=server.base_url,
+                                     retry_policy=RetryPolicy(deadline=deadline, hedge_after=hedge_after)).client()
+        return {
+            "plain": measure(plain, requests, concurrency),
+            "retry": measure(retrying, requests, concurrency),
+            "retry+hedge": measure(hedged, requests, concurrency),
+            "server": server.stats,
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare OpenAI client resilience settings against a faulty fake API")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-delay", type=float, default=0.02)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--hedge-after", type=float, default=0.1)
+    parser.add_argument("--deadline", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.requests, args.concurrency, args.base_delay, args.slow_rate, args.slow_delay,
+                         args.error_rate, args.hedge_after, args.deadline), indent=2))
@@ -0,0 +1,81 @@
+"""
+Benchmark Comparison
+
+Compares two result files written by the benchmark suite, e.g. from the last release and
+from a candidate build, and reports every timing that changed by more than a threshold.
+Exits with status 1 when any timing regressed, so it can gate a deploy.
+
+Run from the src directory:
+    python -m benchmark.compare results/baseline.json results/candidate.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Leaf keys measuring time, where lower is better
+TIMING_SUFFIXES = ("_us", "_ms", "_seconds")
+
+
+def timings(node: Any, path: Tuple[str, ...] = ()) -> Dict[str, float]:
+    """Flatten the timing leaves of a result tree into {"a/b/c": value}."""
+    if isinstance(node, dict):
+        flat = {}
+        for key, value in node.items():
+            flat.update(timings(value, path + (str(key),)))
+        return flat
+    if path and path[-1].endswith(TIMING_SUFFIXES) and isinstance(node, (int, float)):
+        return {"/".join(path): float(node)}
+    return {}
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> Dict[str, List[Dict[str, Any]]]:
+    before = timings(baseline.get("benchmarks", {}))
+    after = timings(candidate.get("benchmarks", {}))
+    report: Dict[str, List[Dict[str, Any]]] = {"regressions": [], "improvements": [], "unchanged": [],
+                                               "missing": sorted(set(before) - set(after)),
+                                               "new": sorted(set(after) - set(before))}
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        entry = {"name": name, "baseline": old, "candidate": new, "change": round(change, 4)}
+        if change > threshold:
+            report["regressions"].append(entry)
+        elif change < -threshold:
+            report["improvements"].append(entry)
+        else:
+            report["unchanged"].append(entry)
+    return report
+
+
+def format_report(report: Dict[str, List[Any]], baseline: Dict[str, Any], candidate: Dict[str, Any]) -> str:
+    revisions = [document.get("environment", {}).get("git_revision") or "unknown" for document in (baseline, candidate)]
+    lines = [f"baseline {revisions[0]} -> candidate {revisions[1]}"]
+    for section in ("regressions", "improvements"):
+        lines.append(f"\n{section.capitalize()} ({len(report[section])}):")
+        for entry in sorted(report[section], key=lambda entry: -abs(entry["change"])):
+            lines.append(f"  {entry['name']:<70} {entry['baseline']:>12.4f} -> {entry['candidate']:>12.4f}"
+                         f"  {entry['change']:+.1%}")
+    lines.append(f"\nUnchanged: {len(report['unchanged'])}")
+    for section in ("missing", "new"):
+        if report[section]:
+            lines.append(f"{section.capitalize()} in candidate: {', '.join(report[section])}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported, 0.1 is 10%%")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    report = compare(baseline, candidate, args.threshold)
+    print(json.dumps(report, indent=2) if args.json else format_report(report, baseline, candidate))
+    sys.exit(1 if report["regressions"] else 0)
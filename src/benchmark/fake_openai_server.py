@@ -0,0 +1,264 @@
+"""
+Fake OpenAI API Server
+
+A local stand-in for the embeddings and chat completions endpoints, with injectable
+latency and failures, for exercising client timeouts, retries and hedging offline.
+Responses are deterministic: embeddings are derived from the input text, and chat
+completions either follow a tool-call script or return a fixed reply.
+
+Run from the src directory:
+    python -m benchmark.fake_openai_server --port 8900 --error-rate 0.1 --slow-rate 0.05 --slow-delay 3
+then point a client at http://127.0.0.1:8900/v1
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class FaultProfile:
+    """Latency and failure injection settings, shared by every request.
+
+    Args:
+        base_delay: Seconds added to every response
+        slow_rate: Fraction of requests delayed by an extra `slow_delay` seconds (the tail)
+        slow_delay: Extra delay for slow requests
+        error_rate: Fraction of requests answered with `error_status`
+        error_status: HTTP status of injected failures, 500 or 429 are retryable
+        seed: Seed of the fault random generator, for reproducible runs
+        fail_first: Number of initial requests that fail regardless of `error_rate`
+    """
+
+    def __init__(self, base_delay: float = 0.0, slow_rate: float = 0.0, slow_delay: float = 2.0,
+                 error_rate: float = 0.0, error_status: int = 500, seed: Optional[int] = 0, fail_first: int = 0):
+        self.base_delay = base_delay
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> Dict[str, Any]:
+        with self._lock:
+            slow = self._random.random() < self.slow_rate
+            error = self._random.random() < self.error_rate or self.fail_first > 0
+            self.fail_first = max(0, self.fail_first - 1)
+        return {"delay": self.base_delay + (self.slow_delay if slow else 0.0), "error": error}
+
+
+def fake_embedding(text: str, dimension: int) -> List[float]:
+    """Deterministic pseudo-random embedding of a text."""
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class ToolCallRule:
+    """Scripted tool call: when the latest user message matches `pattern`, the fake model calls `function_name`.
+
+    String argument values are format templates filled from the match, e.g.
+    ToolCallRule(r"(?P<number>W\\d+)", "lookup_order", {"order_number": "#{number}"}).
+    """
+
+    def __init__(self, pattern: str, function_name: str, arguments: Dict[str, Any]):
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.function_name = function_name
+        self.arguments = arguments
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "ToolCallRule":
+        return cls(spec["pattern"], spec["function"], spec.get("arguments", {}))
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        found = self.pattern.search(text)
+        if found is None:
+            return None
+        return {key: value.format(found.group(0), *found.groups(), **found.groupdict()) if isinstance(value, str) else value
+                for key, value in self.arguments.items()}
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, faults: Optional[FaultProfile] = None, dimension: int = 256,
+                 reply: str = "Thanks for reaching out to Sierra Outfitters!", tool_calls: Sequence[ToolCallRule] = ()):
+        """
+        Args:
+            address: (host, port) to listen on, port 0 picks a free one
+            faults: Latency and failure injection, none by default
+            dimension: Length of the returned embeddings
+            reply: Text of every chat reply that is not a tool call
+            tool_calls: Script of tool calls made in answer to matching user messages. Every
+                rule that matches the latest user message contributes one call, so a message
+                can trigger several calls at once. Tool results are answered with `reply`.
+        """
+        super().__init__(address, _FakeOpenAIHandler)
+        self.faults = faults or FaultProfile()
+        self.dimension = dimension
+        self.reply = reply
+        self.tool_calls = list(tool_calls)
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "slow": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record(self, fault: Dict[str, Any]) -> None:
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["errors"] += int(fault["error"])
+            self.stats["slow"] += int(fault["delay"] > self.faults.base_delay)
+
+    def scripted_tool_calls(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        available = {tool.get("function", {}).get("name") for tool in tools}
+        text = messages[-1].get("content") or ""
+        calls = []
+        for rule in self.tool_calls:
+            arguments = rule.match(text) if rule.function_name in available else None
+            if arguments is not None:
+                # Ids only need to be unique within a conversation
+                calls.append({"id": f"call_{len(messages)}_{len(calls)}", "type": "function",
+                              "function": {"name": rule.function_name, "arguments": json.dumps(arguments)}})
+        return calls
+
+    def start(self) -> "FakeOpenAIServer":
+        """Serve on a background thread and return self."""
+        threading.Thread(target=self.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+
+class _FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: FakeOpenAIServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        fault = self.server.faults.draw()
+        self.server.record(fault)
+        if fault["delay"]:
+            time.sleep(fault["delay"])
+        if fault["error"]:
+            self._send_json(self.server.faults.error_status,
+                            {"error": {"message": "Injected failure", "type": "server_error", "code": None}})
+            return
+
+        if self.path.endswith("/embeddings"):
+            self._embeddings(body)
+        elif self.path.endswith("/chat/completions"):
+            self._chat_completion(body)
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error", "code": None}})
+
+    def _embeddings(self, body: Dict[str, Any]) -> None:
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        tokens = sum(len(text) // 4 for text in inputs)
+        self._send_json(200, {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text, self.server.dimension)}
+                     for i, text in enumerate(inputs)],
+            "model": body.get("model", ""),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _chat_completion(self, body: Dict[str, Any]) -> None:
+        messages = body.get("messages") or [{}]
+        tool_calls = []
+        if body.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps({"relevant_skus": []})
+        elif body.get("max_tokens") == 10:
+            content = "YES"
+        else:
+            content = self.server.reply
+            if messages[-1].get("role") == "user" and body.get("tools"):
+                tool_calls = self.server.scripted_tool_calls(messages, body["tools"])
+        if tool_calls:
+            content = ""
+        completion_tokens = len(content) // 4 + sum(len(call["function"]["arguments"]) // 4 for call in tool_calls)
+        usage = {"prompt_tokens": 10, "completion_tokens": completion_tokens, "total_tokens": 10 + completion_tokens}
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        created = int(time.time())
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": content or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self._send_json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": body.get("model", ""),
+                "choices": [{"index": 0, "finish_reason": finish_reason, "message": message}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send_chunk(choices: List[Dict[str, Any]], **extra: Any) -> None:
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                     "model": body.get("model", ""), "choices": choices, **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        if tool_calls:
+            # Like the real API: id and name first, then the arguments in fragments
+            for index, call in enumerate(tool_calls):
+                send_chunk([{"index": 0, "finish_reason": None, "delta": {"tool_calls": [
+                    {"index": index, "id": call["id"], "type": "function",
+                     "function": {"name": call["function"]["name"], "arguments": ""}}]}}])
+                arguments = call["function"]["arguments"]
+                for offset in range(0, len(arguments), 16):
+                    send_chunk([{"index": 0, "finish_reason": None, "delta": {"tool_calls": [
+                        {"index": index, "function": {"arguments": arguments[offset:offset + 16]}}]}}])
+        else:
+            for word in content.split(" "):
+                send_chunk([{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}])
+        send_chunk([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send_chunk([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI API with injected latency and failures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--base-delay", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--script", help="JSON file of tool-call rules: [{\"pattern\": ..., \"function\": ..., \"arguments\": {...}}]")
+    args = parser.parse_args()
+
+    faults = FaultProfile(args.base_delay, args.slow_rate, args.slow_delay, args.error_rate, args.error_status, seed=None)
+    tool_calls = []
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            tool_calls = [ToolCallRule.from_dict(spec) for spec in json.load(f)]
+    server = FakeOpenAIServer((args.host, args.port), faults, tool_calls=tool_calls)
+    print(f"Fake OpenAI API on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,80 @@
+"""
+Benchmark Harness
+
+Timing helpers and the JSON result format shared by the benchmark suite. Result files
+carry the environment they were measured in, so two versions can be compared with
+benchmark.compare.
+"""
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    """Per-call latency summary in microseconds."""
+    samples = np.asarray(seconds) * 1e6
+    return {
+        "calls": len(samples),
+        "mean_us": round(float(samples.mean()), 3),
+        "p50_us": round(float(np.percentile(samples, 50)), 3),
+        "p99_us": round(float(np.percentile(samples, 99)), 3),
+    }
+
+
+def measure(operation: Callable[[int], Any], calls: int, warmup: int = 10) -> Dict[str, float]:
+    """Time `operation(i)` for i in range(calls), after `warmup` untimed calls."""
+    for i in range(min(warmup, calls)):
+        operation(i)
+    seconds = []
+    for i in range(calls):
+        start = time.perf_counter()
+        operation(i)
+        seconds.append(time.perf_counter() - start)
+    return latency_stats(seconds)
+
+
+def timed(operation: Callable[[], Any]) -> Dict[str, Any]:
+    """Run `operation` once, returning its wall time and result."""
+    start = time.perf_counter()
+    result = operation()
+    return {"seconds": round(time.perf_counter() - start, 4), "result": result}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def results_document(benchmarks: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    return {"format_version": RESULTS_FORMAT_VERSION, "environment": environment(), "config": config,
+            "benchmarks": benchmarks}
+
+
+def write_results(path: Path, document: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        # Sorted keys keep result files diff-friendly
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,267 @@
+"""
+Closed-Loop Load Generator
+
+Drives many simulated customers through scripted multi-turn conversations against one
+SupportAgentServer, the way the HTTP server runs them: every conversation is a session
+in a SessionRegistry, all sessions share the stores, tools and upstream rate budget, and
+at most --max-concurrent-turns turns run at once. The OpenAI API is replaced by the
+local fake with a latency model (base delay plus a slow tail) and a tool-call script, so
+order lookups, promotion checks and recommendations exercise the real tools.
+
+Each customer sends its next message only after the previous reply arrived and a random
+think time passed (a closed loop), so throughput is what the system sustains for that
+many customers. Reported per run:
+    - throughput in turns per second
+    - turn latency and time to first streamed token (p50/p95/p99)
+    - queueing delay: waiting for a turn slot, and waiting for upstream rate budget
+    - process memory growth and chat history size per session
+
+Run from the src directory:
+    python -m benchmark.load_generator --customers 200 --conversations 2 --llm-latency 0.4 --rows 10000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from agent.session_registry import SessionRegistry
+from agent.support_agent import SupportAgent
+from benchmark.fake_openai_server import FakeOpenAIServer, FaultProfile, ToolCallRule
+from benchmark.harness import results_document, write_results
+from benchmark.microbenchmarks import lookup_keys, prepare_dataset
+from benchmark.startup_time import project_root_for
+from support_agent_server import SupportAgentServer
+
+# Conversations as lists of customer messages; {email} and {order} are filled per customer
+CONVERSATIONS = {
+    "order_status": ["Hi there!", "Where is my order {order}? My email is {email}", "Great, thanks for the help!"],
+    "order_problem": ["My order {order} arrived damaged, my email is {email}. What can I do?",
+                      "Can you also tell me if it was shipped with tracking?"],
+    "promotion": ["Hello! Is the Early Risers promotion running right now?", "Ok, thanks. Have a nice day."],
+    "recommendation": ["I'm looking for a warm sleeping bag for winter camping.",
+                       "Anything for ultralight thru-hiking?", "Thanks, I'll think about it."],
+    "mixed": ["Order {order} for {email}: has it shipped yet, and is there a promotion for my next order?",
+              "Also, I'm looking for waterproof hiking boots."],
+}
+
+# How the fake model answers: the tools it calls for matching customer messages
+TOOL_SCRIPT = [
+    ToolCallRule(r"(?=.*?(?P<email>[\w.+-]+@[\w-]+\.[\w.]+))(?=.*?(?P<number>W\d+))", "lookup_order",
+                 {"email": "{email}", "order_number": "#{number}"}),
+    ToolCallRule(r"promotion|discount|early risers", "check_promotion_eligibility", {}),
+    ToolCallRule(r"(?:looking for|anything for) (?P<preferences>[^.?!]+)", "recommend_product",
+                 {"preferences": "{preferences}"}),
+]
+
+
+def resident_memory_bytes() -> int:
+    """Current resident set size, or the peak where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentiles(seconds: List[float]) -> Dict[str, Optional[float]]:
+    if not seconds:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    samples = np.asarray(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(samples, 50)), 2),
+            "p95_ms": round(float(np.percentile(samples, 95)), 2),
+            "p99_ms": round(float(np.percentile(samples, 99)), 2),
+            "max_ms": round(float(samples.max()), 2)}
+
+
+class TurnRecorder:
+    """Thread-safe collection of per-turn measurements."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.slot_waits: List[float] = []
+        self.per_conversation: Dict[str, List[float]] = {name: [] for name in CONVERSATIONS}
+        self.failures = 0
+
+    def record(self, conversation: str, latency: float, first_token: Optional[float], slot_wait: float,
+               failed: bool) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.per_conversation[conversation].append(latency)
+            self.slot_waits.append(slot_wait)
+            if first_token is not None:
+                self.first_token.append(first_token)
+            self.failures += int(failed)
+
+
+class LoadGenerator:
+    """Runs simulated customers against a session registry and collects turn measurements."""
+
+    def __init__(self, registry: SessionRegistry, customers: List[Dict[str, str]], conversations_per_customer: int,
+                 max_concurrent_turns: int, think_time: float, stream: bool, seed: int = 0):
+        self.registry = registry
+        self.customers = customers
+        self.conversations_per_customer = conversations_per_customer
+        self.think_time = think_time
+        self.stream = stream
+        self.seed = seed
+        self.recorder = TurnRecorder()
+        self._turn_slots = threading.BoundedSemaphore(max_concurrent_turns)
+
+    def _turn(self, session_id: str, conversation: str, message: str) -> None:
+        queued = time.perf_counter()
+        with self._turn_slots:
+            started = time.perf_counter()
+            first_token: List[float] = []
+
+            def on_token(token: str) -> None:
+                if not first_token:
+                    first_token.append(time.perf_counter() - started)
+
+            response = self.registry.process_message(session_id, message, on_token=on_token if self.stream else None)
+            latency = time.perf_counter() - started
+        # Replies starting like this are the agent's error fallbacks
+        failed = response is None or response.startswith(("I'm sorry", "I apologize"))
+        self.recorder.record(conversation, latency, first_token[0] if first_token else None, started - queued, failed)
+
+    def _customer(self, index: int) -> None:
+        rng = random.Random(self.seed * 100003 + index)
+        customer = self.customers[index % len(self.customers)]
+        names = list(CONVERSATIONS)
+        for number in range(self.conversations_per_customer):
+            conversation = names[(index + number) % len(names)]
+            # Sessions stay open, like customers who leave without closing the chat
+            session_id = self.registry.create()
+            for template in CONVERSATIONS[conversation]:
+                if self.think_time:
+                    time.sleep(rng.expovariate(1 / self.think_time))
+                self._turn(session_id, conversation, template.format(**customer))
+
+    def run(self, concurrency: int) -> float:
+        """Run `concurrency` customers at once until all are done, returning the elapsed seconds."""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="customer") as pool:
+            for future in [pool.submit(self._customer, index) for index in range(concurrency)]:
+                future.result()
+        return time.perf_counter() - start
+
+
+def run(customers: int, conversations: int = 2, rows: int = 1000, llm_latency: float = 0.3, slow_rate: float = 0.02,
+        slow_delay: float = 2.0, think_time: float = 0.5, max_concurrent_turns: int = 64, stream: bool = True,
+        requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+        dim: int = 256, seed: int = 0, work_dir: Optional[Path] = None) -> Dict[str, Any]:
+    fake_api = FakeOpenAIServer(("127.0.0.1", 0), FaultProfile(llm_latency, slow_rate, slow_delay, seed=seed),
+                                dimension=dim, reply="Happy trails! Let me know if there's anything else I can help with.",
+                                tool_calls=TOOL_SCRIPT).start()
+    previous_base_url = os.environ.get("OPENAI_BASE_URL")
+    os.environ["OPENAI_BASE_URL"] = fake_api.base_url
+    temporary = tempfile.TemporaryDirectory(prefix="benchmark-")
+    try:
+        work_dir = work_dir or Path(temporary.name)
+        dataset_dir = prepare_dataset(work_dir, rows, dim, seed)
+        SupportAgentServer._instance = None
+        server = SupportAgentServer("fake", project_root_for(dataset_dir, Path(temporary.name) / "load", warm=True))
+        server.data_file_watcher.stop()
+        if requests_per_minute is not None or tokens_per_minute is not None:
+            server.upstream_scheduler.set_limits(requests_per_minute or 500, tokens_per_minute or 200000)
+
+        agents: List[SupportAgent] = []
+
+        def create_agent() -> SupportAgent:
+            agent = server.create_agent()
+            agents.append(agent)
+            return agent
+
+        registry = SessionRegistry(create_agent, idle_timeout=3600, max_sessions=customers * conversations + 1)
+        generator = LoadGenerator(registry, [{"email": key["email"], "order": key["order_number"]}
+                                             for key in lookup_keys(rows, customers, seed)],
+                                  conversations, max_concurrent_turns, think_time, stream, seed)
+
+        memory_before = resident_memory_bytes()
+        elapsed = generator.run(customers)
+        memory_after = resident_memory_bytes()
+
+        recorder = generator.recorder
+        sessions = len(agents)
+        history_tokens = [agent.llm_chat_session.history.token_count for agent in agents]
+        upstream = server.upstream_scheduler.get_stats()
+        return {
+            "turns": len(recorder.latencies),
+            "failed_turns": recorder.failures,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_turns_per_second": round(len(recorder.latencies) / elapsed, 2),
+            "turn_latency": percentiles(recorder.latencies),
+            "time_to_first_token": percentiles(recorder.first_token),
+            "turn_latency_by_conversation": {name: percentiles(values)
+                                             for name, values in recorder.per_conversation.items()},
+            "queueing": {
+                "turn_slot_wait": percentiles(recorder.slot_waits),
+                "upstream_wait": {priority: {"mean_ms": round(upstream[priority]["mean_wait_seconds"] * 1000, 2),
+                                             "max_ms": round(upstream[priority]["max_wait_seconds"] * 1000, 2),
+                                             "granted": upstream[priority]["granted"]}
+                                  for priority in ("interactive", "judge", "background")},
+            },
+            "memory": {
+                "sessions": sessions,
+                "rss_growth_bytes": memory_after - memory_before,
+                "rss_growth_bytes_per_session": round((memory_after - memory_before) / max(1, sessions)),
+                "mean_history_tokens_per_session": round(float(np.mean(history_tokens)), 1) if history_tokens else 0.0,
+            },
+            "intent_router": server.intent_router.get_stats(),
+            "speculation": server.speculative_executor.get_stats(),
+            "fake_api": dict(fake_api.stats),
+        }
+    finally:
+        if previous_base_url is None:
+            os.environ.pop("OPENAI_BASE_URL", None)
+        else:
+            os.environ["OPENAI_BASE_URL"] = previous_base_url
+        SupportAgentServer._instance = None
+        fake_api.shutdown()
+        fake_api.server_close()
+        temporary.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closed-loop multi-session load test of the agent")
+    parser.add_argument("--customers", type=int, nargs="+", default=[50],
+                        help="Concurrent simulated customers; several values run one load step each")
+    parser.add_argument("--conversations", type=int, default=2, help="Conversations per customer, each a new session")
+    parser.add_argument("--rows", type=int, default=1000, help="Synthetic catalog and order count")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds every fake API call takes")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="Fraction of API calls in the slow tail")
+    parser.add_argument("--slow-delay", type=float, default=2.0, help="Extra seconds of a slow API call")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean seconds a customer waits before replying")
+    parser.add_argument("--max-concurrent-turns", type=int, default=64, help="Turn slots, like the HTTP server's limit")
+    parser.add_argument("--no-stream", action="store_true", help="Request whole replies instead of streaming")
+    parser.add_argument("--requests-per-minute", type=float, help="Upstream request budget, defaults to the server's")
+    parser.add_argument("--tokens-per-minute", type=float, help="Upstream token budget, defaults to the server's")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, help="Keep generated datasets here and reuse them across runs")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of printing them")
+    args = parser.parse_args()
+
+    steps = {}
+    for customers in args.customers:
+        steps[str(customers)] = run(customers, args.conversations, args.rows, args.llm_latency, args.slow_rate,
+                                    args.slow_delay, args.think_time, args.max_concurrent_turns, not args.no_stream,
+                                    args.requests_per_minute, args.tokens_per_minute, args.dim, args.seed,
+                                    args.work_dir)
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "work_dir")}
+    document = results_document({"load": steps}, config)
+    if args.output:
+        write_results(args.output, document)
+    else:
+        print(json.dumps(document, indent=2, sort_keys=True))
@@ -0,0 +1,142 @@
+"""
+Store and Tool Microbenchmarks
+
+Measures the hot read paths of the agent over synthetic catalogs and order histories of
+increasing size, without any network access:
+    - loading ProductStore, OrderStore and ProductEmbeddingStore from disk
+    - OrderStore.get_order_by_email_and_number, for existing and unknown orders
+    - ProductEmbeddingStore.get_top_k_similar_products, with query embeddings cached
+    - FunctionTools.get_available_tools
+
+Embeddings come from a seeded cache and a local fake API, so runs are deterministic.
+
+Run from the src directory:
+    python -m benchmark.microbenchmarks --sizes 10 1000 100000 --output results/micro.json
+"""
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmark.fake_openai_server import FakeOpenAIServer
+from benchmark.harness import measure, results_document, timed, write_results
+from benchmark.synthetic_data import (order_email, order_number, query_vectors, seed_embedding_cache,
+                                      synthetic_orders, write_dataset)
+from store.order_store import OrderStore
+from store.product_embedding_store import ProductEmbeddingStore
+from store.product_store import ProductStore
+from store.query_embedding_cache import QueryEmbeddingCache
+from tools.check_promotion_eligibility import CheckPromotionEligibility
+from tools.function_tools import FunctionTools
+from tools.lookup_order import LookUpOrder
+from tools.recommend_product import RecommendProduct
+from utils.openai_client_factory import OpenAIClientFactory
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+COMPLETE_MARKER = ".complete"
+
+
+def prepare_dataset(work_dir: Path, rows: int, dim: int, seed: int) -> Path:
+    """Data directory with `rows` products, orders and cached embeddings, reused across runs."""
+    data_dir = work_dir / f"rows-{rows}-dim-{dim}-seed-{seed}" / "data"
+    if not (data_dir / COMPLETE_MARKER).exists():
+        write_dataset(data_dir, rows, rows, seed)
+        seed_embedding_cache(data_dir / "ProductEmbeddings", rows, dim, seed=seed)
+        (data_dir / COMPLETE_MARKER).touch()
+    return data_dir
+
+
+def lookup_keys(rows: int, calls: int, seed: int) -> List[Dict[str, str]]:
+    """Existing (email, order number) pairs, sampled without materializing every order."""
+    rng = random.Random(seed + 3)
+    wanted = sorted(rng.sample(range(rows), min(rows, calls)))
+    keys, position = [], 0
+    for index, order in enumerate(synthetic_orders(rows, rows, seed)):
+        if position < len(wanted) and index == wanted[position]:
+            keys.append({"email": order["Email"], "order_number": order["OrderNumber"]})
+            position += 1
+            if position == len(wanted):
+                break
+    return keys
+
+
+def run_size(data_dir: Path, rows: int, dim: int, calls: int, search_calls: int, seed: int,
+             client_factory: OpenAIClientFactory) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+
+    loaded = timed(lambda: ProductStore(data_dir / "ProductCatalog.json"))
+    product_store = loaded["result"]
+    results["load_product_store_seconds"] = loaded["seconds"]
+
+    loaded = timed(lambda: OrderStore(data_dir / "CustomerOrders.json"))
+    order_store = loaded["result"]
+    results["load_order_store_seconds"] = loaded["seconds"]
+
+    queries = [f"synthetic query {i}" for i in range(search_calls)]
+    query_cache = QueryEmbeddingCache("text-embedding-3-small", max_entries=len(queries))
+    for query, vector in zip(queries, query_vectors(queries, dim, seed)):
+        query_cache.put(query, vector)
+    loaded = timed(lambda: ProductEmbeddingStore(product_store, data_dir / "ProductEmbeddings",
+                                                 query_cache=query_cache, client_factory=client_factory))
+    embedding_store = loaded["result"]
+    results["load_embedding_store_seconds"] = loaded["seconds"]
+
+    keys = lookup_keys(rows, calls, seed)
+    results["order_lookup_hit"] = measure(
+        lambda i: order_store.get_order_by_email_and_number(keys[i % len(keys)]["email"],
+                                                            keys[i % len(keys)]["order_number"]), calls)
+    results["order_lookup_miss"] = measure(
+        lambda i: order_store.get_order_by_email_and_number(order_email(i), order_number(rows + i)), calls)
+
+    results["top_k_similar_products"] = measure(
+        lambda i: embedding_store.get_top_k_similar_products(queries[i % len(queries)]), search_calls,
+        warmup=min(5, search_calls))
+
+    function_tools = FunctionTools([LookUpOrder(order_store), CheckPromotionEligibility(),
+                                    RecommendProduct(embedding_store, product_store, client_factory=client_factory)])
+    results["get_available_tools"] = measure(lambda i: function_tools.get_available_tools(), calls)
+    return results
+
+
+def run(sizes: List[int], dim: int = 256, calls: int = 1000, search_calls: int = 200, seed: int = 0,
+        work_dir: Optional[Path] = None) -> Dict[str, Any]:
+    fake_api = FakeOpenAIServer(("127.0.0.1", 0), dimension=dim).start()
+    temporary = tempfile.TemporaryDirectory(prefix="benchmark-") if work_dir is None else None
+    try:
+        work_dir = Path(temporary.name) if temporary is not None else work_dir
+        client_factory = OpenAIClientFactory(api_key="fake", base_url=fake_api.base_url)
+        results = {}
+        for rows in sizes:
+            data_dir = prepare_dataset(work_dir, rows, dim, seed)
+            results[str(rows)] = run_size(data_dir, rows, dim, calls, search_calls, seed, client_factory)
+        # Nothing above should need the API; requests here mean a cache was not used
+        results["fake_api_requests"] = fake_api.stats["requests"]
+        return results
+    finally:
+        fake_api.shutdown()
+        fake_api.server_close()
+        if temporary is not None:
+            temporary.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the stores and tools over synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog and order counts")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--calls", type=int, default=1000, help="Timed calls per lookup benchmark")
+    parser.add_argument("--search-calls", type=int, default=200, help="Timed calls of the similarity search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, help="Keep generated datasets here and reuse them across runs")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of printing them")
+    args = parser.parse_args()
+
+    config = {"sizes": args.sizes, "dim": args.dim, "calls": args.calls, "search_calls": args.search_calls,
+              "seed": args.seed}
+    document = results_document({"microbenchmarks": run(args.sizes, args.dim, args.calls, args.search_calls,
+                                                        args.seed, args.work_dir)}, config)
+    if args.output:
+        write_results(args.output, document)
+    else:
+        print(json.dumps(document, indent=2, sort_keys=True))
@@ -0,0 +1,69 @@
+"""
+Quantization Recall Benchmark
+
+Compares float16 and int8 first-pass scoring, with and without full-precision
+re-ranking, against exact float32 search on a synthetic catalog. Reports recall@k,
+per-query latency and resident bytes per SKU.
+
+Run from the src directory:
+    python -m benchmark.quantization_recall --rows 200000 --dim 1536
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmark.ann_recall import recall_at_k, synthetic_embeddings
+from store.ivf_index import top_k_indices
+from store.quantization import QuantizedMatrix
+
+
+def run(rows: int, dim: int, queries: int, top_k: int, rerank_factor: int, seed: int = 0) -> dict:
+    matrix = synthetic_embeddings(rows, dim, clusters=max(8, rows // 1000), seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    query_vectors = matrix[rng.choice(rows, size=queries, replace=False)] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    exact = top_k_indices(query_vectors @ matrix.T, top_k)
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+
+    results = {"rows": rows, "dim": dim, "top_k": top_k, "rerank_factor": rerank_factor,
+               "float32": {"bytes_per_sku": dim * 4, "ms_per_query": round(exact_ms, 4)}}
+    for mode in QuantizedMatrix.MODES:
+        quantized = QuantizedMatrix.from_rows(matrix, np.arange(rows), mode)
+
+        start = time.perf_counter()
+        approximate_scores = quantized.scores(query_vectors)
+        first_pass = top_k_indices(approximate_scores, top_k)
+        first_pass_ms = (time.perf_counter() - start) * 1000 / queries
+
+        start = time.perf_counter()
+        shortlists = top_k_indices(quantized.scores(query_vectors), top_k * rerank_factor)
+        reranked = []
+        for query, shortlist in zip(query_vectors, shortlists):
+            reranked.append(shortlist[top_k_indices(matrix[shortlist] @ query, top_k)])
+        rerank_ms = (time.perf_counter() - start) * 1000 / queries
+
+        results[mode] = {
+            "bytes_per_sku": round(quantized.nbytes / rows, 1),
+            "compression": round(dim * 4 / (quantized.nbytes / rows), 2),
+            "recall_at_k": round(recall_at_k(first_pass, exact), 4),
+            "ms_per_query": round(first_pass_ms, 4),
+            "reranked_recall_at_k": round(recall_at_k(reranked, exact), 4),
+            "reranked_ms_per_query": round(rerank_ms, 4),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k of quantized search against float32 search")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.dim, args.queries, args.top_k, args.rerank_factor), indent=2))
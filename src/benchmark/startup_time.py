@@ -0,0 +1,116 @@
+"""
+Startup Time Benchmark
+
+Measures how long SupportAgentServer takes to initialize (loading the catalog and orders,
+the embedding cache and search indexes, and wiring tools) on synthetic data of increasing
+size, with the OpenAI API replaced by the local fake.
+
+Two cases are measured per size:
+    - warm: the embedding cache is already up to date, as on a normal restart
+    - cold: no embedding cache, so every product is embedded through the fake API.
+      Only run up to --cold-max-rows, since it is dominated by embedding requests.
+
+Run from the src directory:
+    python -m benchmark.startup_time --sizes 10 1000 100000 --output results/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmark.fake_openai_server import FakeOpenAIServer
+from benchmark.harness import results_document, write_results
+from benchmark.microbenchmarks import prepare_dataset
+from support_agent_server import SupportAgentServer
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+
+
+def project_root_for(dataset_dir: Path, run_dir: Path, warm: bool) -> Path:
+    """Fresh project root linking to the dataset, with the embedding cache only when `warm`."""
+    data_dir = run_dir / "data"
+    data_dir.mkdir(parents=True)
+    for name in ("ProductCatalog.json", "CustomerOrders.json"):
+        (data_dir / name).symlink_to(dataset_dir / name)
+    if warm:
+        (data_dir / "ProductEmbeddings").symlink_to(dataset_dir / "ProductEmbeddings", target_is_directory=True)
+    return run_dir
+
+
+def measure_startup(project_root: Path) -> float:
+    """Seconds taken to construct and initialize a SupportAgentServer for `project_root`."""
+    # The server is a process-wide singleton, forget the previous one
+    SupportAgentServer._instance = None
+    start = time.perf_counter()
+    server = SupportAgentServer("fake", project_root)
+    seconds = time.perf_counter() - start
+    server.data_file_watcher.stop()
+    SupportAgentServer._instance = None
+    return seconds
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    return {"runs": [round(value, 4) for value in seconds],
+            "median_seconds": round(statistics.median(seconds), 4),
+            "min_seconds": round(min(seconds), 4)}
+
+
+def run(sizes: List[int], repeat: int = 3, cold_max_rows: int = 10000, dim: int = 256, seed: int = 0,
+        work_dir: Optional[Path] = None) -> Dict[str, Any]:
+    fake_api = FakeOpenAIServer(("127.0.0.1", 0), dimension=dim).start()
+    # SupportAgentServer builds its own clients; the SDK picks the base URL up from the environment
+    previous_base_url = os.environ.get("OPENAI_BASE_URL")
+    os.environ["OPENAI_BASE_URL"] = fake_api.base_url
+    temporary = tempfile.TemporaryDirectory(prefix="benchmark-") if work_dir is None else None
+    runs = tempfile.TemporaryDirectory(prefix="benchmark-startup-")
+    try:
+        work_dir = Path(temporary.name) if temporary is not None else work_dir
+        results: Dict[str, Any] = {}
+        for rows in sizes:
+            dataset_dir = prepare_dataset(work_dir, rows, dim, seed)
+            size_results = {}
+            for case in ("warm", "cold"):
+                if case == "cold" and rows > cold_max_rows:
+                    continue
+                seconds = []
+                for attempt in range(repeat):
+                    run_dir = Path(runs.name) / f"{rows}-{case}-{attempt}"
+                    seconds.append(measure_startup(project_root_for(dataset_dir, run_dir, warm=case == "warm")))
+                size_results[case] = summarize(seconds)
+            results[str(rows)] = size_results
+        return results
+    finally:
+        if previous_base_url is None:
+            os.environ.pop("OPENAI_BASE_URL", None)
+        else:
+            os.environ["OPENAI_BASE_URL"] = previous_base_url
+        fake_api.shutdown()
+        fake_api.server_close()
+        runs.cleanup()
+        if temporary is not None:
+            temporary.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time of SupportAgentServer over synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog and order counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Startups measured per size and case")
+    parser.add_argument("--cold-max-rows", type=int, default=10000, help="Largest size measured without an embedding cache")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, help="Keep generated datasets here and reuse them across runs")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of printing them")
+    args = parser.parse_args()
+
+    config = {"sizes": args.sizes, "repeat": args.repeat, "cold_max_rows": args.cold_max_rows, "dim": args.dim,
+              "seed": args.seed}
+    document = results_document({"startup": run(args.sizes, args.repeat, args.cold_max_rows, args.dim, args.seed,
+                                                args.work_dir)}, config)
+    if args.output:
+        write_results(args.output, document)
+    else:
+        print(json.dumps(document, indent=2, sort_keys=True))
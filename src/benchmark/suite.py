@@ -0,0 +1,49 @@
+"""
+Benchmark Suite
+
+Runs the offline benchmarks (store and tool microbenchmarks, server startup time) over
+the same synthetic datasets and writes one JSON result file per run. Compare two runs
+with benchmark.compare to catch regressions before deploying.
+
+Run from the src directory:
+    python -m benchmark.suite --sizes 10 1000 100000 --output results/$(git rev-parse --short HEAD).json
+    python -m benchmark.compare results/<baseline>.json results/<candidate>.json
+"""
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+from benchmark import microbenchmarks, startup_time
+from benchmark.harness import results_document, write_results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=microbenchmarks.DEFAULT_SIZES,
+                        help="Catalog and order counts")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--calls", type=int, default=1000, help="Timed calls per lookup benchmark")
+    parser.add_argument("--search-calls", type=int, default=200, help="Timed calls of the similarity search")
+    parser.add_argument("--startup-repeat", type=int, default=3, help="Startups measured per size and case")
+    parser.add_argument("--cold-max-rows", type=int, default=10000, help="Largest size started without an embedding cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, help="Keep generated datasets here and reuse them across runs")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of printing them")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as temporary:
+        # Both benchmarks share the generated datasets
+        work_dir = args.work_dir or Path(temporary)
+        benchmarks = {
+            "microbenchmarks": microbenchmarks.run(args.sizes, args.dim, args.calls, args.search_calls, args.seed,
+                                                   work_dir),
+            "startup": startup_time.run(args.sizes, args.startup_repeat, args.cold_max_rows, args.dim, args.seed,
+                                        work_dir),
+        }
+    config = {"sizes": args.sizes, "dim": args.dim, "calls": args.calls, "search_calls": args.search_calls,
+              "startup_repeat": args.startup_repeat, "cold_max_rows": args.cold_max_rows, "seed": args.seed}
+    document = results_document(benchmarks, config)
+    if args.output:
+        write_results(args.output, document)
+    else:
+        print(json.dumps(document, indent=2, sort_keys=True))
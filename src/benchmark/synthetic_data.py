@@ -0,0 +1,137 @@
+"""
+Synthetic Data
+
+Deterministic catalogs, order histories and embedding caches of any size, in the same
+formats as the files under data/, for benchmarking without real customer data.
+
+Run from the src directory:
+    python -m benchmark.synthetic_data --products 100000 --orders 100000 --output /tmp/synthetic
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from benchmark.ann_recall import synthetic_embeddings
+from store.embedding_builder import content_hash, product_text
+from store.embedding_cache import EmbeddingCache
+
+ADJECTIVES = ["Alpine", "Backcountry", "Summit", "Trailblazer", "Canyon", "Glacier", "Ridge", "Timber", "Desert",
+              "Coastal", "Everest", "Granite", "Wildflower", "Cascade", "Tundra", "Sierra"]
+PRODUCT_TYPES = [("Backpack", ["Backpack", "Hiking", "Adventure"]), ("Tent", ["Tent", "Camping", "Shelter"]),
+                 ("Hiking Boots", ["Footwear", "Hiking", "Waterproof"]), ("Sleeping Bag", ["Sleeping", "Camping", "Warm"]),
+                 ("Water Bottle", ["Hydration", "Outdoor Gear"]), ("Rain Jacket", ["Apparel", "Waterproof", "Rain"]),
+                 ("Trekking Poles", ["Hiking", "Trekking", "Lightweight"]), ("Camp Stove", ["Cooking", "Camping"]),
+                 ("Headlamp", ["Lighting", "Night", "Outdoor Gear"]), ("Kayak Paddle", ["Water Sports", "Kayaking"])]
+USES = ["long-distance trekking", "winter camping", "weekend backpacking", "alpine climbing", "desert expeditions",
+        "rainy coastal hikes", "family car camping", "ultralight thru-hiking"]
+STATUSES = ["delivered", "in-transit", "fulfilled", "error"]
+
+
+def synthetic_products(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        product_type, tags = PRODUCT_TYPES[i % len(PRODUCT_TYPES)]
+        adjective = rng.choice(ADJECTIVES)
+        use = rng.choice(USES)
+        yield {
+            "ProductName": f"{adjective} {product_type} {i}",
+            "SKU": f"SYN{i:07d}",
+            "Inventory": rng.randint(0, 500),
+            "Description": f"A durable {product_type.lower()} built for {use}, from the {adjective} line.",
+            "Tags": tags + [adjective],
+        }
+
+
+def synthetic_orders(count: int, product_count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Orders spread over roughly count / 3 customers, so most customers have several orders."""
+    rng = random.Random(seed + 1)
+    customers = max(1, count // 3)
+    for i in range(count):
+        customer = rng.randrange(customers)
+        status = rng.choice(STATUSES)
+        order = {
+            "CustomerName": f"Customer {customer}",
+            "Email": order_email(customer),
+            "OrderNumber": order_number(i),
+            "ProductsOrdered": [f"SYN{rng.randrange(product_count):07d}" for _ in range(rng.randint(1, 3))],
+            "Status": status,
+        }
+        if status != "fulfilled":
+            order["TrackingNumber"] = f"TRK{i:09d}"
+        yield order
+
+
+def order_email(customer: int) -> str:
+    return f"customer{customer}@example.com"
+
+
+def order_number(index: int) -> str:
+    return f"#W{index + 1:07d}"
+
+
+def write_json_list(path: Path, records: Iterable[Dict[str, Any]]) -> int:
+    """Write records as a JSON list one at a time, so large files never sit in memory as one string."""
+    count = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(record))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def write_dataset(data_dir: Path, products: int, orders: int, seed: int = 0) -> Dict[str, Path]:
+    """Write ProductCatalog.json and CustomerOrders.json into `data_dir`."""
+    files = {"catalog": data_dir / "ProductCatalog.json", "orders": data_dir / "CustomerOrders.json"}
+    write_json_list(files["catalog"], synthetic_products(products, seed))
+    write_json_list(files["orders"], synthetic_orders(orders, products, seed))
+    return files
+
+
+def seed_embedding_cache(embeddings_dir: Path, products: int, dim: int = 256, model: str = "text-embedding-3-small",
+                         seed: int = 0, chunk_size: int = 100000) -> EmbeddingCache:
+    """Fill an embedding cache for a synthetic catalog, so loading it needs no embedding requests.
+
+    The content hashes match the catalog text, so ProductEmbeddingStore treats every row
+    as current.
+    """
+    cache = EmbeddingCache(embeddings_dir, model)
+    if len(cache) == products:
+        return cache
+    vectors = synthetic_embeddings(products, dim, clusters=max(8, products // 1000), seed=seed)
+    catalog = synthetic_products(products, seed)
+    for start in range(0, products, chunk_size):
+        chunk: List[Dict[str, Any]] = [next(catalog) for _ in range(min(chunk_size, products - start))]
+        cache.append([product["SKU"] for product in chunk], vectors[start:start + len(chunk)],
+                     [content_hash(product_text(product), model) for product in chunk])
+    return cache
+
+
+def query_vectors(queries: List[str], dim: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors standing in for query embeddings."""
+    rng = np.random.default_rng(seed + 2)
+    vectors = rng.standard_normal((len(queries), dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic catalog and order history")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--output", type=Path, required=True, help="Directory receiving the JSON files")
+    parser.add_argument("--embeddings", action="store_true", help="Also seed a ProductEmbeddings cache")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = write_dataset(args.output, args.products, args.orders, args.seed)
+    if args.embeddings:
+        seed_embedding_cache(args.output / "ProductEmbeddings", args.products, args.dim, seed=args.seed)
+    print(json.dumps({name: str(path) for name, path in files.items()}, indent=2))
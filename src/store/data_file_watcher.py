@@ -0,0 +1,72 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.logger import logger
+
+
+class DataFileWatcher:
+    """Polls data files for changes and invokes a callback once each change settles.
+
+    A change is only reported after the file's (mtime, size) stays the same for one
+    full poll interval, so a file that is still being written is not reloaded half way.
+    Callbacks run on the watcher thread, one at a time.
+    """
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self._watches: List[Tuple[Path, Callable[[Path], None]]] = []
+        self._last_seen: Dict[Path, Optional[Tuple[int, int]]] = {}
+        self._pending: Dict[Path, Optional[Tuple[int, int]]] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch(self, path: Path, callback: Callable[[Path], None]) -> None:
+        """Call `callback(path)` whenever `path` changes after the watcher starts."""
+        self._watches.append((path, callback))
+        self._last_seen[path] = self._signature(path)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="data-file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self) -> None:
+        """Check every watched file once, running callbacks for settled changes."""
+        for path, callback in self._watches:
+            signature = self._signature(path)
+            if signature == self._last_seen.get(path) or signature is None:
+                self._pending.pop(path, None)
+                continue
+            # Wait until two consecutive polls agree before treating the write as complete
+            if self._pending.get(path) != signature:
+                self._pending[path] = signature
+                continue
+            del self._pending[path]
+            self._last_seen[path] = signature
+            logger.info(f"Detected change to {path}, reloading")
+            try:
+                callback(path)
+            except Exception as e:
+                logger.error(f"Error reloading {path}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            self.poll()
@@ -0,0 +1,61 @@
+import threading
+from pathlib import Path
+from typing import Optional
+
+from store.hybrid_retriever import HybridRetriever
+from store.lexical_index import LexicalIndex
+from store.order_store import OrderStore
+from store.popularity_index import PopularityIndex
+from store.product_embedding_store import ProductEmbeddingStore
+from store.product_store import ProductStore
+from utils.logger import logger
+
+
+class DataReloader:
+    """Rebuilds every derived index after the product catalog or order history changes.
+
+    Each store builds its replacement state off to the side and publishes it with a single
+    reference swap, so requests in flight keep reading a consistent snapshot and never wait
+    on a reload. Reloads themselves are serialized.
+    """
+
+    def __init__(self, product_store: ProductStore, product_embedding_store: ProductEmbeddingStore,
+                 order_store: OrderStore, product_retriever: Optional[HybridRetriever] = None,
+                 popularity_index: Optional[PopularityIndex] = None):
+        self.product_store = product_store
+        self.product_embedding_store = product_embedding_store
+        self.order_store = order_store
+        self.product_retriever = product_retriever
+        self.popularity_index = popularity_index
+        self._lock = threading.Lock()
+
+    def reload_catalog(self, path: Optional[Path] = None) -> None:
+        """Reload the product catalog and every index derived from it.
+
+        Only products whose text changed are re-embedded. If the catalog file cannot be
+        read, the previous catalog and indexes stay in service.
+        """
+        with self._lock:
+            try:
+                self.product_store.reload()
+            except Exception as e:
+                logger.error(f"Error reloading product catalog, keeping the current catalog: {e}")
+                return
+            self.product_embedding_store.reload()
+            if self.product_retriever is not None:
+                self.product_retriever.lexical_index = LexicalIndex(self.product_store)
+            if self.popularity_index is not None:
+                self.popularity_index.rebuild()
+            logger.info(f"Reloaded product catalog with {len(self.product_store.get_all_products())} products")
+
+    def reload_orders(self, path: Optional[Path] = None) -> None:
+        """Reload the order history and the popularity ranking derived from it."""
+        with self._lock:
+            try:
+                self.order_store.reload()
+            except Exception as e:
+                logger.error(f"Error reloading orders, keeping the current order history: {e}")
+                return
+            if self.popularity_index is not None:
+                self.popularity_index.rebuild()
+            logger.info("Reloaded order history")
@@ -0,0 +1,89 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+import numpy as np
+from openai import OpenAI
+
+from store.embedding_cache import EmbeddingCache
+from utils.logger import logger
+from utils.tracing import tracer
+
+
+def product_text(product: Dict[str, Any]) -> str:
+    """Text a product is embedded from."""
+    return f"{product['ProductName']} {product['Description']} {' '.join(product['Tags'])}"
+
+
+def content_hash(text: str, model: str) -> str:
+    """Identify an embedding by the model and the exact text it was computed from."""
+    return hashlib.sha256(f"{model}\n{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingBuilder:
+    """Incrementally embeds a product catalog into an EmbeddingCache.
+
+    Only products whose content hash differs from the cached row are sent to the
+    embeddings endpoint. Texts are grouped into batches, a bounded number of batches run
+    in parallel, and every finished batch is committed to the cache straight away, so an
+    interrupted build picks up where it stopped on the next run.
+    """
+
+    def __init__(self, client: OpenAI, cache: EmbeddingCache, model: str,
+                 batch_size: int = 256, max_workers: int = 4):
+        self.client = client
+        self.cache = cache
+        self.model = model
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def content_hashes(self, products: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        return {sku: content_hash(product_text(product), self.model) for sku, product in products.items()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        with tracer.span("embedding.build_batch", model=self.model, inputs=len(texts)) as span:
+            response = self.client.embeddings.create(input=texts, model=self.model)
+            span.record_usage(response.usage)
+        embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def build(self, products: Dict[str, Dict[str, Any]]) -> int:
+        """Embed every product that is missing from the cache or whose content changed.
+
+        Args:
+            products: Catalog entries keyed by SKU
+
+        Returns:
+            Number of products that were (re-)embedded
+        """
+        hashes = self.content_hashes(products)
+        cached_hashes = self.cache.content_hashes()
+        stale = [sku for sku, digest in hashes.items() if cached_hashes.get(sku) != digest]
+        if not stale:
+            return 0
+
+        batches = [stale[i:i + self.batch_size] for i in range(0, len(stale), self.batch_size)]
+        embedded = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._embed_batch, [product_text(products[sku]) for sku in batch]): batch
+                       for batch in batches}
+            # Batches are committed from this thread only, as they finish
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                    self.cache.append(batch, vectors, [hashes[sku] for sku in batch])
+                    embedded += len(batch)
+                except Exception as e:
+                    logger.error(f"Error embedding batch of {len(batch)} products: {e}")
+                    failed += len(batch)
+
+        if failed:
+            logger.error(f"Embedding build left {failed} of {len(stale)} products without an up-to-date vector")
+
+        # Drop superseded rows once they outnumber the live ones
+        if len(self.cache) > 2 * len(products):
+            self.cache.compact(keep_skus=list(products.keys()))
+
+        return embedded
@@ -0,0 +1,259 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.logger import logger
+
+
+class EmbeddingCache:
+    """Binary, append-only on-disk store of product embedding vectors.
+
+    A cache is a directory holding three files:
+        - header.json: model name, vector dimension, dtype and the committed row count
+        - vectors.f32: one contiguous block of float32 rows, memory-mapped on read
+        - manifest.txt: one "SKU<TAB>content hash" line per row, line i belongs to vector row i
+
+    Rows are only ever appended. The header is rewritten atomically after the rows and
+    manifest lines are on disk, so it acts as the commit point: anything past the
+    committed count (e.g. from an interrupted append) is ignored and overwritten by the
+    next append. When a SKU appears more than once, its latest row wins. The content hash
+    identifies the text and model a row was embedded from, so callers can tell stale rows
+    apart from current ones.
+    """
+
+    FORMAT_VERSION = 1
+    HEADER_FILE = "header.json"
+    VECTORS_FILE = "vectors.f32"
+    MANIFEST_FILE = "manifest.txt"
+    DTYPE = np.float32
+
+    def __init__(self, cache_dir: Path, model: str):
+        self.cache_dir = cache_dir
+        self.model = model
+        self._header = self._read_header()
+        self._vectors = None
+        self._skus = None
+        self._content_hashes = None
+
+    @property
+    def _header_path(self) -> Path:
+        return self.cache_dir / self.HEADER_FILE
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.cache_dir / self.VECTORS_FILE
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.cache_dir / self.MANIFEST_FILE
+
+    def _empty_header(self) -> Dict:
+        return {
+            "format_version": self.FORMAT_VERSION,
+            "model": self.model,
+            "dimension": None,
+            "dtype": np.dtype(self.DTYPE).name,
+            "count": 0,
+            "manifest_bytes": 0,
+        }
+
+    def _read_header(self) -> Dict:
+        """Read the header, starting over if it is missing or was written for another model."""
+        try:
+            with open(self._header_path, 'r') as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            return self._empty_header()
+        except Exception as e:
+            logger.error(f"Error reading embedding cache header {self._header_path}: {e}")
+            return self._empty_header()
+
+        if header.get("format_version") != self.FORMAT_VERSION or header.get("model") != self.model:
+            logger.error(f"Embedding cache {self.cache_dir} was built for model {header.get('model')}, "
+                         f"expected {self.model}; it will be rebuilt")
+            return self._empty_header()
+        if not self._files_hold(header):
+            logger.error(f"Embedding cache {self.cache_dir} is shorter than its header records; it will be rebuilt")
+            return self._empty_header()
+        return header
+
+    def _files_hold(self, header: Dict) -> bool:
+        """Whether the vectors and manifest files contain at least the rows `header` commits."""
+        if header.get("count", 0) == 0:
+            return True
+        row_bytes = header["dimension"] * np.dtype(self.DTYPE).itemsize
+        try:
+            return (self._vectors_path.stat().st_size >= header["count"] * row_bytes
+                    and self._manifest_path.stat().st_size >= header["manifest_bytes"])
+        except OSError:
+            return False
+
+    def _write_header(self, header: Dict) -> None:
+        tmp_path = self._header_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._header_path)
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._header["dimension"]
+
+    def __len__(self) -> int:
+        return self._header["count"]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All committed rows as a read-only memory map of shape (count, dimension)."""
+        if self._vectors is None:
+            count = len(self)
+            if count == 0:
+                self._vectors = np.empty((0, self.dimension or 0), dtype=self.DTYPE)
+            else:
+                self._vectors = np.memmap(self._vectors_path, dtype=self.DTYPE, mode='r',
+                                          shape=(count, self.dimension))
+        return self._vectors
+
+    def _load_manifest(self) -> None:
+        self._skus, self._content_hashes = [], []
+        if len(self) == 0:
+            return
+        with open(self._manifest_path, 'rb') as f:
+            manifest = f.read(self._header["manifest_bytes"])
+        for line in manifest.decode('utf-8').splitlines():
+            sku, _, content_hash = line.partition('\t')
+            self._skus.append(sku)
+            self._content_hashes.append(content_hash or None)
+
+    @property
+    def skus(self) -> List[str]:
+        """SKU of every committed row, in row order."""
+        if self._skus is None:
+            self._load_manifest()
+        return self._skus
+
+    def sku_rows(self) -> Dict[str, int]:
+        """Map each SKU to its most recently appended row."""
+        return {sku: row for row, sku in enumerate(self.skus)}
+
+    def content_hashes(self) -> Dict[str, Optional[str]]:
+        """Map each SKU to the content hash of its most recently appended row."""
+        if self._content_hashes is None:
+            self._load_manifest()
+        return dict(zip(self._skus, self._content_hashes))
+
+    def append(self, skus: Sequence[str], vectors: np.ndarray,
+               content_hashes: Optional[Sequence[Optional[str]]] = None) -> None:
+        """Append vectors for the given SKUs without touching existing rows.
+
+        Vectors are L2-normalized before they are written, so rows can be used for
+        cosine similarity directly.
+        """
+        if len(skus) == 0:
+            return
+
+        vectors = np.asarray(vectors, dtype=self.DTYPE)
+        if vectors.ndim != 2 or len(vectors) != len(skus):
+            raise ValueError(f"Expected {len(skus)} vectors, got array of shape {vectors.shape}")
+
+        header = dict(self._header)
+        if header["dimension"] is None:
+            header["dimension"] = int(vectors.shape[1])
+        elif vectors.shape[1] != header["dimension"]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache dimension {header['dimension']}")
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = np.ascontiguousarray(vectors / norms, dtype=self.DTYPE)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        row_bytes = header["dimension"] * np.dtype(self.DTYPE).itemsize
+        if content_hashes is None:
+            content_hashes = [None] * len(skus)
+        manifest_lines = "".join(f"{sku}\t{content_hash or ''}\n"
+                                 for sku, content_hash in zip(skus, content_hashes)).encode('utf-8')
+
+        # Write past the committed end, discarding any uncommitted tail first
+        for path, offset, payload in ((self._vectors_path, header["count"] * row_bytes, vectors.tobytes()),
+                                      (self._manifest_path, header["manifest_bytes"], manifest_lines)):
+            with open(path, 'ab') as f:
+                f.truncate(offset)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+        header["count"] += len(skus)
+        header["manifest_bytes"] += len(manifest_lines)
+        self._write_header(header)
+
+        self._header = header
+        self._vectors = None
+        if self._skus is not None:
+            self._skus = self._skus + list(skus)
+            self._content_hashes = self._content_hashes + list(content_hashes)
+
+    def compact(self, keep_skus: Optional[Sequence[str]] = None) -> None:
+        """Rewrite the cache keeping only the latest row of each SKU (optionally only `keep_skus`).
+
+        The compacted rows and manifest are written next to the originals and renamed into
+        place before the new header, so a crash while writing them leaves the old cache intact.
+        A crash between the renames leaves files shorter than the old header records, which
+        the next open detects and rebuilds from.
+        """
+        rows = self.sku_rows()
+        if keep_skus is not None:
+            rows = {sku: rows[sku] for sku in keep_skus if sku in rows}
+        # Keep row order, so a compaction that drops nothing rewrites identical files
+        skus = sorted(rows, key=rows.get)
+        hashes = self.content_hashes()
+        content_hashes = [hashes[sku] for sku in skus]
+
+        header = self._empty_header()
+        header["dimension"] = self.dimension
+        if skus:
+            vectors = np.array(self.vectors[[rows[sku] for sku in skus]], dtype=self.DTYPE)
+            manifest_lines = "".join(f"{sku}\t{content_hash or ''}\n"
+                                     for sku, content_hash in zip(skus, content_hashes)).encode('utf-8')
+            header["count"] = len(skus)
+            header["manifest_bytes"] = len(manifest_lines)
+            # Release the memory map before its file is replaced
+            self._vectors = None
+            for path, payload in ((self._vectors_path, vectors.tobytes()), (self._manifest_path, manifest_lines)):
+                tmp_path = path.with_suffix(path.suffix + ".tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+        # With nothing kept, a zero count alone empties the cache; the next append overwrites the files
+        self._write_header(header)
+
+        self._header = header
+        self._vectors = None
+        self._skus = list(skus)
+        self._content_hashes = list(content_hashes)
+
+    @classmethod
+    def migrate_from_json(cls, json_file: Path, cache_dir: Path, model: str,
+                          content_hashes: Optional[Dict[str, str]] = None) -> "EmbeddingCache":
+        """One-shot conversion of a legacy {sku: [floats]} JSON embeddings file.
+
+        The legacy file does not record what text each vector came from. `content_hashes`
+        stamps the migrated rows with the hashes of the catalog the file was built from.
+        """
+        cache = cls(cache_dir, model)
+        if len(cache) > 0:
+            return cache
+
+        with open(json_file, 'r') as f:
+            embeddings = json.load(f)
+        if embeddings:
+            skus = list(embeddings.keys())
+            hashes = [content_hashes.get(sku) for sku in skus] if content_hashes else None
+            cache.append(skus, np.asarray(list(embeddings.values()), dtype=cls.DTYPE), hashes)
+        logger.info(f"Migrated {len(embeddings)} embeddings from {json_file} to {cache_dir}")
+        return cache
@@ -0,0 +1,92 @@
+import threading
+from typing import Dict, List, Tuple
+
+from store.lexical_index import LexicalIndex, tokenize
+from store.product_embedding_store import ProductEmbeddingStore
+from utils.logger import logger
+
+
+class HybridRetriever:
+    """Combines BM25 lexical matches with embedding similarity to pick candidate products.
+
+    Short queries whose every term appears in a product's name or tags (e.g. "Backpack",
+    "Skis") are answered from the lexical index alone, without embedding the query. All
+    other queries fuse both rankings: each side's scores are scaled to [0, 1] over its
+    candidate pool and combined with `lexical_weight`.
+    """
+
+    def __init__(self, lexical_index: LexicalIndex, product_embedding_store: ProductEmbeddingStore,
+                 lexical_weight: float = 0.3, candidate_pool: int = 20, fast_path_max_terms: int = 3):
+        self.lexical_index = lexical_index
+        self.product_embedding_store = product_embedding_store
+        self.lexical_weight = lexical_weight
+        self.candidate_pool = candidate_pool
+        self.fast_path_max_terms = fast_path_max_terms
+        self._lock = threading.Lock()
+        self._stats = {"fast_path": 0, "hybrid": 0}
+
+    def _fast_path(self, query: str, lexical: List[Tuple[str, float]], top_k: int) -> List[str]:
+        """SKUs that match every query term in their name or tags, best BM25 first."""
+        if not lexical or len(set(tokenize(query))) > self.fast_path_max_terms:
+            return []
+        coverage = self.lexical_index.title_coverage(query, lexical)
+        return [sku for (sku, _), covered in zip(lexical, coverage) if covered == 1.0][:top_k]
+
+    @staticmethod
+    def _scale(results: List[Tuple[str, float]]) -> Dict[str, float]:
+        if not results:
+            return {}
+        scores = [score for _, score in results]
+        low, high = min(scores), max(scores)
+        spread = (high - low) or 1.0
+        return {sku: (score - low) / spread if high > low else 1.0 for sku, score in results}
+
+    def _lexical_stage(self, query: str, top_k: int) -> Tuple[List[Tuple[str, float]], List[str]]:
+        """Lexical candidates for the query, and the fast-path answer if it applies."""
+        lexical = self.lexical_index.search(query, self.candidate_pool)
+        fast = self._fast_path(query, lexical, top_k)
+        with self._lock:
+            self._stats["fast_path" if fast else "hybrid"] += 1
+        return lexical, fast
+
+    def _fuse(self, lexical: List[Tuple[str, float]], vector: List[Tuple[str, float]], top_k: int) -> List[str]:
+        lexical_scores = self._scale(lexical)
+        vector_scores = self._scale(vector)
+        fused = {sku: self.lexical_weight * lexical_scores.get(sku, 0.0)
+                 + (1 - self.lexical_weight) * vector_scores.get(sku, 0.0)
+                 for sku in lexical_scores.keys() | vector_scores.keys()}
+        return sorted(fused, key=fused.get, reverse=True)[:top_k]
+
+    def retrieve(self, query: str, top_k: int = 3) -> List[str]:
+        """Return the SKUs of the `top_k` best candidates for a preference query."""
+        lexical, fast = self._lexical_stage(query, top_k)
+        if fast:
+            return fast
+
+        try:
+            vector = self.product_embedding_store.get_top_k_similar_skus(query, self.candidate_pool)
+        except Exception as e:
+            if not lexical:
+                raise
+            logger.error(f"Error in vector retrieval, using lexical matches only: {e}")
+            vector = []
+        return self._fuse(lexical, vector, top_k)
+
+    async def retrieve_async(self, query: str, top_k: int = 3) -> List[str]:
+        """Async variant of `retrieve`; only the query embedding request is awaited."""
+        lexical, fast = self._lexical_stage(query, top_k)
+        if fast:
+            return fast
+
+        try:
+            vector = await self.product_embedding_store.get_top_k_similar_skus_async(query, self.candidate_pool)
+        except Exception as e:
+            if not lexical:
+                raise
+            logger.error(f"Error in vector retrieval, using lexical matches only: {e}")
+            vector = []
+        return self._fuse(lexical, vector, top_k)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
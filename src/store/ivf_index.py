@@ -0,0 +1,151 @@
+import hashlib
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.logger import logger
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the `top_k` highest scores along the last axis, best first."""
+    count = scores.shape[-1]
+    top_k = min(top_k, count)
+    if top_k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if top_k < count:
+        # argpartition selects the top-k in O(N), only those k get sorted
+        candidates = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+    else:
+        candidates = np.broadcast_to(np.arange(count), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1)
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def fingerprint(skus: Sequence[str], rows: Sequence[int]) -> str:
+    """Identify the exact rows an index was built over.
+
+    A re-embedded product is appended to the cache under a new row, so including the
+    cache row of each SKU makes the fingerprint change whenever any vector does.
+    """
+    digest = hashlib.sha256()
+    for sku, row in zip(skus, rows):
+        digest.update(f"{sku}\t{row}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over unit-length vectors.
+
+    Rows are clustered with spherical k-means into `n_lists` coarse cells. A query only
+    scores the rows of its `n_probe` closest cells, so the cost per query drops from
+    O(N·d) to roughly O((n_lists + N·n_probe/n_lists)·d). Raising `n_probe` trades
+    latency for recall; `n_probe == n_lists` is an exact search.
+    """
+
+    def __init__(self, matrix: np.ndarray, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray,
+                 n_probe: int = 8):
+        self.matrix = matrix
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def default_n_lists(count: int) -> int:
+        return max(1, min(count, int(np.sqrt(count))))
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+            assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8, n_iter: int = 20,
+              max_train_rows: int = 256, seed: int = 0) -> "IVFIndex":
+        """Train coarse centroids with spherical k-means and bucket every row.
+
+        Args:
+            matrix: (N, d) unit-length float32 rows
+            n_lists: Number of coarse cells, defaults to sqrt(N)
+            n_probe: Default number of cells scored per query
+            n_iter: k-means iterations
+            max_train_rows: Training sample size per cell, bounds build time on large catalogs
+            seed: Seed for sampling and centroid initialisation
+        """
+        count = len(matrix)
+        n_lists = min(n_lists or cls.default_n_lists(count), count)
+        rng = np.random.default_rng(seed)
+
+        train_size = min(count, n_lists * max_train_rows)
+        train_rows = np.sort(rng.choice(count, size=train_size, replace=False))
+        train = np.asarray(matrix[train_rows], dtype=np.float32)
+
+        centroids = train[rng.choice(train_size, size=n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = cls._assign(train, centroids)
+            counts = np.bincount(assignments, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            by_cell = np.argsort(assignments, kind='stable')
+            occupied = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts[occupied])[:-1]))
+            sums[occupied] = np.add.reduceat(train[by_cell], starts, axis=0)
+            # Re-seed empty cells with random training rows
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = train[rng.choice(train_size, size=int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assignments = cls._assign(matrix, centroids)
+        order = np.argsort(assignments, kind='stable')
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=offsets[1:])
+        return cls(matrix, centroids, order, offsets, n_probe)
+
+    def search(self, queries: np.ndarray, top_k: int, n_probe: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Approximate top-k search for unit-length queries.
+
+        Returns:
+            One (row indices, scores) pair per query, best match first
+        """
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = top_k_indices(queries @ self.centroids.T, n_probe)
+
+        results = []
+        for query, cells in zip(queries, probes):
+            candidates = np.concatenate([self.order[self.offsets[cell]:self.offsets[cell + 1]] for cell in cells])
+            candidates.sort()
+            scores = self.matrix[candidates] @ query
+            best = top_k_indices(scores, top_k)
+            results.append((candidates[best], scores[best]))
+        return results
+
+    def save(self, path: Path, layout_fingerprint: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                 fingerprint=np.array(layout_fingerprint))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray, layout_fingerprint: str, n_probe: int = 8) -> Optional["IVFIndex"]:
+        """Load a saved index, or return None if it is missing or was built over different rows."""
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != layout_fingerprint:
+                    return None
+                return cls(matrix, data["centroids"], data["order"], data["offsets"], n_probe)
+        except Exception as e:
+            logger.error(f"Error loading IVF index {path}: {e}")
+            return None
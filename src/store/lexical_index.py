@@ -0,0 +1,96 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from store.ivf_index import top_k_indices
+from store.product_store import ProductStore
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset({
+    "a", "an", "and", "any", "are", "as", "at", "be", "best", "for", "from", "good", "i", "in", "is", "it",
+    "looking", "me", "my", "need", "new", "of", "on", "or", "some", "something", "the", "to", "want", "with",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words, with a naive plural strip ("skis" -> "ski")."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """BM25 inverted index over product names, descriptions and tags.
+
+    Term frequencies are field-weighted (BM25F style) so a match in the product name or
+    tags counts for more than the same word in the description.
+    """
+
+    FIELD_WEIGHTS = {"ProductName": 3.0, "Tags": 2.0, "Description": 1.0}
+
+    def __init__(self, product_store: ProductStore, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._build(product_store.get_all_products())
+
+    def _build(self, products: Dict[str, Dict]) -> None:
+        self._skus = list(products.keys())
+        self._positions = {sku: doc_id for doc_id, sku in enumerate(self._skus)}
+        self._title_terms: List[Set[str]] = []
+        doc_lengths = np.zeros(len(self._skus), dtype=np.float32)
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+
+        for doc_id, product in enumerate(products.values()):
+            weighted_tf: Counter = Counter()
+            fields = {"ProductName": product.get("ProductName", ""),
+                      "Tags": " ".join(product.get("Tags", [])),
+                      "Description": product.get("Description", "")}
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    weighted_tf[token] += self.FIELD_WEIGHTS[field]
+            for term, tf in weighted_tf.items():
+                postings[term].append((doc_id, tf))
+            doc_lengths[doc_id] = sum(weighted_tf.values())
+            self._title_terms.append(set(tokenize(fields["ProductName"] + " " + fields["Tags"])))
+
+        count = len(self._skus)
+        average_length = float(doc_lengths.mean()) if count else 0.0
+        self._length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / (average_length or 1.0))
+        self._postings = {}
+        for term, entries in postings.items():
+            doc_ids = np.fromiter((doc_id for doc_id, _ in entries), dtype=np.int64, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = np.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            self._postings[term] = (doc_ids, tfs, float(idf))
+
+    def __len__(self) -> int:
+        return len(self._skus)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """BM25 top-k for a query as (sku, score) pairs, best first."""
+        terms = [term for term in set(tokenize(query)) if term in self._postings]
+        if not terms or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self._skus), dtype=np.float32)
+        for term in terms:
+            doc_ids, tfs, idf = self._postings[term]
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + self._length_norm[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        best = matched[top_k_indices(scores[matched], top_k)]
+        return [(self._skus[doc_id], float(scores[doc_id])) for doc_id in best]
+
+    def title_coverage(self, query: str, sku_results: List[Tuple[str, float]]) -> List[float]:
+        """Fraction of query terms found in each result's name or tags."""
+        terms = set(tokenize(query))
+        if not terms:
+            return [0.0] * len(sku_results)
+        return [len(terms & self._title_terms[self._positions[sku]]) / len(terms) for sku, _ in sku_results]
@@ -0,0 +1,82 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from store.order_backend import OrderBackend, order_key
+from store.order_stream import iter_json_records
+
+
+class InMemoryOrderBackend(OrderBackend):
+    """Keeps every order in memory behind normalized hash indexes."""
+
+    def __init__(self, orders: Iterable[Dict[str, Any]]):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._orders: List[Dict[str, Any]] = []
+        self._by_email_and_number: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._by_email: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_number: Dict[str, Dict[str, Any]] = {}
+        # Position of each indexed order in self._orders, so updates replace it in place
+        self._positions: Dict[Tuple[str, str], int] = {}
+
+        # Later duplicates win in the indexes
+        for order in orders:
+            self._orders.append(order)
+            self._index_order(order, len(self._orders) - 1)
+
+    def _index_order(self, order: Dict[str, Any], position: int) -> None:
+        email, order_number = order_key(order)
+        self._by_email_and_number[(email, order_number)] = order
+        self._positions[(email, order_number)] = position
+        self._by_email.setdefault(email, {})[order_number] = order
+        self._by_number[order_number] = order
+
+    def _unindex_order(self, order: Dict[str, Any]) -> None:
+        email, order_number = order_key(order)
+        self._by_email_and_number.pop((email, order_number), None)
+        self._positions.pop((email, order_number), None)
+        customer_orders = self._by_email.get(email, {})
+        customer_orders.pop(order_number, None)
+        if not customer_orders:
+            self._by_email.pop(email, None)
+        if self._by_number.get(order_number) is order:
+            del self._by_number[order_number]
+
+    def reload(self, source_file: Path) -> "InMemoryOrderBackend":
+        # A fresh backend, fully indexed before the caller publishes it
+        return InMemoryOrderBackend(iter_json_records(source_file, "orders"))
+
+    def iter_orders(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._orders)
+
+    def add_order(self, order: Dict[str, Any]) -> None:
+        with self._lock:
+            if order_key(order) in self._by_email_and_number:
+                raise ValueError(f"Order {order.get('OrderNumber')} already exists for {order.get('Email')}")
+            self._orders.append(order)
+            self._index_order(order, len(self._orders) - 1)
+
+    def update_order(self, email: str, order_number: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            key = (email, order_number)
+            order = self._by_email_and_number.get(key)
+            if order is None:
+                return None
+            updated = {**order, **changes}
+            if order_key(updated) != key and order_key(updated) in self._by_email_and_number:
+                raise ValueError(f"Order {updated.get('OrderNumber')} already exists for {updated.get('Email')}")
+            position = self._positions[key]
+            self._unindex_order(order)
+            # Replace rather than mutate so concurrent readers see either the old or the new order
+            self._orders[position] = updated
+            self._index_order(updated, position)
+            return updated
+
+    def find_by_email_and_number(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        return self._by_email_and_number.get((email, order_number))
+
+    def find_by_email(self, email: str) -> List[Dict[str, Any]]:
+        return list(self._by_email.get(email, {}).values())
+
+    def find_by_number(self, order_number: str) -> Optional[Dict[str, Any]]:
+        return self._by_number.get(order_number)
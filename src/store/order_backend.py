@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def normalize_email(email: str) -> str:
+    return (email or '').strip().lower()
+
+
+def normalize_order_number(order_number: str) -> str:
+    # Normalize order number format (add # if not present)
+    order_number = (order_number or '').strip().upper()
+    if order_number and not order_number.startswith('#'):
+        order_number = f"#{order_number}"
+    return order_number
+
+
+def order_key(order: Dict[str, Any]) -> Tuple[str, str]:
+    """Normalized (email, order number) identifying an order."""
+    return normalize_email(order.get('Email', '')), normalize_order_number(order.get('OrderNumber', ''))
+
+
+class OrderBackend:
+    """Storage behind OrderStore. Lookups receive already normalized keys."""
+
+    def __init__(self):
+        pass
+
+    def iter_orders(self) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def add_order(self, order: Dict[str, Any]) -> None:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def update_order(self, email: str, order_number: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def find_by_email_and_number(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def find_by_email(self, email: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def find_by_number(self, order_number: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def reload(self, source_file: Path) -> "OrderBackend":
+        """Load `source_file` again and return the backend to serve from afterwards."""
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def close(self) -> None:
+        pass
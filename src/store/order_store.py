@@ -1,55 +1,127 @@
-import json
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
+from store.memory_order_backend import InMemoryOrderBackend
+from store.order_backend import OrderBackend, normalize_email, normalize_order_number
+from store.order_stream import iter_json_records
 from utils.logger import logger
 
 
 class OrderStore:
     
-    def __init__(self, orders_file: Path):
+    def __init__(self, orders_file: Path, backend: Optional[OrderBackend] = None):
+        """Initialize the order store.
+
+        Args:
+            orders_file: JSON file of customer orders
+            backend: Storage to serve orders from. Defaults to an in-memory backend
+                streamed from `orders_file`; pass a SqliteOrderBackend for a constant
+                memory footprint on large order histories.
+        """
         
         self._orders_file = orders_file
         
         # Load data into cache
-        self._orders = self._load_data(self._orders_file, "orders")
+        self._backend = backend if backend is not None else InMemoryOrderBackend(self._load_data(self._orders_file, "orders"))
+
+        # Callbacks notified of every order added after loading
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        # Orders added or updated at runtime, in order. The source file does not contain them,
+        # so they are replayed onto every reloaded backend.
+        self._write_lock = threading.Lock()
+        self._runtime_writes: List[Tuple[str, tuple]] = []
     
-    def _load_data(self, file_path: Path, data_type: str) -> List[Dict[str, Any]]:
-        """Load data from JSON file."""
+    def reload(self) -> None:
+        """Reload orders from the source file and swap the backend in atomically.
+
+        Runtime writes are replayed onto the reloaded orders first, so they survive the
+        reload. An added order the file now contains is kept as the file has it.
+        """
+        backend = self._backend.reload(self._orders_file)
+        with self._write_lock:
+            self._replay_runtime_writes(backend)
+            self._backend = backend
+
+    def _replay_runtime_writes(self, backend: OrderBackend) -> None:
+        for kind, args in self._runtime_writes:
+            try:
+                if kind == "add":
+                    backend.add_order(*args)
+                elif backend.update_order(*args) is None:
+                    logger.info(f"Order {args[1]} for {args[0]} is no longer in {self._orders_file}, update not replayed")
+            except ValueError:
+                # The file caught up with this write
+                pass
+
+    def _load_data(self, file_path: Path, data_type: str) -> Iterator[Dict[str, Any]]:
+        """Stream records from a JSON file, one order at a time."""
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                # If the file is a direct array, return it directly
-                if isinstance(data, list):
-                    return data
-                # If it's an object with a key matching data_type, return that
-                return data.get(data_type, [])
+            yield from iter_json_records(file_path, data_type)
         except Exception as e:
             logger.error(f"Error loading data from {file_path}: {e}")
-            return []
-    
+
+    @staticmethod
+    def _to_order_summary(order: Dict[str, Any]) -> Dict[str, Any]:
+        # Create a response with tracking link if available
+        tracking_number = order.get('TrackingNumber')
+        tracking_link = None
+        if tracking_number:
+            tracking_link = f"https://tools.usps.com/go/TrackConfirmAction?tLabels={tracking_number}"
+        
+        return {
+            'OrderNumber': order.get('OrderNumber'),
+            'Status': order.get('Status'),
+            'TrackingNumber': tracking_number,
+            'TrackingLink': tracking_link
+        }
+
+    def iter_orders(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every stored order."""
+        return self._backend.iter_orders()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback invoked with each newly added order."""
+        self._listeners.append(listener)
+
+    def add_order(self, order: Dict[str, Any]) -> None:
+        """Add a new order and notify listeners."""
+        with self._write_lock:
+            self._backend.add_order(order)
+            self._runtime_writes.append(("add", (order,)))
+        for listener in self._listeners:
+            try:
+                listener(order)
+            except Exception as e:
+                logger.error(f"Error notifying order listener: {e}")
+
+    def update_order(self, email: str, order_number: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply field changes to an existing order, re-indexing it if its email or number changes.
+
+        Returns:
+            The updated order, or None if no such order exists
+        """
+        args = (normalize_email(email), normalize_order_number(order_number), changes)
+        with self._write_lock:
+            updated = self._backend.update_order(*args)
+            if updated is not None:
+                self._runtime_writes.append(("update", args))
+        return updated
+
     def get_order_by_email_and_number(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
         """Find an order by customer email and order number."""
         try:
-            # Normalize order number format (add # if not present)
-            if order_number and not order_number.startswith('#'):
-                order_number = f"#{order_number}"
-            
-            for order in self._orders:
-                if (order.get('Email', '').lower() == email.lower() and 
-                    order.get('OrderNumber', '').upper() == order_number.upper()):
-                    # Create a response with tracking link if available
-                    tracking_number = order.get('TrackingNumber')
-                    tracking_link = None
-                    if tracking_number:
-                        tracking_link = f"https://tools.usps.com/go/TrackConfirmAction?tLabels={tracking_number}"
-                    
-                    return {
-                        'OrderNumber': order.get('OrderNumber'),
-                        'Status': order.get('Status'),
-                        'TrackingNumber': tracking_number,
-                        'TrackingLink': tracking_link
-                    }
-            return None
+            order = self._backend.find_by_email_and_number(normalize_email(email), normalize_order_number(order_number))
+            return self._to_order_summary(order) if order else None
         except Exception as e:
             logger.error(f"Error looking up order for email {email} and order number {order_number}: {e}")
             raise
+
+    def get_orders_by_email(self, email: str) -> List[Dict[str, Any]]:
+        """Find all orders placed with a customer email."""
+        return [self._to_order_summary(order) for order in self._backend.find_by_email(normalize_email(email))]
+
+    def get_order_by_number(self, order_number: str) -> Optional[Dict[str, Any]]:
+        """Find an order by order number alone."""
+        order = self._backend.find_by_number(normalize_order_number(order_number))
+        return self._to_order_summary(order) if order else None
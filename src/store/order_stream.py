@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+# Characters that can continue a JSON number
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class _JSONStreamReader:
+    """Incremental reader that decodes one JSON value at a time from a text file."""
+
+    def __init__(self, file: TextIO, chunk_size: int):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Read another chunk, returning False at end of file."""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # Drop the consumed prefix so the buffer stays around one chunk in size
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it, "" at end of file."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def next_char(self) -> str:
+        char = self.peek()
+        self._pos += 1
+        return char
+
+    def expect(self, expected: str) -> None:
+        char = self.next_char()
+        if char != expected:
+            raise ValueError(f"Expected '{expected}' but found '{char}'")
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number followed by the buffer edge or by more number characters may be
+                # truncated, e.g. "20" of "20.25" split after the digits
+                complete = end < len(self._buffer) and self._buffer[end] not in _NUMBER_CHARS
+                if complete or self._eof or not self._fill():
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+
+def _iter_array(reader: _JSONStreamReader) -> Iterator[Any]:
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.next_char()
+        return
+    while True:
+        yield reader.decode_value()
+        char = reader.next_char()
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError(f"Expected ',' or ']' but found '{char}'")
+
+
+def iter_json_records(file_path: Path, data_type: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Stream the records of a JSON file without loading the whole document.
+
+    Accepts either a top-level array of records, or an object whose `data_type` key holds
+    the array (other keys are skipped). Only one record is held in memory at a time.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = _JSONStreamReader(f, chunk_size)
+        first = reader.peek()
+        if first == '[':
+            yield from _iter_array(reader)
+            return
+        if first != '{':
+            raise ValueError(f"Expected a JSON array or object in {file_path}")
+
+        reader.next_char()
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.decode_value()
+            reader.expect(':')
+            if key == data_type and reader.peek() == '[':
+                yield from _iter_array(reader)
+            else:
+                reader.decode_value()
+            char = reader.next_char()
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '}}' but found '{char}'")
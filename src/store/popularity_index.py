@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from store.order_backend import order_key
+from store.order_store import OrderStore
+from store.product_store import ProductStore
+from utils.logger import logger
+
+
+class PopularityIndex:
+    """Products ranked by how often they were ordered, kept up to date as orders arrive.
+
+    Each SKU in an order's ProductsOrdered adds the order's weight to that SKU's score.
+    With a half-life, weights use forward decay: an order at time t weighs
+    2 ** ((t - t0) / half_life), so newer orders count for more and the relative order
+    of existing scores never has to be recomputed. Before weights overflow, every score
+    is divided by the newest weight and t0 moves to that order's time. Orders without an
+    "OrderDate" are stamped once with the time they were first seen, so rebuilds weigh
+    them the same.
+
+    The ranking is a precomputed list covering the whole catalog, best first. A new
+    order only moves the affected SKUs up, and top-N reads the head of the list,
+    skipping products that are out of stock.
+    """
+
+    # Rescale weights before they overflow float64
+    _RESCALE_THRESHOLD = 1e100
+
+    def __init__(self, product_store: ProductStore, order_store: OrderStore,
+                 half_life_days: Optional[float] = None, in_stock_only: bool = True):
+        self.product_store = product_store
+        self.order_store = order_store
+        self.half_life_seconds = half_life_days * 86400 if half_life_days else None
+        self.in_stock_only = in_stock_only
+        self._lock = threading.Lock()
+        # t0 of the live scores' weights
+        self._reference_time = time.time()
+        self._undated_order_times: Dict[Tuple[str, str], float] = {}
+        # Orders recorded while a rebuild runs, by key; None when no rebuild is running
+        self._recorded_during_rebuild: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+
+        self._scores, self._ranked, self._positions, self._reference_time = self._compute_ranking()
+        order_store.add_listener(self.record_order)
+
+    def _compute_ranking(self, counted: Optional[Set[Tuple[str, str]]] = None
+                         ) -> Tuple[Dict[str, float], List[str], Dict[str, int], float]:
+        """Score every catalog product from the full order history.
+
+        Returns the scores, the ranking, each SKU's position and the reference time of the
+        scores' weights. Keys of orders recorded during a rebuild that the history already
+        contains are added to `counted`.
+        """
+        scores = {sku: 0.0 for sku in self.product_store.get_all_products()}
+        reference_time = self._reference_time
+        for order in self.order_store.iter_orders():
+            _, reference_time = self._add_scores(scores, order, reference_time)
+            if counted is not None and self._recorded_during_rebuild:
+                key = order_key(order)
+                if key in self._recorded_during_rebuild:
+                    counted.add(key)
+        # Stable sort: catalog order breaks ties between equally popular products
+        ranked = sorted(scores, key=lambda sku: -scores[sku])
+        return scores, ranked, {sku: position for position, sku in enumerate(ranked)}, reference_time
+
+    def rebuild(self) -> None:
+        """Recompute the ranking after the catalog or order history was reloaded.
+
+        The new ranking is built without holding the lock and published in one step.
+        Orders recorded in the meantime are replayed onto it unless the rebuild already
+        counted them, so none are lost.
+        """
+        with self._lock:
+            self._recorded_during_rebuild = {}
+        counted: Set[Tuple[str, str]] = set()
+        try:
+            scores, ranked, positions, reference_time = self._compute_ranking(counted)
+        except Exception:
+            with self._lock:
+                self._recorded_during_rebuild = None
+            raise
+        with self._lock:
+            self._scores, self._ranked, self._positions = scores, ranked, positions
+            self._reference_time = reference_time
+            for key, order in self._recorded_during_rebuild.items():
+                if key not in counted:
+                    self._record(order)
+            self._recorded_during_rebuild = None
+
+    def _order_time(self, order: Dict[str, Any]) -> float:
+        if order.get("OrderDate"):
+            try:
+                return datetime.fromisoformat(order["OrderDate"]).timestamp()
+            except ValueError:
+                logger.error(f"Invalid OrderDate {order['OrderDate']} on order {order.get('OrderNumber')}")
+        return self._undated_order_times.setdefault(order_key(order), time.time())
+
+    def _add_scores(self, scores: Dict[str, float], order: Dict[str, Any],
+                    reference_time: float) -> Tuple[List[str], float]:
+        """Add `order` to `scores`, whose weights are relative to `reference_time`.
+
+        Returns the SKUs whose score changed and the reference time of the scores afterwards.
+        """
+        weight = 1.0
+        if self.half_life_seconds is not None:
+            order_time = self._order_time(order)
+            weight = 2.0 ** ((order_time - reference_time) / self.half_life_seconds)
+            if weight > self._RESCALE_THRESHOLD:
+                # Dividing by this order's weight moves t0 to its time, every ratio and so the ranking is unchanged
+                for sku in scores:
+                    scores[sku] /= weight
+                reference_time = order_time
+                weight = 1.0
+        skus = [sku for sku in order.get("ProductsOrdered", []) if sku in scores]
+        for sku in skus:
+            scores[sku] += weight
+        return skus, reference_time
+
+    def _record(self, order: Dict[str, Any]) -> None:
+        skus, self._reference_time = self._add_scores(self._scores, order, self._reference_time)
+        for sku in skus:
+            self._move_up(sku)
+
+    def _move_up(self, sku: str) -> None:
+        """Restore the ranking after `sku`'s score increased, in O(positions moved)."""
+        position = self._positions[sku]
+        score = self._scores[sku]
+        while position > 0 and self._scores[self._ranked[position - 1]] < score:
+            above = self._ranked[position - 1]
+            self._ranked[position] = above
+            self._positions[above] = position
+            position -= 1
+        self._ranked[position] = sku
+        self._positions[sku] = position
+
+    def record_order(self, order: Dict[str, Any]) -> None:
+        """Count a newly placed order."""
+        with self._lock:
+            self._record(order)
+            if self._recorded_during_rebuild is not None:
+                self._recorded_during_rebuild[order_key(order)] = order
+
+    def get_top_skus(self, limit: int = 3) -> List[str]:
+        """SKUs of the `limit` most popular products, best first."""
+        top = []
+        with self._lock:
+            for sku in self._ranked:
+                if len(top) == limit:
+                    break
+                if self.in_stock_only and self.product_store.get_inventory(sku) <= 0:
+                    continue
+                top.append(sku)
+        return top
@@ -1,76 +1,312 @@
-import json
-from openai import OpenAI
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 
+from store.embedding_builder import EmbeddingBuilder, content_hash, product_text
+from store.embedding_cache import EmbeddingCache
+from store.ivf_index import IVFIndex, fingerprint, top_k_indices
 from store.product_store import ProductStore
+from store.quantization import QuantizedMatrix
+from store.query_embedding_cache import QueryEmbeddingCache, normalize_query
 from utils.logger import logger
+from utils.openai_client_factory import OpenAIClientFactory
+from utils.tracing import tracer
+from utils.upstream_scheduler import UpstreamScheduler
+
+
+class _SearchIndex:
+    """Immutable search state built from one version of the catalog and cache.
+
+    The store publishes a new instance with a single reference assignment, so a search
+    always runs against one consistent snapshot while a rebuild is in progress.
+    """
+
+    def __init__(self, skus: np.ndarray, rows: np.ndarray, vectors: np.ndarray, matrix: Optional[np.ndarray],
+                 quantized: Optional[QuantizedMatrix], ivf_index: Optional[IVFIndex]):
+        self.skus = skus
+        self.rows = rows
+        # Full-precision cache rows as mapped at build time, stays valid if the cache is compacted later
+        self.vectors = vectors
+        self.matrix = matrix
+        self.quantized = quantized
+        self.ivf_index = ivf_index
 
 
 class ProductEmbeddingStore:
-    def __init__(self, product_store: ProductStore, embeddings_file: Path,
-                 model: str = "text-embedding-3-small"):
+    INDEX_MODES = ("exact", "ivf")
+    QUANTIZATION_MODES = ("none",) + QuantizedMatrix.MODES
+    IVF_INDEX_FILE = "ivf.npz"
+
+    def __init__(self, product_store: ProductStore, embeddings_dir: Path,
+                 model: str = "text-embedding-3-small", legacy_embeddings_file: Optional[Path] = None,
+                 query_cache: Optional[QueryEmbeddingCache] = None, index_mode: str = "exact",
+                 ivf_n_lists: Optional[int] = None, ivf_n_probe: int = 8, quantization: str = "none",
+                 rerank_factor: int = 10, client_factory: Optional[OpenAIClientFactory] = None,
+                 upstream_scheduler: Optional[UpstreamScheduler] = None):
+        """
+        Args:
+            product_store: Catalog the embeddings are built from
+            embeddings_dir: Directory of the binary embedding cache
+            model: Embedding model name
+            legacy_embeddings_file: JSON embeddings file migrated into the cache on first start
+            query_cache: Cache for customer query embeddings
+            index_mode: "exact" scores every product, "ivf" uses an approximate inverted-file index
+            ivf_n_lists: Number of IVF cells, defaults to sqrt(number of products)
+            ivf_n_probe: IVF cells scored per query, higher is slower with better recall
+            quantization: Keep "float16" or "int8" vectors in memory for exact search and re-rank
+                the best candidates against the full-precision cache on disk, or "none"
+            rerank_factor: Candidates re-ranked at full precision, as a multiple of top_k
+            client_factory: Source of the shared OpenAI clients, defaults to the process-wide factory
+            upstream_scheduler: Optional rate limiter; query embeddings are admitted as interactive
+                calls and catalog embedding builds as background calls
+        """
+        if index_mode not in self.INDEX_MODES:
+            raise ValueError(f"Unknown index mode: {index_mode}")
+        if quantization not in self.QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        if index_mode == "ivf" and quantization != "none":
+            raise ValueError("Quantization is only supported with the exact index mode")
 
         self.product_store = product_store
         self.model = model
-        self.client = OpenAI()
-        self.embeddings_file = embeddings_file
-        self.product_embeddings = self._generate_embeddings()
+        client_factory = client_factory or OpenAIClientFactory.shared()
+        self.client = client_factory.client()
+        # Used by the *_async methods so the async agent never blocks its event loop on the API
+        self.async_client = client_factory.async_client()
+        self._build_client = self.client
+        if upstream_scheduler is not None:
+            self.client = upstream_scheduler.bind(self.client, "interactive")
+            self.async_client = upstream_scheduler.bind(self.async_client, "interactive")
+            self._build_client = upstream_scheduler.bind(self._build_client, "background")
+        self.query_cache = query_cache or QueryEmbeddingCache(model)
+        self.embeddings_dir = embeddings_dir
+        self.embedding_cache = self._open_cache(embeddings_dir, legacy_embeddings_file)
+        self.index_mode = index_mode
+        self.ivf_n_lists = ivf_n_lists
+        self.ivf_n_probe = ivf_n_probe
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+
+        self._generate_embeddings()
+        self._index = self._build_search_index()
+
+    def reload(self) -> None:
+        """Re-embed changed catalog products and atomically publish a new search index.
+
+        Only products whose text changed since they were cached are sent to the embedding
+        API. Searches keep using the previous index until the new one is complete.
+        """
+        self._generate_embeddings()
+        self._index = self._build_search_index()
+
+    def _open_cache(self, embeddings_dir: Path, legacy_embeddings_file: Optional[Path]) -> EmbeddingCache:
+        cache = EmbeddingCache(embeddings_dir, self.model)
+        if len(cache) == 0 and legacy_embeddings_file is not None and legacy_embeddings_file.exists():
+            try:
+                # The legacy file was built from the current catalog text
+                content_hashes = {sku: content_hash(product_text(product), self.model)
+                                  for sku, product in self.product_store.get_all_products().items()}
+                cache = EmbeddingCache.migrate_from_json(legacy_embeddings_file, embeddings_dir, self.model,
+                                                         content_hashes)
+            except Exception as e:
+                logger.error(f"Error migrating embeddings file {legacy_embeddings_file}: {e}")
+        return cache
 
     def _get_embedding(self, text: str) -> List[float]:
         """Get embedding vector from OpenAI text-embedding-3-small model."""
         try:
-            response = self.client.embeddings.create(input=[text], model=self.model)
+            with tracer.span("embedding", model=self.model, inputs=1) as span:
+                response = self.client.embeddings.create(input=[text], model=self.model)
+                span.record_usage(response.usage)
             return response.data[0].embedding
         except Exception as e:
             logger.error(f"Error getting embedding: {e}")
             raise
 
-    def _cosine_similarity(self, a: List[float], b: List[float]) -> float:
-        
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-    def _generate_embeddings(self) -> Dict[str, List[float]]:
+    async def _get_embedding_async(self, text: str) -> List[float]:
+        """Async variant of `_get_embedding`."""
+        try:
+            with tracer.span("embedding", model=self.model, inputs=1) as span:
+                response = await self.async_client.embeddings.create(input=[text], model=self.model)
+                span.record_usage(response.usage)
+            return response.data[0].embedding
+        except Exception as e:
+            logger.error(f"Error getting embedding: {e}")
+            raise
 
+    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get embedding vectors for several texts in a single request."""
         try:
-            with open(self.embeddings_file, 'r') as f:
-                embeddings = json.load(f)
+            with tracer.span("embedding", model=self.model, inputs=len(texts)) as span:
+                response = self.client.embeddings.create(input=texts, model=self.model)
+                span.record_usage(response.usage)
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
         except Exception as e:
-            logger.error(f"Error loading embeddings file: {e}")
-            self.embeddings_file.parent.mkdir(parents=True, exist_ok=True)
-            embeddings = {}
+            logger.error(f"Error getting embeddings: {e}")
+            raise
+
+    def _get_query_embedding(self, query: str) -> np.ndarray:
+        """Embedding of a customer query, served from the query cache when possible."""
+        return self.query_cache.get_or_compute(query, self._get_embedding)
+
+    async def _get_query_embedding_async(self, query: str) -> np.ndarray:
+        embedding = self.query_cache.get(query)
+        if embedding is None:
+            embedding = self.query_cache.put(query, await self._get_embedding_async(normalize_query(query)))
+        return embedding
+
+    def prefetch_query_embedding(self, query: str) -> None:
+        """Embed `query` ahead of time so a later search for it is served from the query cache."""
+        self._get_query_embedding(query)
+
+    def _get_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """Embeddings of several queries, fetching all cache misses in a single request."""
+        embeddings = [self.query_cache.get(query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = self._get_embeddings([normalize_query(queries[i]) for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = self.query_cache.put(queries[i], embedding)
+        return np.stack(embeddings)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize each row, leaving all-zero rows untouched."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _build_search_index(self) -> _SearchIndex:
+        # SKUs of the catalog products that have an embedding, and their rows in the cache
+        sku_rows = self.embedding_cache.sku_rows()
+        skus = [sku for sku in self.product_store.get_all_products() if sku in sku_rows]
+        rows = np.fromiter((sku_rows[sku] for sku in skus), dtype=np.int64, count=len(skus))
+        skus = np.array(skus, dtype=object)
+        vectors = self.embedding_cache.vectors
 
+        if self.quantization != "none":
+            quantized = QuantizedMatrix.from_rows(vectors, rows, self.quantization)
+            return _SearchIndex(skus, rows, vectors, None, quantized, None)
+
+        # Search index: one L2-normalized, C-contiguous float32 row per SKU, so a
+        # cosine similarity against every product is a single matrix-vector product
+        matrix = self._load_matrix(vectors, rows)
+        ivf_index = None
+        if self.index_mode == "ivf":
+            ivf_index = self._load_or_build_ivf_index(skus, rows, matrix)
+        return _SearchIndex(skus, rows, vectors, matrix, None, ivf_index)
+
+    @staticmethod
+    def _load_matrix(vectors: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        if len(rows) == 0:
+            return np.empty((0, vectors.shape[1]), dtype=np.float32)
+        if np.array_equal(rows, np.arange(len(vectors))):
+            # Cache rows line up with the catalog: search straight off the memory map
+            return vectors
+        return np.ascontiguousarray(vectors[rows])
+
+    def _generate_embeddings(self) -> None:
+        """Embed catalog products that are new or whose text changed since they were cached."""
         try:
-            updated = False
-            for sku, product in self.product_store.get_all_products().items():
-                if sku not in embeddings:
-                    text = f"{product['ProductName']} {product['Description']} {' '.join(product['Tags'])}"
-                    embedding = self._get_embedding(text)
-                    embeddings[sku] = embedding
-                    updated = True
-
-            if updated:
-                self.embeddings_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(self.embeddings_file, 'w') as f:
-                    json.dump(embeddings, f)
+            builder = EmbeddingBuilder(self._build_client, self.embedding_cache, self.model)
+            builder.build(self.product_store.get_all_products())
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
 
-        return embeddings
+    def _load_or_build_ivf_index(self, skus: np.ndarray, rows: np.ndarray, matrix: np.ndarray) -> Optional[IVFIndex]:
+        """Reuse the IVF index saved next to the cache if it was built over the same rows."""
+        if len(skus) == 0:
+            return None
+        index_file = self.embeddings_dir / self.IVF_INDEX_FILE
+        n_lists = self.ivf_n_lists
+        layout = fingerprint(skus, rows)
+        index = IVFIndex.load(index_file, matrix, layout, self.ivf_n_probe)
+        if index is None or (n_lists is not None and index.n_lists != min(n_lists, len(skus))):
+            try:
+                index = IVFIndex.build(matrix, n_lists=n_lists, n_probe=self.ivf_n_probe)
+                index.save(index_file, layout)
+            except Exception as e:
+                logger.error(f"Error building IVF index, falling back to exact search: {e}")
+                return None
+        return index
 
-    def get_top_k_similar_products(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    def search_by_vectors(self, query_vectors: Union[Sequence[float], np.ndarray],
+                          top_k: int = 3) -> List[List[Tuple[str, float]]]:
+        """Find the most similar SKUs for one or more query vectors.
+
+        Args:
+            query_vectors: A single embedding (d,) or a batch of embeddings (n, d)
+            top_k: Number of results to return per query
+
+        Returns:
+            One list of (sku, cosine similarity) pairs per query, best match first
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        # Read the published index once, a concurrent reload cannot change it mid-search
+        index = self._index
+        if len(index.skus) == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+        queries = self._normalize(queries)
+
+        if index.ivf_index is not None:
+            results = index.ivf_index.search(queries, top_k)
+        elif index.quantized is not None:
+            results = self._quantized_search(index, queries, top_k)
+        else:
+            # (n, d) @ (d, N) -> (n, N) cosine scores, the catalog rows are already unit length
+            scores = queries @ index.matrix.T
+            top_indices = top_k_indices(scores, top_k)
+            results = zip(top_indices, np.take_along_axis(scores, top_indices, axis=1))
+
+        return [[(index.skus[i], float(score)) for i, score in zip(row_indices, row_scores)]
+                for row_indices, row_scores in results]
+
+    def _quantized_search(self, index: _SearchIndex, queries: np.ndarray, top_k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Shortlist with the quantized matrix, then re-score the shortlist at full precision."""
+        shortlists = top_k_indices(index.quantized.scores(queries), top_k * self.rerank_factor)
+
+        results = []
+        for query, shortlist in zip(queries, shortlists):
+            rows = index.rows[shortlist]
+            # Reading rows in file order keeps page faults on the memory map sequential
+            file_order = np.argsort(rows)
+            scores = np.empty(len(shortlist), dtype=np.float32)
+            scores[file_order] = index.vectors[rows[file_order]] @ query
+            best = top_k_indices(scores, top_k)
+            results.append((shortlist[best], scores[best]))
+        return results
+
+    def get_top_k_similar_skus(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
         try:
-            query_embedding = self._get_embedding(query)
-            scored = []
+            query_embedding = self._get_query_embedding(query)
+            return self.search_by_vectors(query_embedding, top_k)[0]
+        except Exception as e:
+            logger.error(f"Error finding similar products: {e}")
+            raise
 
-            for sku, embedding in self.product_embeddings.items():
-                score = self._cosine_similarity(query_embedding, embedding)
-                scored.append((score, sku))
+    async def get_top_k_similar_skus_async(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Async variant of `get_top_k_similar_skus`; only the query embedding request is awaited."""
+        try:
+            query_embedding = await self._get_query_embedding_async(query)
+            return self.search_by_vectors(query_embedding, top_k)[0]
+        except Exception as e:
+            logger.error(f"Error finding similar products: {e}")
+            raise
+
+    def get_top_k_similar_products(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        top_products = self.get_top_k_similar_skus(query, top_k)
+        return [self.product_store.get_product(sku) for sku, _ in top_products]
 
-            top_products = sorted(scored, key=lambda x: x[0], reverse=True)[:top_k]
-            
-            return[self.product_store.get_product(sku) for _, sku in top_products]
+    def get_top_k_similar_products_batch(self, queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+        """Embed several queries in one request and search them together."""
+        if not queries:
+            return []
+        try:
+            query_embeddings = self._get_query_embeddings(queries)
+            results = self.search_by_vectors(query_embeddings, top_k)
+            return [[self.product_store.get_product(sku) for sku, _ in top_products] for top_products in results]
         except Exception as e:
             logger.error(f"Error finding similar products: {e}")
-            raise
\ No newline at end of file
+            raise
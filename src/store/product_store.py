@@ -1,34 +1,61 @@
 import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from utils.logger import logger
 
+if TYPE_CHECKING:
+    from store.popularity_index import PopularityIndex
+
 class ProductStore:
     def __init__(self, products_file: Path):
-        self._products = self._load_products(products_file)
+        self._products_file = products_file
+        # (products, inventory) published together, so a reload swaps both in one assignment
+        self._catalog = self._load_products(products_file)
+        self._popularity_index: Optional["PopularityIndex"] = None
+
+    def _read_catalog(self, products_file: Path) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+        with open(products_file, 'r') as f:
+            product_list = json.load(f)
+        products = {product['SKU']: {
+            'ProductName': product['ProductName'],
+            'Description': product['Description'],
+            'Tags': product['Tags'],
+        } for product in product_list}
+        inventory = {product['SKU']: product.get('Inventory', 0) for product in product_list}
+        return products, inventory
 
-    def _load_products(self, products_file: Path) -> Dict[str, Dict[str, Any]]:
+    def _load_products(self, products_file: Path) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
         try:
-            with open(products_file, 'r') as f:
-                product_list = json.load(f)
-            return {product['SKU']: {
-                'ProductName': product['ProductName'],
-                'Description': product['Description'],
-                'Tags': product['Tags'],
-            } for product in product_list}
+            return self._read_catalog(products_file)
         except Exception as e:
             logger.error(f"Error loading product data from {products_file}: {e}")
-            return {}
+            return {}, {}
+
+    def reload(self) -> None:
+        """Re-read the catalog file and publish it atomically, keeping the old catalog on error."""
+        self._catalog = self._read_catalog(self._products_file)
 
     def get_product(self, sku: str) -> Dict[str, Any]:
-        return self._products.get(sku)
+        products, _ = self._catalog
+        return products.get(sku)
     
     def get_all_products(self) -> Dict[str, Dict[str, Any]]:
-        return self._products
+        products, _ = self._catalog
+        return products
+
+    def get_inventory(self, sku: str) -> int:
+        _, inventory = self._catalog
+        return inventory.get(sku, 0)
+
+    def set_popularity_index(self, popularity_index: "PopularityIndex") -> None:
+        self._popularity_index = popularity_index
         
     def get_popular_products(self, limit: int = 3) -> List[Dict[str, Any]]:
+        products, _ = self._catalog
         
-        # In a real implementation, this would use actual popularity metrics
-        # For now, we'll just return the first few products as a mock
-        products = list(self._products.values())
-        return products[:limit]
+        if self._popularity_index is not None:
+            popular = [products.get(sku) for sku in self._popularity_index.get_top_skus(limit)]
+            return [product for product in popular if product is not None]
+
+        # Without order history, fall back to the first few catalog products
+        return list(products.values())[:limit]
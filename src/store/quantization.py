@@ -0,0 +1,67 @@
+from typing import Optional
+
+import numpy as np
+
+
+class QuantizedMatrix:
+    """Compressed copy of a unit-length embedding matrix for first-pass scoring.
+
+    Modes:
+        - "float16": half precision, 2 bytes per dimension
+        - "int8": symmetric scalar quantization with one float32 scale per row, ~1 byte per dimension
+
+    Scores are computed chunk by chunk in float32 so BLAS does the heavy lifting while
+    only one chunk is ever expanded in memory.
+    """
+
+    MODES = ("float16", "int8")
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray], mode: str, chunk_size: int = 32768):
+        self.codes = codes
+        self.scales = scales
+        self.mode = mode
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_rows(cls, vectors: np.ndarray, rows: np.ndarray, mode: str, chunk_size: int = 32768) -> "QuantizedMatrix":
+        """Quantize `vectors[rows]` without materializing the full-precision selection.
+
+        Args:
+            vectors: (M, d) float32 source, typically the memory-mapped embedding cache
+            rows: Indices of the rows to keep, in result order
+            mode: "float16" or "int8"
+        """
+        if mode not in cls.MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+
+        dimension = vectors.shape[1]
+        codes = np.empty((len(rows), dimension), dtype=np.float16 if mode == "float16" else np.int8)
+        scales = np.empty(len(rows), dtype=np.float32) if mode == "int8" else None
+        for start in range(0, len(rows), chunk_size):
+            chunk = np.asarray(vectors[rows[start:start + chunk_size]], dtype=np.float32)
+            if mode == "float16":
+                codes[start:start + len(chunk)] = chunk.astype(np.float16)
+            else:
+                chunk_scales = np.abs(chunk).max(axis=1) / 127.0
+                chunk_scales[chunk_scales == 0] = 1.0
+                codes[start:start + len(chunk)] = np.rint(chunk / chunk_scales[:, np.newaxis]).astype(np.int8)
+                scales[start:start + len(chunk)] = chunk_scales
+        return cls(codes, scales, mode, chunk_size)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate (n, N) inner products of float32 queries with every row."""
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), self.chunk_size):
+            chunk = self.codes[start:start + self.chunk_size].astype(np.float32)
+            chunk_scores = queries @ chunk.T
+            if self.scales is not None:
+                chunk_scores *= self.scales[start:start + self.chunk_size]
+            scores[:, start:start + len(chunk)] = chunk_scores
+        return scores
@@ -0,0 +1,112 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.logger import logger
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query used as the cache key."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings with an optional SQLite tier on disk.
+
+    Lookups check the in-memory LRU first, then the persistent tier (if a path is
+    given), and only then call the embedding function. Entries found on disk are
+    promoted into memory. The persistent tier is keyed by model as well, so switching
+    models never serves stale vectors.
+    """
+
+    def __init__(self, model: str, max_entries: int = 1024, persist_path: Optional[Path] = None):
+        self.model = model
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = self._open_db(persist_path) if persist_path is not None else None
+
+    def _open_db(self, persist_path: Path) -> Optional[sqlite3.Connection]:
+        try:
+            persist_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(persist_path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS query_embeddings ("
+                       "model TEXT NOT NULL, query TEXT NOT NULL, embedding BLOB NOT NULL, "
+                       "PRIMARY KEY (model, query))")
+            db.commit()
+            return db
+        except Exception as e:
+            logger.error(f"Error opening query embedding cache {persist_path}: {e}")
+            return None
+
+    def _load_from_disk(self, key: str) -> Optional[np.ndarray]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT embedding FROM query_embeddings WHERE model = ? AND query = ?",
+                                   (self.model, key)).fetchone()
+        except Exception as e:
+            logger.error(f"Error reading query embedding cache: {e}")
+            return None
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def _save_to_disk(self, key: str, embedding: np.ndarray) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute("INSERT OR REPLACE INTO query_embeddings (model, query, embedding) VALUES (?, ?, ?)",
+                             (self.model, key, embedding.tobytes()))
+            self._db.commit()
+        except Exception as e:
+            logger.error(f"Error writing query embedding cache: {e}")
+
+    def _put(self, key: str, embedding: np.ndarray) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for a query, or None."""
+        key = normalize_query(query)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return embedding
+
+            embedding = self._load_from_disk(key)
+            if embedding is not None:
+                self._put(key, embedding)
+                self._stats["disk_hits"] += 1
+                return embedding
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, query: str, embedding: List[float]) -> np.ndarray:
+        key = normalize_query(query)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._put(key, embedding)
+            self._save_to_disk(key, embedding)
+        return embedding
+
+    def get_or_compute(self, query: str, compute: Callable[[str], List[float]]) -> np.ndarray:
+        """Return the cached embedding for a query, computing and caching it on a miss."""
+        embedding = self.get(query)
+        if embedding is None:
+            embedding = self.put(query, compute(normalize_query(query)))
+        return embedding
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries}
@@ -0,0 +1,160 @@
+import json
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from store.order_backend import OrderBackend, order_key
+from store.order_stream import iter_json_records
+from utils.logger import logger
+
+
+class SqliteOrderBackend(OrderBackend):
+    """Orders in an embedded SQLite database, with a bounded page cache.
+
+    The database is (re)built from the source JSON file whenever the file's size or
+    modification time differs from what was ingested last, streaming records in batches
+    so the full document never sits in memory. Lookups go through a unique
+    (email, order_number) index, which also serves email-only lookups, and a secondary
+    order_number index.
+
+    Writes (ingest, add, update) are serialized on one connection. Lookups use separate
+    read connections that never take the write lock: in WAL mode each read sees the last
+    committed state, so a re-ingest in progress never blocks them and they keep seeing
+    the old rows until it commits.
+    """
+
+    INGEST_BATCH_SIZE = 5000
+
+    def __init__(self, db_path: Path, source_file: Optional[Path] = None, cache_size_kib: int = 8192):
+        super().__init__()
+        self.db_path = db_path
+        self.cache_size_kib = cache_size_kib
+        self._lock = threading.Lock()
+        # Idle read connections, one is checked out per lookup
+        self._readers: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = self._connect()
+        self._create_schema()
+        if source_file is not None:
+            self._ingest_if_changed(source_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Negative cache_size is in KiB, this caps the page cache per connection
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        return conn
+
+    def _create_schema(self) -> None:
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS orders (
+                    id INTEGER PRIMARY KEY,
+                    email TEXT NOT NULL,
+                    order_number TEXT NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE UNIQUE INDEX IF NOT EXISTS orders_email_number ON orders (email, order_number);
+                CREATE INDEX IF NOT EXISTS orders_number ON orders (order_number);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+
+    def _ingest_if_changed(self, source_file: Path) -> None:
+        try:
+            stat = source_file.stat()
+        except FileNotFoundError:
+            logger.error(f"Order source file {source_file} not found, serving existing database")
+            return
+        signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+            if row and row[0] == signature:
+                return
+            self._conn.execute("DELETE FROM orders")
+            self._insert_orders(iter_json_records(source_file, "orders"))
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)", (signature,))
+        logger.info(f"Ingested orders from {source_file} into {self.db_path}")
+
+    def reload(self, source_file: Path) -> "SqliteOrderBackend":
+        # Re-ingestion runs in one write transaction, readers see the old rows until it commits
+        self._ingest_if_changed(source_file)
+        return self
+
+    def _insert_orders(self, orders: Iterable[Dict[str, Any]]) -> None:
+        batch = []
+        for order in orders:
+            email, order_number = order_key(order)
+            batch.append((email, order_number, json.dumps(order)))
+            if len(batch) >= self.INGEST_BATCH_SIZE:
+                # Later duplicates win, like the in-memory backend
+                self._conn.executemany("INSERT OR REPLACE INTO orders (email, order_number, data) VALUES (?, ?, ?)", batch)
+                batch = []
+        if batch:
+            self._conn.executemany("INSERT OR REPLACE INTO orders (email, order_number, data) VALUES (?, ?, ?)", batch)
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            self._readers.put(conn)
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_orders(self) -> Iterator[Dict[str, Any]]:
+        # A dedicated read connection so iteration never holds the shared lock between rows
+        conn = self._connect()
+        try:
+            for (data,) in conn.execute("SELECT data FROM orders ORDER BY id"):
+                yield json.loads(data)
+        finally:
+            conn.close()
+
+    def add_order(self, order: Dict[str, Any]) -> None:
+        email, order_number = order_key(order)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT INTO orders (email, order_number, data) VALUES (?, ?, ?)",
+                                   (email, order_number, json.dumps(order)))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Order {order.get('OrderNumber')} already exists for {order.get('Email')}")
+
+    def update_order(self, email: str, order_number: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute("SELECT id, data FROM orders WHERE email = ? AND order_number = ?",
+                                         (email, order_number)).fetchone()
+                if row is None:
+                    return None
+                updated = {**json.loads(row[1]), **changes}
+                new_email, new_order_number = order_key(updated)
+                self._conn.execute("UPDATE orders SET email = ?, order_number = ?, data = ? WHERE id = ?",
+                                   (new_email, new_order_number, json.dumps(updated), row[0]))
+                return updated
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Order {changes.get('OrderNumber')} already exists for {changes.get('Email', email)}")
+
+    def find_by_email_and_number(self, email: str, order_number: str) -> Optional[Dict[str, Any]]:
+        orders = self._query("SELECT data FROM orders WHERE email = ? AND order_number = ?", (email, order_number))
+        return orders[0] if orders else None
+
+    def find_by_email(self, email: str) -> List[Dict[str, Any]]:
+        return self._query("SELECT data FROM orders WHERE email = ? ORDER BY id", (email,))
+
+    def find_by_number(self, order_number: str) -> Optional[Dict[str, Any]]:
+        orders = self._query("SELECT data FROM orders WHERE order_number = ? ORDER BY id DESC LIMIT 1", (order_number,))
+        return orders[0] if orders else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
@@ -11,6 +11,7 @@ import sys
 from support_agent_server import SupportAgentServer
 from dotenv import load_dotenv
 from utils.logger import logger
+from utils.tracing import tracer
 
 if __name__ == "__main__":
     # Check for OpenAI API key
@@ -23,6 +24,10 @@ if __name__ == "__main__":
         sys.exit(1)
 
 
+    # Optional tracing, e.g. TRACE_FILE=logs/traces.jsonl TRACE_SAMPLE_RATE=0.1
+    if os.getenv("TRACE_FILE"):
+        tracer.configure(sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")), export_path=os.getenv("TRACE_FILE"))
+
     # Initialize services
     project_root = Path(__file__).parent.parent
     support_agent_server = SupportAgentServer(openai_api_key, project_root)
@@ -0,0 +1,253 @@
+"""
+Sierra Outfitters Customer Support Agent - HTTP serving mode
+
+Serves many customer conversations from one process. Each conversation is a session
+with its own chat history; catalog, orders, embeddings and tools are shared.
+
+Endpoints:
+    POST   /sessions                        -> {"session_id": ...}
+    POST   /sessions/<session_id>/messages  {"message": ..., "stream": false}
+           -> {"response": ...}, or a text/event-stream of tokens when "stream" is true
+    DELETE /sessions/<session_id>
+    GET    /health                          -> session, request, upstream queue and speculation counters
+    GET    /metrics                         -> per-stage latency percentiles and token counters (with --trace)
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from agent.session_registry import SessionRegistry
+from agent.speculative_executor import SpeculativeExecutor
+from support_agent_server import SupportAgentServer
+from utils.logger import logger
+from utils.tracing import tracer
+from utils.upstream_scheduler import UpstreamScheduler
+
+
+class SupportAgentHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server routing requests to a SessionRegistry.
+
+    At most `max_concurrent_requests` conversation turns run at once; further turns wait
+    up to `queue_timeout` seconds for a slot and are then rejected with 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, session_registry: SessionRegistry, max_concurrent_requests: int = 64,
+                 queue_timeout: float = 5.0, eviction_interval: float = 60.0,
+                 upstream_scheduler: Optional[UpstreamScheduler] = None,
+                 speculative_executor: Optional[SpeculativeExecutor] = None):
+        super().__init__(address, _SupportAgentRequestHandler)
+        self.session_registry = session_registry
+        self.queue_timeout = queue_timeout
+        self.upstream_scheduler = upstream_scheduler
+        self.speculative_executor = speculative_executor
+        self._request_slots = threading.BoundedSemaphore(max_concurrent_requests)
+        self._stats_lock = threading.Lock()
+        self._stats = {"in_flight": 0, "completed": 0, "rejected": 0}
+        self._stop_event = threading.Event()
+        self._eviction_thread = threading.Thread(target=self._evict_idle_sessions, args=(eviction_interval,),
+                                                 name="session-eviction", daemon=True)
+        self._eviction_thread.start()
+
+    def _evict_idle_sessions(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            evicted = self.session_registry.evict_idle()
+            if evicted:
+                logger.info(f"Evicted {evicted} idle sessions")
+
+    def acquire_slot(self) -> bool:
+        if not self._request_slots.acquire(timeout=self.queue_timeout):
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            return False
+        with self._stats_lock:
+            self._stats["in_flight"] += 1
+        return True
+
+    def release_slot(self) -> None:
+        with self._stats_lock:
+            self._stats["in_flight"] -= 1
+            self._stats["completed"] += 1
+        self._request_slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            requests = dict(self._stats)
+        stats = {"requests": requests, "sessions": self.session_registry.get_stats()}
+        if self.upstream_scheduler is not None:
+            stats["upstream"] = self.upstream_scheduler.get_stats()
+        if self.speculative_executor is not None:
+            stats["speculation"] = self.speculative_executor.get_stats()
+        return stats
+
+    def server_close(self) -> None:
+        self._stop_event.set()
+        super().server_close()
+
+
+class _SupportAgentRequestHandler(BaseHTTPRequestHandler):
+    server: SupportAgentHTTPServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Optional[Dict[str, Any]]:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            return body if isinstance(body, dict) else None
+        except (ValueError, json.JSONDecodeError):
+            return None
+
+    def _session_path(self) -> Optional[List[str]]:
+        parts = [part for part in self.path.split("?", 1)[0].split("/") if part]
+        return parts if parts and parts[0] == "sessions" else None
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, {"status": "ok", **self.server.get_stats()})
+        elif path == "/metrics":
+            self._send_json(200, tracer.get_stats())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_DELETE(self) -> None:
+        parts = self._session_path()
+        if parts is None or len(parts) != 2:
+            self._send_json(404, {"error": "Not found"})
+        elif self.server.session_registry.close(parts[1]):
+            self._send_json(200, {"closed": True})
+        else:
+            self._send_json(404, {"error": "Unknown session"})
+
+    def do_POST(self) -> None:
+        parts = self._session_path()
+        if parts == ["sessions"]:
+            self._read_json()
+            try:
+                self._send_json(201, {"session_id": self.server.session_registry.create()})
+            except RuntimeError as e:
+                self._send_json(503, {"error": str(e)})
+            return
+        if parts is None or len(parts) != 3 or parts[2] != "messages":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        body = self._read_json()
+        if body is None or not isinstance(body.get("message"), str):
+            self._send_json(400, {"error": "Expected a JSON body with a 'message' string"})
+            return
+        session_id = parts[1]
+        if session_id not in self.server.session_registry:
+            self._send_json(404, {"error": "Unknown session"})
+            return
+
+        if not self.server.acquire_slot():
+            self._send_json(503, {"error": "Server busy, try again shortly"})
+            return
+        try:
+            if body.get("stream"):
+                self._stream_turn(session_id, body["message"])
+            else:
+                response = self.server.session_registry.process_message(session_id, body["message"])
+                if response is None:
+                    self._send_json(404, {"error": "Unknown session"})
+                else:
+                    self._send_json(200, {"response": response})
+        except Exception as e:
+            logger.error(f"Error handling message for session {session_id}: {e}")
+            self._send_json(500, {"error": "Internal server error"})
+        finally:
+            self.server.release_slot()
+
+    def _stream_turn(self, session_id: str, message: str) -> None:
+        """Send the reply as server-sent events: one "token" event per delta, then "done".
+
+        Once the headers are out, failures are reported as an "error" event. If the client
+        disconnects, the turn still completes so the session history stays consistent, and
+        the remaining events are dropped.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # Length is unknown up front, so close the connection to mark the end of the stream
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        disconnected = False
+
+        def send_event(event: str, data: Dict[str, Any]) -> None:
+            nonlocal disconnected
+            if disconnected:
+                return
+            try:
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                disconnected = True
+                logger.info(f"Client disconnected while streaming session {session_id}")
+
+        try:
+            response = self.server.session_registry.process_message(
+                session_id, message, on_token=lambda token: send_event("token", {"token": token}))
+        except Exception as e:
+            logger.error(f"Error streaming message for session {session_id}: {e}")
+            send_event("error", {"error": "Internal server error"})
+            return
+        send_event("done", {"response": response} if response is not None else {"error": "Unknown session"})
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Serve the customer support agent over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrent-requests", type=int, default=64)
+    parser.add_argument("--idle-timeout", type=float, default=1800.0, help="Seconds before an idle session is evicted")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--trace", action="store_true", help="Record per-stage latency and token metrics")
+    parser.add_argument("--trace-file", help="JSONL file receiving sampled traces, implies --trace")
+    parser.add_argument("--trace-sample-rate", type=float, default=1.0, help="Fraction of turns written to --trace-file")
+    args = parser.parse_args()
+    if args.trace or args.trace_file:
+        tracer.configure(sample_rate=args.trace_sample_rate, export_path=args.trace_file)
+
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        logger.error("OpenAI API key not found")
+        print("\nError: The customer support agent encountered an error and needs to close.")
+        sys.exit(1)
+
+    project_root = Path(__file__).parent.parent
+    support_agent_server = SupportAgentServer(openai_api_key, project_root)
+    registry = SessionRegistry(support_agent_server.create_agent, idle_timeout=args.idle_timeout,
+                               max_sessions=args.max_sessions)
+    http_server = SupportAgentHTTPServer((args.host, args.port), registry,
+                                         max_concurrent_requests=args.max_concurrent_requests,
+                                         upstream_scheduler=support_agent_server.upstream_scheduler,
+                                         speculative_executor=support_agent_server.speculative_executor)
+    print(f"Serving the customer support agent on http://{args.host}:{args.port}")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        http_server.server_close()
@@ -1,17 +1,29 @@
+import uuid
 from pathlib import Path
-from openai import OpenAI
+from typing import Callable, List
 
+from agent.intent_router import IntentRouter
+from agent.speculative_executor import SpeculativeExecutor
 from agent.support_agent import SupportAgent
 from tools.check_promotion_eligibility import CheckPromotionEligibility
 from tools.function_tools import FunctionTools
 from agent.system_prompt_provider import SystemPromptProvider
 from agent.llm_chat_session import LLMChatSession
+from store.data_file_watcher import DataFileWatcher
+from store.data_reloader import DataReloader
+from store.hybrid_retriever import HybridRetriever
+from store.lexical_index import LexicalIndex
 from store.order_store import OrderStore
+from store.popularity_index import PopularityIndex
 from store.product_embedding_store import ProductEmbeddingStore
 from store.product_store import ProductStore
+from store.query_embedding_cache import QueryEmbeddingCache
 from tools.lookup_order import LookUpOrder
 from tools.recommend_product import RecommendProduct
+from tools.relevance_verdict_cache import RelevanceVerdictCache
 from utils.logger import logger
+from utils.openai_client_factory import OpenAIClientFactory
+from utils.upstream_scheduler import UpstreamScheduler
 
 class SupportAgentServer:
     _instance = None
@@ -25,20 +37,72 @@ class SupportAgentServer:
     
     def _initialize(self, openai_api_key: str, project_root: Path):
         data_dir = project_root / 'data'
-        openai_client = OpenAI(api_key=openai_api_key)
+        # Clients, stores and tools are shared read-mostly by every conversation
+        self.client_factory = OpenAIClientFactory(api_key=openai_api_key)
+        self.openai_client = self.client_factory.client()
+        # One rate budget for every upstream call, chat ahead of judging ahead of background embedding
+        self.upstream_scheduler = UpstreamScheduler()
 
         product_store = ProductStore(data_dir / 'ProductCatalog.json')
-        product_embedding_store = ProductEmbeddingStore(product_store, data_dir / 'ProductEmbeddings.json')
+        query_embedding_cache = QueryEmbeddingCache("text-embedding-3-small", persist_path=data_dir / 'QueryEmbeddings.sqlite')
+        product_embedding_store = ProductEmbeddingStore(product_store, data_dir / 'ProductEmbeddings',
+                                                        legacy_embeddings_file=data_dir / 'ProductEmbeddings.json',
+                                                        query_cache=query_embedding_cache,
+                                                        client_factory=self.client_factory,
+                                                        upstream_scheduler=self.upstream_scheduler)
+        product_retriever = HybridRetriever(LexicalIndex(product_store), product_embedding_store)
         order_store = OrderStore(data_dir / 'CustomerOrders.json')
-        system_prompt_provider = SystemPromptProvider()
+        popularity_index = PopularityIndex(product_store, order_store)
+        product_store.set_popularity_index(popularity_index)
+
+        # Pick up catalog and order file edits without restarting the agent
+        data_reloader = DataReloader(product_store, product_embedding_store, order_store,
+                                     product_retriever=product_retriever, popularity_index=popularity_index)
+        self.data_file_watcher = DataFileWatcher()
+        self.data_file_watcher.watch(data_dir / 'ProductCatalog.json', data_reloader.reload_catalog)
+        self.data_file_watcher.watch(data_dir / 'CustomerOrders.json', data_reloader.reload_orders)
+        self.data_file_watcher.start()
+        self.system_prompt_provider = SystemPromptProvider()
         
         lookup_order = LookUpOrder(order_store)
         check_promotion_eligibility = CheckPromotionEligibility()
-        recommend_product = RecommendProduct(product_embedding_store, product_store)
+        recommend_product = RecommendProduct(product_embedding_store, product_store, retriever=product_retriever,
+                                             relevance_mode="batched", verdict_cache=RelevanceVerdictCache(),
+                                             client_factory=self.client_factory,
+                                             upstream_scheduler=self.upstream_scheduler)
         
-        function_tools = FunctionTools([lookup_order, check_promotion_eligibility, recommend_product])
+        self.function_tools = FunctionTools([lookup_order, check_promotion_eligibility, recommend_product])
+        self.intent_router = IntentRouter(self.function_tools)
+        self.speculative_executor = SpeculativeExecutor(self.function_tools, product_embedding_store)
         
-        self.conversation_manager = SupportAgent(system_prompt_provider, function_tools, openai_client)
+        self.conversation_manager = self.create_agent()
+
+    def create_agent(self) -> SupportAgent:
+        """Create an agent for one conversation, with its own chat history over the shared stores and tools."""
+        # Each conversation queues fairly against the others for the interactive budget, history
+        # summaries wait behind every user-facing call
+        session = uuid.uuid4().hex
+        openai_client = self.upstream_scheduler.bind(self.openai_client, "interactive", session=session)
+        summary_client = self.upstream_scheduler.bind(self.openai_client, "background", session=session)
+        return SupportAgent(self.system_prompt_provider, self.function_tools, openai_client,
+                            intent_router=self.intent_router, speculative_executor=self.speculative_executor,
+                            summary_client=summary_client)
+
+    def _stream_reply(self, respond: Callable[[Callable[[str], None]], str]) -> None:
+        """Print the assistant's reply token by token as it streams in."""
+        print("\n\n🤖 Assistant: ", end="", flush=True)
+        streamed: List[str] = []
+
+        def on_token(token: str) -> None:
+            streamed.append(token)
+            print(token, end="", flush=True)
+
+        response = respond(on_token)
+        # The reply is the last completion's text, anything streamed before it came ahead of
+        # a tool call. Fallback replies after an error are returned without being streamed.
+        if not "".join(streamed).strip().endswith(response.strip()):
+            print(f"\n{response}" if streamed else response, end="")
+        print()
 
     def start(self):
         # Agent start to chat with user
@@ -46,14 +110,13 @@ class SupportAgentServer:
         
         try:
             # Generate greeting
-            greeting = self.conversation_manager.generate_response("send a greeting to user and introduce what is your capabilities")
-            print(f"\n\n🤖 Assistant: {greeting}")
+            self._stream_reply(lambda on_token: self.conversation_manager.generate_response(
+                "send a greeting to user and introduce what is your capabilities", on_token=on_token))
 
             # Main conversation loop
             while True:
                 user_input = input("\n\n👤 You: ")
-                response = self.conversation_manager.process_message(user_input)
-                print(f"\n\n🤖 Assistant: {response}")
+                self._stream_reply(lambda on_token: self.conversation_manager.process_message(user_input, on_token=on_token))
 
         except KeyboardInterrupt:
             print("\n\nExiting customer support agent. Goodbye!")
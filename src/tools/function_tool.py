@@ -1,3 +1,4 @@
+import asyncio
 from typing import Any, Dict
 
 
@@ -9,6 +10,10 @@ class FunctionTool:
     def execute(self, _args: Dict[str, Any]) -> Dict[str, Any]:
         raise NotImplementedError("Subclasses must implement this method")
 
+    async def execute_async(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `execute`. Runs `execute` on a worker thread unless overridden."""
+        return await asyncio.to_thread(self.execute, args)
+
     def get_definition(self) -> Dict[str, Any]:
         raise NotImplementedError("Subclasses must implement this method")
     
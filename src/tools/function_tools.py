@@ -1,28 +1,34 @@
+import asyncio
 import json
 from datetime import datetime, time
 import pytz
 from pathlib import Path
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple
 
 from store.order_store import OrderStore
 from store.product_embedding_store import ProductEmbeddingStore
 from tools.function_tool import FunctionTool
 from tools.recommend_product import RecommendProduct
 from utils.logger import logger
+from utils.tracing import run_in_context, tracer
 
 
 class FunctionTools:
     """Handles execution of AI function calls."""
     
-    def __init__(self, tools: List[FunctionTool]):
+    def __init__(self, tools: List[FunctionTool], max_workers: int = 4):
         # Initialize services
         self.tools = {tool.get_name(): tool for tool in tools}
+        # Shared pool for running the tool calls of one assistant message side by side
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="function-tool")
     
     def execute_function(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a function by name with the provided arguments."""
         if function_name in self.tools:
             try:
-                return self.tools[function_name].execute(arguments)
+                with tracer.span(f"tool.{function_name}"):
+                    return self.tools[function_name].execute(arguments)
             except Exception as e:
                 logger.error(f"Error executing function {function_name}: {e}")
                 raise
@@ -30,6 +36,52 @@ class FunctionTools:
             logger.error(f"Unknown function: {function_name}")
             return {"error": f"Unknown function: {function_name}"}
     
+    def _execute_or_report(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self.execute_function(function_name, arguments)
+        except Exception:
+            # The model still needs a result for this tool call, the error is already logged
+            return {"error": f"Error executing function {function_name}"}
+
+    def execute_functions(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute several function calls concurrently.
+
+        Args:
+            calls: (function name, arguments) pairs
+
+        Returns:
+            One result per call, in call order. A call that raises yields an error result
+            instead of failing the others.
+        """
+        if len(calls) == 1:
+            return [self._execute_or_report(*calls[0])]
+        futures = [self._executor.submit(run_in_context(self._execute_or_report), name, arguments)
+                   for name, arguments in calls]
+        return [future.result() for future in futures]
+
+    async def execute_function_async(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `execute_function`."""
+        if function_name in self.tools:
+            try:
+                with tracer.span(f"tool.{function_name}"):
+                    return await self.tools[function_name].execute_async(arguments)
+            except Exception as e:
+                logger.error(f"Error executing function {function_name}: {e}")
+                raise
+        else:
+            logger.error(f"Unknown function: {function_name}")
+            return {"error": f"Unknown function: {function_name}"}
+
+    async def _execute_or_report_async(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await self.execute_function_async(function_name, arguments)
+        except Exception:
+            return {"error": f"Error executing function {function_name}"}
+
+    async def execute_functions_async(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Async variant of `execute_functions`, running the calls concurrently on the event loop."""
+        return list(await asyncio.gather(*(self._execute_or_report_async(name, arguments) for name, arguments in calls)))
+
     def get_available_tools(self) -> List[Dict[str, Any]]:
         """Get the list of tools available to the AI."""
         return [{
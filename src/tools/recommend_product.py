@@ -1,19 +1,67 @@
-from typing import Any, Dict, List
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
 
-from openai import OpenAI
+from store.hybrid_retriever import HybridRetriever
 from store.product_embedding_store import ProductEmbeddingStore
 from store.product_store import ProductStore
 from tools.function_tool import FunctionTool
+from tools.relevance_verdict_cache import RelevanceVerdictCache
 from utils.logger import logger
+from utils.openai_client_factory import OpenAIClientFactory
+from utils.tracing import run_in_context, tracer
+from utils.upstream_scheduler import UpstreamScheduler
 
 
 class RecommendProduct(FunctionTool):
 
-    def __init__(self, product_embedding_store: ProductEmbeddingStore, product_store: ProductStore):
+    RELEVANCE_MODES = ("sequential", "batched", "concurrent")
+    FALLBACK_POLICIES = ("include", "exclude")
+
+    def __init__(self, product_embedding_store: ProductEmbeddingStore, product_store: ProductStore,
+                 retriever: Optional[HybridRetriever] = None, relevance_mode: str = "sequential",
+                 judge_timeout: float = 10.0, fallback_policy: str = "include", max_judge_workers: int = 8,
+                 verdict_cache: Optional[RelevanceVerdictCache] = None,
+                 client_factory: Optional[OpenAIClientFactory] = None,
+                 upstream_scheduler: Optional[UpstreamScheduler] = None):
+        """
+        Args:
+            product_embedding_store: Vector search over the catalog
+            product_store: Catalog used to resolve SKUs to products
+            retriever: Optional hybrid lexical + vector retriever used instead of plain vector search
+            relevance_mode: How candidates are judged by the LLM:
+                - "sequential": one request per candidate, one after another
+                - "batched": a single structured-output request judging all candidates
+                - "concurrent": one request per candidate, all in flight at once
+            judge_timeout: Seconds to wait for judge requests in "batched" and "concurrent" mode
+            fallback_policy: Keep ("include") or drop ("exclude") a candidate whose judgment failed or timed out
+            max_judge_workers: Thread pool size for "concurrent" mode
+            verdict_cache: Optional cache of earlier verdicts, skips the LLM for repeated (preference, SKU) pairs
+            client_factory: Source of the shared OpenAI clients, defaults to the process-wide factory
+            upstream_scheduler: Optional rate limiter admitting judge calls below interactive chat
+        """
         super().__init__()
+        if relevance_mode not in self.RELEVANCE_MODES:
+            raise ValueError(f"Unknown relevance mode: {relevance_mode}")
+        if fallback_policy not in self.FALLBACK_POLICIES:
+            raise ValueError(f"Unknown fallback policy: {fallback_policy}")
+
         self.product_embedding_store = product_embedding_store
         self.product_store = product_store
-        self.client = OpenAI()
+        self.retriever = retriever
+        self.relevance_mode = relevance_mode
+        self.judge_timeout = judge_timeout
+        self.fallback_policy = fallback_policy
+        self.verdict_cache = verdict_cache
+        client_factory = client_factory or OpenAIClientFactory.shared()
+        self.client = client_factory.client()
+        self.async_client = client_factory.async_client()
+        if upstream_scheduler is not None:
+            self.client = upstream_scheduler.bind(self.client, "judge")
+            self.async_client = upstream_scheduler.bind(self.async_client, "judge")
+        self._judge_pool = ThreadPoolExecutor(max_workers=max_judge_workers) if relevance_mode == "concurrent" else None
 
     def execute(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get product recommendations based on user preferences."""
@@ -26,13 +74,40 @@ class RecommendProduct(FunctionTool):
                 "recommendations": popular_products
             }
         
-        recommendations = self.product_embedding_store.get_top_k_similar_products(preferences)
+        if self.retriever is not None:
+            skus = self.retriever.retrieve(preferences)
+        else:
+            skus = [sku for sku, _ in self.product_embedding_store.get_top_k_similar_skus(preferences)]
         
+        # A catalog reload may have removed a product the index still returned
+        skus = [sku for sku in skus if self.product_store.get_product(sku) is not None]
+
         # Post-process recommendations using LLM to evaluate relevance
-        filtered_recommendations = self.filter_recommendations_with_llm(preferences, recommendations)
+        relevant_skus = self.filter_recommendations_with_llm(preferences, skus)
             
         return {
-            "recommendations": filtered_recommendations
+            "recommendations": [self.product_store.get_product(sku) for sku in relevant_skus]
+        }
+
+    async def execute_async(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of `execute`, awaiting the embedding and judge requests."""
+        preferences = args.get("preferences", "")
+
+        if preferences.lower() == "general":
+            return {
+                "recommendations": self.product_store.get_popular_products(limit=3)
+            }
+
+        if self.retriever is not None:
+            skus = await self.retriever.retrieve_async(preferences)
+        else:
+            skus = [sku for sku, _ in await self.product_embedding_store.get_top_k_similar_skus_async(preferences)]
+        skus = [sku for sku in skus if self.product_store.get_product(sku) is not None]
+
+        relevant_skus = await self.filter_recommendations_with_llm_async(preferences, skus)
+
+        return {
+            "recommendations": [self.product_store.get_product(sku) for sku in relevant_skus]
         }
     
     def get_definition(self) -> Dict[str, Any]:
@@ -53,47 +128,234 @@ class RecommendProduct(FunctionTool):
     def get_name(self) -> str:
         return "recommend_product"
 
-    def filter_recommendations_with_llm(self, preferences: str, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        if not recommendations:
+    @staticmethod
+    def _format_product(product: Dict[str, Any]) -> str:
+        return f"Product Name: {product.get('ProductName', '')}, " \
+               f"Description: {product.get('Description', '')}, " \
+               f"Tags: {', '.join(product.get('Tags', []))}"
+
+    def _cached_verdicts(self, preferences: str, skus: List[str],
+                         products: Dict[str, Dict[str, Any]]) -> Dict[str, bool]:
+        verdicts = {}
+        if self.verdict_cache is not None:
+            for sku in skus:
+                verdict = self.verdict_cache.get(preferences, sku, products[sku])
+                if verdict is not None:
+                    verdicts[sku] = verdict
+        return verdicts
+
+    def _record_verdicts(self, preferences: str, products: Dict[str, Dict[str, Any]],
+                         judged: Dict[str, Optional[bool]], verdicts: Dict[str, bool]) -> None:
+        for sku, verdict in judged.items():
+            # Failed or timed-out judgments are resolved by the fallback policy and never cached
+            if verdict is None:
+                verdict = self.fallback_policy == "include"
+            elif self.verdict_cache is not None:
+                self.verdict_cache.put(preferences, sku, products[sku], verdict)
+            verdicts[sku] = verdict
+
+    def filter_recommendations_with_llm(self, preferences: str, skus: List[str]) -> List[str]:
+        """Ask the LLM which candidate SKUs are relevant to the preferences, keeping their order."""
+        if not skus:
             return []
-            
-        filtered_recommendations = []
-        
-        # Create a prompt for the LLM to evaluate each product
-        for product in recommendations:
-            product_info = f"Product Name: {product.get('ProductName', '')}, " \
-                          f"Description: {product.get('Description', '')}, " \
-                          f"Tags: {', '.join(product.get('Tags', []))}"
-                          
-            prompt = f"""
+
+        products = {sku: self.product_store.get_product(sku) for sku in skus}
+        verdicts = self._cached_verdicts(preferences, skus, products)
+
+        to_judge = [sku for sku in skus if sku not in verdicts]
+        if to_judge:
+            if self.relevance_mode == "batched":
+                judged = self._judge_batched(preferences, to_judge, products)
+            elif self.relevance_mode == "concurrent":
+                judged = self._judge_concurrent(preferences, to_judge, products)
+            else:
+                judged = self._judge_sequential(preferences, to_judge, products)
+            self._record_verdicts(preferences, products, judged, verdicts)
+
+        return [sku for sku in skus if verdicts[sku]]
+
+    async def filter_recommendations_with_llm_async(self, preferences: str, skus: List[str]) -> List[str]:
+        """Async variant of `filter_recommendations_with_llm`."""
+        if not skus:
+            return []
+
+        products = {sku: self.product_store.get_product(sku) for sku in skus}
+        verdicts = self._cached_verdicts(preferences, skus, products)
+
+        to_judge = [sku for sku in skus if sku not in verdicts]
+        if to_judge:
+            if self.relevance_mode == "batched":
+                judged = await self._judge_batched_async(preferences, to_judge, products)
+            elif self.relevance_mode == "concurrent":
+                judged = await self._judge_concurrent_async(preferences, to_judge, products)
+            else:
+                judged = await self._judge_sequential_async(preferences, to_judge, products)
+            self._record_verdicts(preferences, products, judged, verdicts)
+
+        return [sku for sku in skus if verdicts[sku]]
+
+    def _judge_messages(self, preferences: str, product: Dict[str, Any]) -> List[Dict[str, str]]:
+        prompt = f"""
             
             USER PREFERENCES: {preferences}
             
-            PRODUCT DETAILS: {product_info}
+            PRODUCT DETAILS: {self._format_product(product)}
             
             Is this product relevant to the user's preferences? Consider the product features, description, and intended use.
             Respond with only 'YES' if the product is relevant or 'NO' if it is not relevant.
             """
-            
+        return [
+            {"role": "system", "content": "You are a helpful assistant that evaluates product relevance."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _judge_product(self, preferences: str, product: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        """Single YES/NO relevance judgment for one product."""
+        client = self.client.with_options(timeout=timeout) if timeout is not None else self.client
+        with tracer.span("llm.judge", mode="single", candidates=1) as span:
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=self._judge_messages(preferences, product),
+                max_tokens=10,
+                temperature=0.1
+            )
+            span.record_usage(response.usage)
+
+        evaluation = response.choices[0].message.content.strip().upper()
+        return evaluation == "YES"
+
+    async def _judge_product_async(self, preferences: str, product: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        client = self.async_client.with_options(timeout=timeout) if timeout is not None else self.async_client
+        with tracer.span("llm.judge", mode="single", candidates=1) as span:
+            response = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=self._judge_messages(preferences, product),
+                max_tokens=10,
+                temperature=0.1
+            )
+            span.record_usage(response.usage)
+        return response.choices[0].message.content.strip().upper() == "YES"
+
+    def _judge_before(self, deadline: float, preferences: str, product: Dict[str, Any]) -> bool:
+        """Judgment that gives up by `deadline`, so a call left behind by the fan-out frees its worker in time.
+
+        Running futures cannot be cancelled, the deadline is enforced by the call's own timeout
+        instead, and a call still queued for a worker when it passes is never sent.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Judge deadline passed before the call started")
+        return self._judge_product(preferences, product, timeout=remaining)
+
+    def _judge_sequential(self, preferences: str, skus: List[str],
+                          products: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[bool]]:
+        verdicts = {}
+        for sku in skus:
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that evaluates product relevance."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=10,
-                    temperature=0.1
-                )
-                
-                evaluation = response.choices[0].message.content.strip().upper()
-                
-                if evaluation == "YES":
-                    filtered_recommendations.append(product)
-                    
+                verdicts[sku] = self._judge_product(preferences, products[sku])
+            except Exception as e:
+                logger.error(f"Error in LLM evaluation: {e}")
+                verdicts[sku] = None
+        return verdicts
+
+    def _judge_concurrent(self, preferences: str, skus: List[str],
+                          products: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[bool]]:
+        deadline = time.monotonic() + self.judge_timeout
+        futures = {sku: self._judge_pool.submit(run_in_context(self._judge_before), deadline, preferences, products[sku])
+                   for sku in skus}
+        # Bound the whole fan-out by the timeout, stragglers fall back
+        wait(futures.values(), timeout=self.judge_timeout)
+
+        verdicts = {}
+        for sku, future in futures.items():
+            if not future.done():
+                future.cancel()
+                logger.error(f"LLM evaluation of {sku} timed out after {self.judge_timeout}s")
+                verdicts[sku] = None
+            elif future.exception() is not None:
+                logger.error(f"Error in LLM evaluation: {future.exception()}")
+                verdicts[sku] = None
+            else:
+                verdicts[sku] = future.result()
+        return verdicts
+
+    async def _judge_sequential_async(self, preferences: str, skus: List[str],
+                                      products: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[bool]]:
+        verdicts = {}
+        for sku in skus:
+            try:
+                verdicts[sku] = await self._judge_product_async(preferences, products[sku])
+            except Exception as e:
+                logger.error(f"Error in LLM evaluation: {e}")
+                verdicts[sku] = None
+        return verdicts
+
+    async def _judge_concurrent_async(self, preferences: str, skus: List[str],
+                                      products: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[bool]]:
+        async def judge(sku: str) -> Optional[bool]:
+            try:
+                # Bound each judgment by the timeout, all of them run at once
+                return await asyncio.wait_for(self._judge_product_async(preferences, products[sku]), self.judge_timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"LLM evaluation of {sku} timed out after {self.judge_timeout}s")
             except Exception as e:
                 logger.error(f"Error in LLM evaluation: {e}")
-                # If there's an error, include the product to be safe
-                filtered_recommendations.append(product)
+            return None
+
+        return dict(zip(skus, await asyncio.gather(*(judge(sku) for sku in skus))))
+
+    def _batched_messages(self, preferences: str, skus: List[str],
+                          products: Dict[str, Dict[str, Any]]) -> List[Dict[str, str]]:
+        product_lines = "\n".join(f"- SKU {sku}: {self._format_product(products[sku])}" for sku in skus)
+        prompt = f"""
+            
+            USER PREFERENCES: {preferences}
             
-        return filtered_recommendations
\ No newline at end of file
+            CANDIDATE PRODUCTS:
+            {product_lines}
+            
+            Which of these products are relevant to the user's preferences? Consider the product features, description, and intended use.
+            Respond with a JSON object of the form {{"relevant_skus": ["SKU", ...]}} listing only the relevant SKUs.
+            """
+        return [
+            {"role": "system", "content": "You are a helpful assistant that evaluates product relevance."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _judge_batched(self, preferences: str, skus: List[str],
+                       products: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[bool]]:
+        try:
+            with tracer.span("llm.judge", mode="batched", candidates=len(skus)) as span:
+                response = self.client.with_options(timeout=self.judge_timeout).chat.completions.create(
+                    model="gpt-4o",
+                    messages=self._batched_messages(preferences, skus, products),
+                    response_format={"type": "json_object"},
+                    max_tokens=20 + 15 * len(skus),
+                    temperature=0.1
+                )
+                span.record_usage(response.usage)
+            relevant = set(json.loads(response.choices[0].message.content).get("relevant_skus", []))
+        except Exception as e:
+            logger.error(f"Error in batched LLM evaluation: {e}")
+            return {sku: None for sku in skus}
+
+        return {sku: sku in relevant for sku in skus}
+
+    async def _judge_batched_async(self, preferences: str, skus: List[str],
+                                   products: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[bool]]:
+        try:
+            with tracer.span("llm.judge", mode="batched", candidates=len(skus)) as span:
+                response = await self.async_client.with_options(timeout=self.judge_timeout).chat.completions.create(
+                    model="gpt-4o",
+                    messages=self._batched_messages(preferences, skus, products),
+                    response_format={"type": "json_object"},
+                    max_tokens=20 + 15 * len(skus),
+                    temperature=0.1
+                )
+                span.record_usage(response.usage)
+            relevant = set(json.loads(response.choices[0].message.content).get("relevant_skus", []))
+        except Exception as e:
+            logger.error(f"Error in batched LLM evaluation: {e}")
+            return {sku: None for sku in skus}
+
+        return {sku: sku in relevant for sku in skus}
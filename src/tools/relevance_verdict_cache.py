@@ -0,0 +1,65 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from store.embedding_builder import product_text
+from store.query_embedding_cache import normalize_query
+
+
+def product_version(product: Dict[str, Any]) -> str:
+    """Version of a catalog entry, changes whenever its name, description or tags change."""
+    return hashlib.sha1(product_text(product).encode('utf-8')).hexdigest()
+
+
+class RelevanceVerdictCache:
+    """TTL- and size-bounded cache of LLM relevance verdicts.
+
+    Verdicts are keyed by (normalized preference text, SKU, catalog entry version), so
+    an edited product description never reuses a verdict judged against the old text.
+    Expired entries are dropped on access; the least recently used entry is evicted
+    once `max_entries` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(preferences: str, sku: str, product: Dict[str, Any]) -> Tuple[str, str, str]:
+        return normalize_query(preferences), sku, product_version(product)
+
+    def get(self, preferences: str, sku: str, product: Dict[str, Any]) -> Optional[bool]:
+        """Cached verdict for a product, or None if there is no fresh one."""
+        key = self._key(preferences, sku, product)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            verdict, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return verdict
+
+    def put(self, preferences: str, sku: str, product: Dict[str, Any], verdict: bool) -> None:
+        key = self._key(preferences, sku, product)
+        with self._lock:
+            self._entries[key] = (verdict, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries}
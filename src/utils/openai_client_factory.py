@@ -0,0 +1,240 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from utils.logger import logger
+
+# Transient failures worth another attempt; anything else (bad request, auth) fails fast
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class RetryPolicy:
+    """Deadline, retry and hedging settings applied to every `create` call.
+
+    Args:
+        deadline: Seconds a call may take in total, across every attempt and backoff
+        max_attempts: Attempts per call, including the first
+        backoff_base: First retry delay in seconds, doubled on each further retry
+        backoff_max: Upper bound on a single retry delay
+        hedge_after: Seconds to wait for a response before sending a duplicate request and
+            taking whichever finishes first. None disables hedging.
+        hedge_resources: Top-level client resources whose calls may be hedged. Only
+            idempotent, cheap calls such as embeddings should be listed.
+    """
+
+    def __init__(self, deadline: float = 30.0, max_attempts: int = 3, backoff_base: float = 0.25,
+                 backoff_max: float = 4.0, hedge_after: Optional[float] = None,
+                 hedge_resources: Sequence[str] = ("embeddings",)):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.hedge_resources = tuple(hedge_resources)
+
+    def with_deadline(self, deadline: float) -> "RetryPolicy":
+        return RetryPolicy(deadline, self.max_attempts, self.backoff_base, self.backoff_max,
+                           self.hedge_after, self.hedge_resources)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+class _ResilientResource:
+    """Proxy over an OpenAI client or one of its resources.
+
+    Attribute access walks the SDK's resource tree (`client.chat.completions`), and every
+    `create` method found on the way is wrapped with the retry policy. `with_options`
+    returns another proxy; its `timeout` becomes the deadline of the whole call.
+    """
+
+    def __init__(self, target: Any, policy: RetryPolicy, path: Tuple[str, ...], hedge_pool: ThreadPoolExecutor):
+        self._target = target
+        self._policy = policy
+        self._path = path
+        self._hedge_pool = hedge_pool
+
+    def with_options(self, **options: Any) -> "_ResilientResource":
+        policy = self._policy
+        timeout = options.pop("timeout", None)
+        if isinstance(timeout, (int, float)):
+            policy = policy.with_deadline(float(timeout))
+        target = self._target.with_options(**options) if options else self._target
+        return type(self)(target, policy, self._path, self._hedge_pool)
+
+    def wrap_inner(self, wrap: Callable[[Any], Any]) -> "_ResilientResource":
+        """Same proxy over `wrap(target)`, so the wrapper sees every attempt rather than the whole call."""
+        return type(self)(wrap(self._target), self._policy, self._path, self._hedge_pool)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name == "create" and callable(attribute):
+            return self._wrap(attribute)
+        if name.startswith("_") or callable(attribute) or isinstance(attribute, (str, int, float, bool, type(None))):
+            return attribute
+        return type(self)(attribute, self._policy, self._path + (name,), self._hedge_pool)
+
+    def _should_hedge(self, kwargs: dict) -> bool:
+        return (self._policy.hedge_after is not None and not kwargs.get("stream")
+                and bool(self._path) and self._path[0] in self._policy.hedge_resources)
+
+    def _wrap(self, create: Callable[..., Any]) -> Callable[..., Any]:
+        def create_with_retries(*args: Any, **kwargs: Any) -> Any:
+            policy = self._policy
+            deadline = time.monotonic() + policy.deadline
+            hedge = self._should_hedge(kwargs)
+            for attempt in range(1, policy.max_attempts + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise openai.APITimeoutError(request=None)
+                try:
+                    if hedge:
+                        return self._hedged(create, args, {**kwargs, "timeout": remaining}, remaining)
+                    return create(*args, **{**kwargs, "timeout": remaining})
+                except RETRYABLE_ERRORS as e:
+                    delay = policy.backoff(attempt)
+                    if attempt == policy.max_attempts or time.monotonic() + delay >= deadline:
+                        raise
+                    logger.error(f"OpenAI {'.'.join(self._path)} call failed ({e}), retry {attempt} in {delay:.2f}s")
+                    time.sleep(delay)
+        return create_with_retries
+
+    def _hedged(self, create: Callable[..., Any], args: tuple, kwargs: dict, remaining: float) -> Any:
+        primary = self._hedge_pool.submit(create, *args, **kwargs)
+        done, _ = wait([primary], timeout=min(self._policy.hedge_after, remaining))
+        if done:
+            return primary.result()
+        # The primary is slow: race a duplicate and take the first success
+        pending = {primary, self._hedge_pool.submit(create, *args, **kwargs)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+class _AsyncResilientResource(_ResilientResource):
+    """Asyncio counterpart of `_ResilientResource` for AsyncOpenAI."""
+
+    def _wrap(self, create: Callable[..., Any]) -> Callable[..., Any]:
+        async def create_with_retries(*args: Any, **kwargs: Any) -> Any:
+            policy = self._policy
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + policy.deadline
+            hedge = self._should_hedge(kwargs)
+            for attempt in range(1, policy.max_attempts + 1):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise openai.APITimeoutError(request=None)
+                try:
+                    if hedge:
+                        return await self._hedged_async(create, args, {**kwargs, "timeout": remaining}, remaining)
+                    return await create(*args, **{**kwargs, "timeout": remaining})
+                except RETRYABLE_ERRORS as e:
+                    delay = policy.backoff(attempt)
+                    if attempt == policy.max_attempts or loop.time() + delay >= deadline:
+                        raise
+                    logger.error(f"OpenAI {'.'.join(self._path)} call failed ({e}), retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+        return create_with_retries
+
+    async def _hedged_async(self, create: Callable[..., Any], args: tuple, kwargs: dict, remaining: float) -> Any:
+        primary = asyncio.ensure_future(create(*args, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=min(self._policy.hedge_after, remaining))
+        if done:
+            return primary.result()
+        pending = {primary, asyncio.ensure_future(create(*args, **kwargs))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class OpenAIClientFactory:
+    """Builds the OpenAI clients shared by every component.
+
+    One sync and one async client are created lazily and reused, each on a keep-alive
+    connection pool. The SDK's own retries are disabled; the returned clients are proxies
+    that give every `create` call a total deadline, jittered exponential retries on
+    transient errors and, optionally, hedged requests.
+    """
+
+    _shared: Optional["OpenAIClientFactory"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, connect_timeout: float = 5.0,
+                 max_connections: int = 100, max_keepalive_connections: int = 20, keepalive_expiry: float = 60.0,
+                 hedge_workers: int = 64):
+        """
+        Args:
+            api_key: OpenAI API key, read from OPENAI_API_KEY when omitted
+            base_url: API base URL, e.g. a local fake server for testing
+            retry_policy: Deadline, retry and hedging settings
+            connect_timeout: Seconds allowed to establish a connection
+            max_connections: Upper bound on open connections per client
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept
+            hedge_workers: Threads available for hedged sync requests
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.connect_timeout = connect_timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self._hedge_pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="openai-hedge")
+        self._lock = threading.Lock()
+        self._client: Optional[_ResilientResource] = None
+        self._async_client: Optional[_AsyncResilientResource] = None
+
+    @classmethod
+    def shared(cls) -> "OpenAIClientFactory":
+        """Process-wide default factory, for components constructed without one."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _timeout(self) -> httpx.Timeout:
+        # Per-request read timeouts come from the call deadline, this only bounds connecting
+        return httpx.Timeout(self.retry_policy.deadline, connect=self.connect_timeout)
+
+    def client(self) -> OpenAI:
+        """The shared sync client."""
+        with self._lock:
+            if self._client is None:
+                http_client = httpx.Client(limits=self.limits, timeout=self._timeout())
+                sdk_client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=http_client)
+                self._client = _ResilientResource(sdk_client, self.retry_policy, (), self._hedge_pool)
+            return self._client
+
+    def async_client(self) -> AsyncOpenAI:
+        """The shared async client. Its connection pool belongs to the event loop that first uses it."""
+        with self._lock:
+            if self._async_client is None:
+                http_client = httpx.AsyncClient(limits=self.limits, timeout=self._timeout())
+                sdk_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                         http_client=http_client)
+                self._async_client = _AsyncResilientResource(sdk_client, self.retry_policy, (), self._hedge_pool)
+            return self._async_client
@@ -0,0 +1,25 @@
+from typing import Any, Dict
+
+# Rough average for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+# Role, separators and priming tokens added around every chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-leaning token estimate for a piece of text."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the prompt tokens one chat message contributes, including tool calls."""
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+    if message.get("name"):
+        tokens += estimate_tokens(message["name"])
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        tokens += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(function.get("name", "")) + \
+            estimate_tokens(function.get("arguments", ""))
+    return tokens
@@ -0,0 +1,245 @@
+"""
+Tracing Module
+
+Lightweight spans around the stages of a conversation turn (chat completions, embeddings,
+relevance judgments, tool execution). Every finished span feeds in-process latency
+histograms and token counters; sampled traces are also written as JSON lines.
+
+Tracing is off until `tracer.configure()` is called, and a disabled tracer hands out a
+shared no-op span, so instrumented code pays only an attribute check.
+"""
+import contextvars
+import functools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+from utils.logger import logger
+
+PERCENTILES = (50, 95, 99)
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage of a trace. Use as a context manager; nested spans become its children."""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "sampled", "attributes", "usage",
+                 "start_time", "duration", "error", "_start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], sampled: bool, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.sampled = sampled
+        self.attributes = attributes
+        self.usage: Dict[str, int] = {}
+        self.start_time = 0.0
+        self.duration = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_usage(self, usage: Any) -> None:
+        """Add the token counts of an API `usage` object (or dict) to this span."""
+        if usage is None:
+            return
+        for field in USAGE_FIELDS:
+            value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+            if isinstance(value, int):
+                self.usage[field] = self.usage.get(field, 0) + value
+
+    def __enter__(self) -> "Span":
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_value is not None:
+            self.error = f"{exc_type.__name__}: {exc_value}"
+        self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "usage": self.usage,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Span handed out while tracing is disabled."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def record_usage(self, usage: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Histogram:
+    """Latency distribution over the most recent `max_samples` observations, plus lifetime totals."""
+
+    def __init__(self, max_samples: int = 4096):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = sorted(self._samples)
+        stats = {"count": self.count, "mean": self.total / self.count if self.count else 0.0}
+        for percentile in PERCENTILES:
+            # Nearest-rank percentile
+            index = max(0, -(-len(samples) * percentile // 100) - 1)
+            stats[f"p{percentile}"] = samples[index] if samples else 0.0
+        return stats
+
+
+class MetricsRegistry:
+    """Histograms and counters keyed by name, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "latency_ms": {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+
+class JsonlTraceExporter:
+    """Appends finished spans to a file, one JSON object per line.
+
+    Writes are buffered and flushed whenever a trace's root span finishes.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self._lock:
+            self._file.write(lines)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Creates spans and records them into metrics and, for sampled traces, the exporter.
+
+    Sampling is decided once per trace at its root span, so an exported trace is always
+    complete. Metrics are recorded for every span regardless of sampling.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.exporter: Optional[JsonlTraceExporter] = None
+        self.metrics = MetricsRegistry()
+
+    def configure(self, enabled: bool = True, sample_rate: float = 1.0,
+                  export_path: Optional[Union[str, Path]] = None) -> None:
+        """
+        Args:
+            enabled: Record spans at all; when False spans are no-ops
+            sample_rate: Fraction of traces written to the exporter
+            export_path: JSONL file receiving sampled spans, or None to keep metrics only
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Sample rate must be between 0 and 1: {sample_rate}")
+        if self.exporter is not None:
+            self.exporter.close()
+        self.exporter = JsonlTraceExporter(export_path) if export_path else None
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+
+    def span(self, name: str, **attributes: Any) -> Union[Span, _NoopSpan]:
+        """Start a span as a child of the current one, or as the root of a new trace."""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        sampled = parent.sampled if parent is not None else random.random() < self.sample_rate
+        return Span(self, name, parent, sampled, attributes)
+
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(span.name, span.duration * 1000)
+        self.metrics.increment(f"{span.name}.calls")
+        if span.error is not None:
+            self.metrics.increment(f"{span.name}.errors")
+        for field, value in span.usage.items():
+            self.metrics.increment(f"{span.name}.{field}", value)
+        if span.sampled and self.exporter is not None:
+            try:
+                self.exporter.export([span.to_dict()])
+                if span.parent_id is None:
+                    self.exporter.flush()
+            except Exception as e:
+                logger.error(f"Error exporting trace span {span.name}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, **self.metrics.snapshot()}
+
+
+def run_in_context(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind `function` to the caller's context so spans opened in a worker thread join the current trace."""
+    return functools.partial(contextvars.copy_context().run, function)
+
+
+# Process-wide tracer, disabled until configured
+tracer = Tracer()
@@ -0,0 +1,377 @@
+import asyncio
+import inspect
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+
+from utils.token_estimator import CHARS_PER_TOKEN, estimate_message_tokens, estimate_tokens
+
+PRIORITIES = ("interactive", "judge", "background")
+# Output tokens reserved for a chat completion until its real usage is known
+EXPECTED_OUTPUT_TOKENS = 256
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available, 0 if it already is."""
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class _Waiter:
+    def __init__(self, priority: str, session: str, tokens: int):
+        self.priority = priority
+        self.session = session
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+
+def estimate_prompt_tokens(kwargs: Dict[str, Any]) -> int:
+    """Tokens the messages or embedding inputs of a request count against the quota."""
+    tokens = 0
+    for message in kwargs.get("messages") or []:
+        tokens += estimate_message_tokens(message)
+    inputs = kwargs.get("input") or []
+    for text in [inputs] if isinstance(inputs, str) else inputs:
+        tokens += estimate_tokens(text)
+    return tokens
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Tokens reserved for a request before it is sent: its prompt plus the output it is expected to produce.
+
+    Replies rarely come near max_tokens, so only up to EXPECTED_OUTPUT_TOKENS of it is
+    reserved. `settle` corrects the reservation in either direction once usage is known.
+    """
+    tokens = estimate_prompt_tokens(kwargs)
+    if "messages" in kwargs:
+        tokens += min(kwargs.get("max_tokens") or EXPECTED_OUTPUT_TOKENS, EXPECTED_OUTPUT_TOKENS)
+    return max(1, tokens)
+
+
+class UpstreamScheduler:
+    """Admits upstream API calls within requests-per-minute and tokens-per-minute budgets.
+
+    Waiting calls are served strictly by priority class ("interactive" before "judge"
+    before "background"). Within a class, sessions take turns round-robin, so one busy
+    conversation cannot starve the others. Only the call at the head of that order may
+    take budget, which keeps a large request from being overtaken forever by small ones.
+
+    Calls reach the scheduler through `bind`, which returns a view of an OpenAI client
+    whose `create` methods wait for admission first. A retrying client from
+    OpenAIClientFactory is bound beneath its retry loop, so every attempt, including
+    retries after a rate limit, is admitted and settled on its own.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 200000):
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        # priority -> session -> waiters of that session, sessions in round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {priority: OrderedDict() for priority in PRIORITIES}
+        self._anonymous_sessions = itertools.count()
+        self._stats = {priority: {"granted": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0} for priority in PRIORITIES}
+
+    def set_limits(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        """Replace both budgets, e.g. after the account's rate limits changed. Each bucket starts full."""
+        with self._condition:
+            self._requests = TokenBucket(requests_per_minute)
+            self._tokens = TokenBucket(tokens_per_minute)
+            self._condition.notify_all()
+
+    def _head(self) -> Optional[_Waiter]:
+        for priority in PRIORITIES:
+            sessions = self._queues[priority]
+            if sessions:
+                return next(iter(sessions.values()))[0]
+        return None
+
+    def _enqueue(self, priority: str, session: Optional[str], tokens: int) -> _Waiter:
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        session = session if session is not None else f"anonymous-{next(self._anonymous_sessions)}"
+        # A single request can never need more than a full bucket
+        waiter = _Waiter(priority, session, min(tokens, int(self._tokens.capacity)))
+        self._queues[priority].setdefault(session, deque()).append(waiter)
+        return waiter
+
+    def _try_grant(self, waiter: _Waiter) -> float:
+        """Grant `waiter` if it is next in line and the budget allows; else return seconds to wait."""
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        if self._head() is not waiter:
+            return 0.05
+        wait_time = max(self._requests.wait_time(1), self._tokens.wait_time(waiter.tokens))
+        if wait_time > 0:
+            return wait_time
+
+        self._requests.level -= 1
+        self._tokens.level -= waiter.tokens
+        sessions = self._queues[waiter.priority]
+        queue = sessions.pop(waiter.session)
+        queue.popleft()
+        if queue:
+            # The session goes to the back of the line for its next call
+            sessions[waiter.session] = queue
+        waited = now - waiter.enqueued
+        stats = self._stats[waiter.priority]
+        stats["granted"] += 1
+        stats["wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        self._condition.notify_all()
+        return 0.0
+
+    def _remove(self, waiter: _Waiter) -> None:
+        """Take a waiter that gave up out of its queue, so it no longer blocks the calls behind it."""
+        sessions = self._queues[waiter.priority]
+        queue = sessions.get(waiter.session)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del sessions[waiter.session]
+        self._condition.notify_all()
+
+    def acquire(self, priority: str, session: Optional[str] = None, tokens: int = 1) -> int:
+        """Block until a call of `tokens` estimated tokens may be sent, returning the tokens granted."""
+        with self._condition:
+            waiter = self._enqueue(priority, session, tokens)
+            try:
+                while True:
+                    wait_time = self._try_grant(waiter)
+                    if wait_time == 0:
+                        return waiter.tokens
+                    self._condition.wait(timeout=wait_time)
+            except BaseException:
+                self._remove(waiter)
+                raise
+
+    async def acquire_async(self, priority: str, session: Optional[str] = None, tokens: int = 1) -> int:
+        """Async variant of `acquire`; waits on the event loop instead of blocking a thread."""
+        with self._condition:
+            waiter = self._enqueue(priority, session, tokens)
+        try:
+            while True:
+                with self._condition:
+                    wait_time = self._try_grant(waiter)
+                if wait_time == 0:
+                    return waiter.tokens
+                # Async waiters cannot be notified through the condition, so poll at a short interval
+                await asyncio.sleep(min(wait_time, 0.05))
+        except BaseException:
+            # Cancelled, e.g. by a timeout around the call
+            with self._condition:
+                self._remove(waiter)
+            raise
+
+    def settle(self, granted_tokens: int, used_tokens: Optional[int]) -> None:
+        """Correct a reservation once the real usage is known.
+
+        Unused tokens go back to the bucket. A call that used more than it reserved leaves
+        the bucket in debt, which later calls wait out.
+        """
+        if used_tokens is None or used_tokens == granted_tokens:
+            return
+        with self._condition:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + granted_tokens - used_tokens)
+            self._condition.notify_all()
+
+    def bind(self, client: Any, priority: str, session: Optional[str] = None) -> Any:
+        """View of an OpenAI client (sync or async) whose calls are admitted by this scheduler.
+
+        Args:
+            client: OpenAI or AsyncOpenAI client, or a proxy with the same interface
+            priority: "interactive", "judge" or "background"
+            session: Key for fair queuing, typically a conversation id. Calls without a
+                session each queue on their own.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        # Looked up on the type, proxies forward unknown attributes to the SDK client
+        if getattr(type(client), "wrap_inner", None) is not None:
+            return client.wrap_inner(lambda target: _ScheduledResource(target, self, priority, session))
+        return _ScheduledResource(client, self, priority, session)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            stats = {}
+            for priority in PRIORITIES:
+                sessions = self._queues[priority]
+                granted = self._stats[priority]["granted"]
+                stats[priority] = {
+                    "queue_depth": sum(len(queue) for queue in sessions.values()),
+                    "waiting_sessions": len(sessions),
+                    "granted": granted,
+                    "mean_wait_seconds": self._stats[priority]["wait_seconds"] / granted if granted else 0.0,
+                    "max_wait_seconds": self._stats[priority]["max_wait_seconds"],
+                }
+            stats["requests_available"] = int(self._requests.level)
+            stats["tokens_available"] = int(self._tokens.level)
+            return stats
+
+
+class _ScheduledResource:
+    """Proxy over an OpenAI client whose `create` methods wait for scheduler admission."""
+
+    def __init__(self, target: Any, scheduler: UpstreamScheduler, priority: str, session: Optional[str]):
+        self._target = target
+        self._scheduler = scheduler
+        self._priority = priority
+        self._session = session
+
+    def with_options(self, **options: Any) -> "_ScheduledResource":
+        return _ScheduledResource(self._target.with_options(**options), self._scheduler, self._priority, self._session)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name == "create" and callable(attribute):
+            return self._wrap(attribute)
+        if name.startswith("_") or callable(attribute) or isinstance(attribute, (str, int, float, bool, type(None))):
+            return attribute
+        return _ScheduledResource(attribute, self._scheduler, self._priority, self._session)
+
+    def _wrap(self, create: Callable[..., Any]) -> Callable[..., Any]:
+        scheduler, priority, session = self._scheduler, self._priority, self._session
+
+        def settle(response: Any, granted: int, kwargs: Dict[str, Any]) -> Any:
+            if kwargs.get("stream"):
+                # Usage is only known once the stream has been read
+                return _SettlingStream(response, scheduler, granted, estimate_prompt_tokens(kwargs))
+            scheduler.settle(granted, _used_tokens(response))
+            return response
+
+        def settle_failure(error: BaseException, granted: int, kwargs: Dict[str, Any]) -> None:
+            # A call the API answered with an error status used no tokens; one that timed out
+            # or lost its connection may still have been processed, so its prompt is charged
+            used = 0 if getattr(error, "status_code", None) is not None else estimate_prompt_tokens(kwargs)
+            scheduler.settle(granted, used)
+
+        def remaining_timeout(kwargs: Dict[str, Any], started: float) -> Dict[str, Any]:
+            # Time spent queuing comes out of the attempt's own timeout
+            timeout = kwargs.get("timeout")
+            if isinstance(timeout, (int, float)):
+                kwargs = {**kwargs, "timeout": max(0.001, timeout - (time.monotonic() - started))}
+            return kwargs
+
+        # SDK methods are wrapped by plain decorators, so look through to the coroutine function
+        if inspect.iscoroutinefunction(create) or inspect.iscoroutinefunction(getattr(create, "__wrapped__", None)):
+            async def scheduled_create_async(*args: Any, **kwargs: Any) -> Any:
+                started = time.monotonic()
+                granted = await scheduler.acquire_async(priority, session, estimate_request_tokens(kwargs))
+                try:
+                    response = await create(*args, **remaining_timeout(kwargs, started))
+                except BaseException as e:
+                    settle_failure(e, granted, kwargs)
+                    raise
+                return settle(response, granted, kwargs)
+            return scheduled_create_async
+
+        def scheduled_create(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            granted = scheduler.acquire(priority, session, estimate_request_tokens(kwargs))
+            try:
+                response = create(*args, **remaining_timeout(kwargs, started))
+            except BaseException as e:
+                settle_failure(e, granted, kwargs)
+                raise
+            return settle(response, granted, kwargs)
+        return scheduled_create
+
+
+def _used_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+class _SettlingStream:
+    """Proxy over a streamed completion (sync or async) that settles its reservation when the stream ends.
+
+    Usage comes from the final usage chunk when the request asked for one, otherwise from
+    the prompt estimate plus the length of the streamed content and tool call arguments.
+    """
+
+    def __init__(self, stream: Any, scheduler: UpstreamScheduler, granted: int, prompt_tokens: int):
+        self._stream = stream
+        self._scheduler = scheduler
+        self._granted = granted
+        self._prompt_tokens = prompt_tokens
+        self._used_tokens: Optional[int] = None
+        self._streamed_chars = 0
+        self._settled = False
+
+    def _observe(self, chunk: Any) -> None:
+        used = _used_tokens(chunk)
+        if used is not None:
+            self._used_tokens = used
+        for choice in getattr(chunk, "choices", None) or []:
+            delta = getattr(choice, "delta", None)
+            self._streamed_chars += len(getattr(delta, "content", None) or "")
+            for tool_call in getattr(delta, "tool_calls", None) or []:
+                function = getattr(tool_call, "function", None)
+                self._streamed_chars += len(getattr(function, "name", None) or "")
+                self._streamed_chars += len(getattr(function, "arguments", None) or "")
+
+    def _settle(self) -> None:
+        if self._settled:
+            return
+        self._settled = True
+        used = self._used_tokens
+        if used is None:
+            used = self._prompt_tokens + (self._streamed_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        self._scheduler.settle(self._granted, used)
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for chunk in self._stream:
+                self._observe(chunk)
+                yield chunk
+        finally:
+            self._settle()
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        try:
+            async for chunk in self._stream:
+                self._observe(chunk)
+                yield chunk
+        finally:
+            self._settle()
+
+    def close(self) -> Any:
+        try:
+            return self._stream.close()
+        finally:
+            self._settle()
+
+    def __enter__(self) -> "_SettlingStream":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "_SettlingStream":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        closed = self.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules import each other relative to src, as when run from that directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from benchmark.fake_openai_server import FakeOpenAIServer, FaultProfile  # noqa: E402
+
+
+@pytest.fixture
+def fake_api():
+    """Starts fake OpenAI servers with the given fault profile, shut down after the test."""
+    servers = []
+
+    def start(**faults):
+        server = FakeOpenAIServer(("127.0.0.1", 0), FaultProfile(**faults), dimension=8).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
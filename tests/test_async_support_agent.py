@@ -0,0 +1,19 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from agent.async_support_agent import AsyncSupportAgent
+from agent.intent_router import RoutedTurn
+
+
+def test_routed_lookup_runs_off_the_event_loop():
+    lookup_threads = []
+
+    def route(message):
+        lookup_threads.append(threading.current_thread())
+        return RoutedTurn("lookup_order", {"order_number": "#W1"}, {"OrderNumber": "#W1"}, "Order #W1 has shipped.")
+
+    prompts = SimpleNamespace(get_agent_prompt=lambda: "You are a support agent.")
+    agent = AsyncSupportAgent(prompts, SimpleNamespace(), SimpleNamespace(), intent_router=SimpleNamespace(route=route))
+    assert asyncio.run(agent.process_message("Where is order W1?")) == "Order #W1 has shipped."
+    assert lookup_threads and lookup_threads[0] is not threading.main_thread()
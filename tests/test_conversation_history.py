@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from agent.conversation_history import ConversationHistory
+from utils.upstream_scheduler import UpstreamScheduler
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def chat_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def tool_turn(turn):
+    call_ids = [f"call_{turn}_{i}" for i in range(2)]
+    return [
+        {"role": "user", "content": f"Where are my orders, turn {turn}? " + "please " * 20},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "lookup_order", "arguments": "{}"}}
+            for call_id in call_ids]},
+        *({"role": "tool", "tool_call_id": call_id, "name": "lookup_order", "content": "shipped " * 50}
+          for call_id in call_ids),
+        {"role": "assistant", "content": f"Both orders shipped, turn {turn}."},
+    ]
+
+
+def assert_tool_calls_paired(messages, complete=True):
+    """Every tool result answers a call of the assistant message before it, and every call is answered.
+
+    With `complete` False the last tool call may still be waiting for results, as in the middle of a turn.
+    """
+    open_calls = set()
+    for message in messages:
+        if message["role"] == "tool":
+            assert message["tool_call_id"] in open_calls
+            open_calls.remove(message["tool_call_id"])
+        else:
+            assert not open_calls
+            open_calls = {call["id"] for call in message.get("tool_calls") or []}
+    assert not complete or not open_calls
+
+
+def test_compaction_never_splits_a_tool_call_from_its_results():
+    for keep_recent_turns in (0, 1, 2):
+        history = ConversationHistory("You are a support agent.", max_prompt_tokens=300,
+                                      keep_recent_turns=keep_recent_turns)
+        for turn in range(8):
+            for message in tool_turn(turn):
+                history.append(message)
+                assert_tool_calls_paired(history.messages, complete=False)
+            assert_tool_calls_paired(history.messages)
+        assert history.messages[1]["content"].startswith(ConversationHistory.SUMMARY_PREFIX)
+        # The latest turn is always kept verbatim
+        assert history.messages[-1]["content"] == "Both orders shipped, turn 7."
+
+
+def test_summary_is_requested_in_the_background_at_background_priority():
+    release = threading.Event()
+
+    def create(**kwargs):
+        release.wait(5)
+        return completion("Customer asked about two shipped orders.")
+
+    scheduler = UpstreamScheduler(requests_per_minute=6000, tokens_per_minute=60000)
+    history = ConversationHistory("You are a support agent.", client=scheduler.bind(chat_client(create), "background"),
+                                  max_prompt_tokens=300)
+    for turn in range(3):
+        for message in tool_turn(turn):
+            history.append(message)
+
+    # Appending did not wait for the summary, the excerpt stands in until it arrives
+    summary = history.messages[1]["content"]
+    assert "turn 0" in summary
+    release.set()
+    history._pending_summary.result(timeout=5)
+    assert history.messages[1]["content"] == ConversationHistory.SUMMARY_PREFIX + "Customer asked about two shipped orders."
+    assert scheduler.get_stats()["background"]["granted"] >= 1
+
+
+def test_async_client_summarizes_on_the_event_loop():
+    async def create(**kwargs):
+        return completion("Async summary.")
+
+    async def scenario():
+        history = ConversationHistory("You are a support agent.", client=chat_client(create), max_prompt_tokens=300)
+        for turn in range(3):
+            for message in tool_turn(turn):
+                history.append(message)
+        await history._pending_summary
+        return history.messages
+
+    messages = asyncio.run(scenario())
+    assert messages[1]["content"] == ConversationHistory.SUMMARY_PREFIX + "Async summary."
+    assert_tool_calls_paired(messages)
+
+
+def test_stale_summary_does_not_replace_a_newer_one():
+    history = ConversationHistory("You are a support agent.", client=chat_client(lambda **kwargs: completion("x")),
+                                  max_prompt_tokens=300)
+    history._summary_generation = 2
+    history._apply_summary(1, "Summary of fewer turns.")
+    assert len(history.messages) == 1
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from store.embedding_builder import EmbeddingBuilder, content_hash, product_text
+from store.embedding_cache import EmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+class FakeEmbeddingsClient:
+    def __init__(self):
+        self.inputs = []
+        self.embeddings = SimpleNamespace(create=self.create)
+
+    def create(self, input, model):
+        self.inputs.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)), usage=None)
+
+
+def product(name, description="Sturdy", tags=("camping",)):
+    return {"ProductName": name, "Description": description, "Tags": list(tags)}
+
+
+def test_only_new_and_changed_products_are_embedded(tmp_path):
+    catalog = {"A": product("Tent"), "B": product("Stove"), "C": product("Lantern")}
+    client = FakeEmbeddingsClient()
+    cache = EmbeddingCache(tmp_path, MODEL)
+    builder = EmbeddingBuilder(client, cache, MODEL, batch_size=2, max_workers=2)
+    assert builder.build(catalog) == 3
+
+    client.inputs.clear()
+    assert builder.build(catalog) == 0
+    assert client.inputs == []
+
+    catalog["B"] = product("Stove", description="Now with a windscreen")
+    catalog["D"] = product("Mug")
+    assert builder.build(catalog) == 2
+    assert sorted(text for batch in client.inputs for text in batch) == sorted(
+        [product_text(catalog["B"]), product_text(catalog["D"])])
+
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    assert reopened.content_hashes() == {sku: content_hash(product_text(item), MODEL) for sku, item in catalog.items()}
+
+
+def test_changing_model_changes_every_content_hash():
+    text = product_text(product("Tent"))
+    assert content_hash(text, MODEL) != content_hash(text, "other-model")
@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from store.embedding_cache import EmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_appended_rows_survive_a_reopen(tmp_path):
+    cache = EmbeddingCache(tmp_path, MODEL)
+    cache.append(["A", "B"], [[3, 4], [1, 0]], ["ha", "hb"])
+    cache.append(["A"], [[0, 2]], ["ha2"])
+
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    assert len(reopened) == 3
+    assert reopened.dimension == 2
+    assert reopened.skus == ["A", "B", "A"]
+    # The latest row of a SKU wins
+    assert reopened.sku_rows() == {"A": 2, "B": 1}
+    assert reopened.content_hashes() == {"A": "ha2", "B": "hb"}
+    np.testing.assert_allclose(reopened.vectors, unit([[3, 4], [1, 0], [0, 2]]), rtol=1e-6)
+
+
+def test_uncommitted_tail_is_ignored_and_overwritten(tmp_path):
+    cache = EmbeddingCache(tmp_path, MODEL)
+    cache.append(["A"], [[1, 0]], ["ha"])
+    # An append that wrote rows but crashed before committing the header
+    with open(tmp_path / EmbeddingCache.VECTORS_FILE, "ab") as f:
+        f.write(np.ones(2, dtype=np.float32).tobytes())
+    with open(tmp_path / EmbeddingCache.MANIFEST_FILE, "ab") as f:
+        f.write(b"LOST\thl\n")
+
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    assert reopened.skus == ["A"]
+    reopened.append(["B"], [[0, 1]], ["hb"])
+    assert EmbeddingCache(tmp_path, MODEL).skus == ["A", "B"]
+
+
+def test_cache_for_another_model_starts_empty(tmp_path):
+    EmbeddingCache(tmp_path, MODEL).append(["A"], [[1, 0]])
+    assert len(EmbeddingCache(tmp_path, "other-model")) == 0
+
+
+def test_compact_keeps_the_latest_row_of_each_kept_sku(tmp_path):
+    cache = EmbeddingCache(tmp_path, MODEL)
+    cache.append(["A", "B", "C"], [[1, 0], [0, 1], [1, 1]], ["ha", "hb", "hc"])
+    cache.append(["B"], [[1, 2]], ["hb2"])
+
+    cache.compact(keep_skus=["C", "B"])
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    # Rows keep their original relative order
+    assert reopened.skus == ["C", "B"]
+    assert reopened.content_hashes() == {"C": "hc", "B": "hb2"}
+    np.testing.assert_allclose(reopened.vectors, unit([[1, 1], [1, 2]]), rtol=1e-6)
+
+
+def test_compact_to_nothing_empties_the_cache(tmp_path):
+    cache = EmbeddingCache(tmp_path, MODEL)
+    cache.append(["A"], [[1, 0]])
+    cache.compact(keep_skus=[])
+
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    assert len(reopened) == 0
+    reopened.append(["B"], [[0, 1]])
+    assert EmbeddingCache(tmp_path, MODEL).skus == ["B"]
+
+
+def test_crash_while_writing_compacted_files_keeps_the_old_cache(tmp_path, monkeypatch):
+    cache = EmbeddingCache(tmp_path, MODEL)
+    cache.append(["A", "B"], [[1, 0], [0, 1]], ["ha", "hb"])
+    cache.append(["A"], [[1, 1]], ["ha2"])
+
+    def crash(*args):
+        raise OSError("crash before any rename")
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        cache.compact()
+    monkeypatch.undo()
+
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    assert reopened.skus == ["A", "B", "A"]
+    assert reopened.content_hashes() == {"A": "ha2", "B": "hb"}
+
+
+def test_crash_between_renames_is_detected_and_rebuilt(tmp_path, monkeypatch):
+    cache = EmbeddingCache(tmp_path, MODEL)
+    cache.append(["A", "B"], [[1, 0], [0, 1]], ["ha", "hb"])
+    cache.append(["A"], [[1, 1]], ["ha2"])
+
+    real_replace = os.replace
+    renames = []
+
+    def crash_after_first_rename(source, destination):
+        if renames:
+            raise OSError("crash between renames")
+        renames.append(destination)
+        real_replace(source, destination)
+    monkeypatch.setattr(os, "replace", crash_after_first_rename)
+    with pytest.raises(OSError):
+        cache.compact()
+    monkeypatch.undo()
+
+    # The compacted vectors file replaced the old one, the old header still claims three rows
+    with open(tmp_path / EmbeddingCache.HEADER_FILE) as f:
+        assert json.load(f)["count"] == 3
+    reopened = EmbeddingCache(tmp_path, MODEL)
+    assert len(reopened) == 0
+    reopened.append(["A"], [[1, 0]], ["ha"])
+    assert EmbeddingCache(tmp_path, MODEL).content_hashes() == {"A": "ha"}
+
+
+def test_migrate_from_json(tmp_path):
+    json_file = tmp_path / "ProductEmbeddings.json"
+    json_file.write_text(json.dumps({"A": [1.0, 0.0], "B": [0.0, 2.0]}))
+
+    cache = EmbeddingCache.migrate_from_json(json_file, tmp_path / "cache", MODEL, content_hashes={"A": "ha"})
+    assert cache.skus == ["A", "B"]
+    assert cache.content_hashes() == {"A": "ha", "B": None}
+    np.testing.assert_allclose(cache.vectors, [[1, 0], [0, 1]])
+
+    # A second migration leaves the populated cache alone
+    json_file.write_text(json.dumps({"C": [1.0, 1.0]}))
+    assert EmbeddingCache.migrate_from_json(json_file, tmp_path / "cache", MODEL).skus == ["A", "B"]
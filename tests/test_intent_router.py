@@ -0,0 +1,74 @@
+import pytest
+
+from agent.intent_router import IntentRouter
+
+
+class FakeFunctionTools:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def execute_function(self, name, arguments):
+        self.calls.append((name, arguments))
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.mark.parametrize("message", [
+    "Where is my order #W001? My email is a@b.com",
+    "Hi! Where is my order #W001? My email is a@b.com. Thanks!",
+    "What's the status of order W001 for a@b.com?",
+    "Has my order #W0012345 shipped yet? customer1@example.com",
+])
+def test_plain_status_questions_are_routed(message):
+    assert IntentRouter.extract_order_query(message) is not None
+
+
+@pytest.mark.parametrize("message", [
+    "Where is my order #W001? email a@b.com. Also is the tent waterproof?",
+    "Where is order W001 (a@b.com)? … can you expedite?",
+    "I did not order W001, a@b.com, why was I charged?",
+    "Where is my order W001? Has it shipped? a@b.com",
+    "My order W001 arrived damaged, a@b.com",
+    "I want to cancel order W001, a@b.com",
+    "Order #W001, a@b.com: has it shipped yet, and is there a promotion for my next order?",
+    "Where are my orders W001 and W002? a@b.com",
+    "Where is my order W001?",
+    "Where is my order? a@b.com",
+])
+def test_anything_beyond_a_status_question_goes_to_the_model(message):
+    assert IntentRouter.extract_order_query(message) is None
+
+
+def test_order_number_and_email_are_normalized():
+    query = IntentRouter.extract_order_query("where is order w001, my email is A@B.com?")
+    assert query == {"email": "a@b.com", "order_number": "#W001"}
+
+
+def test_email_that_looks_like_an_order_number_is_not_one():
+    assert IntentRouter.extract_order_query("Where is my order? w001@example.com") is None
+
+
+def test_found_order_is_answered_from_its_status_template():
+    tools = FakeFunctionTools({"found": True, "order": {"OrderNumber": "#W001", "Status": "delivered",
+                                                        "TrackingLink": "https://track.example/1"}})
+    router = IntentRouter(tools)
+    turn = router.route("Where is my order #W001? My email is a@b.com")
+    assert tools.calls == [("lookup_order", {"email": "a@b.com", "order_number": "#W001"})]
+    assert "#W001 has been delivered" in turn.response
+    assert "https://track.example/1" in turn.response
+    assert router.get_stats() == {"routed": 1, "fallback": 0}
+
+
+def test_unknown_order_is_answered_without_the_model():
+    router = IntentRouter(FakeFunctionTools({"found": False, "message": "Order not found."}))
+    turn = router.route("Where is my order #W001? My email is a@b.com")
+    assert "couldn't find an order #W001 for a@b.com" in turn.response
+
+
+@pytest.mark.parametrize("result", [{"error": "Invalid arguments"}, RuntimeError("store unavailable")])
+def test_failed_lookup_falls_back_to_the_model(result):
+    router = IntentRouter(FakeFunctionTools(result))
+    assert router.route("Where is my order #W001? My email is a@b.com") is None
+    assert router.get_stats() == {"routed": 0, "fallback": 1}
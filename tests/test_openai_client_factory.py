@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from utils.openai_client_factory import OpenAIClientFactory, RetryPolicy
+from utils.upstream_scheduler import UpstreamScheduler
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+def client_for(server, **policy):
+    policy.setdefault("backoff_base", 0.01)
+    return OpenAIClientFactory(api_key="fake", base_url=server.base_url, retry_policy=RetryPolicy(**policy)).client()
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_transient_errors_are_retried(fake_api, status):
+    server = fake_api(error_status=status, fail_first=2)
+    response = client_for(server, max_attempts=3).chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert response.choices[0].message.content
+    assert server.stats["requests"] == 3
+
+
+def test_retries_stop_after_max_attempts(fake_api):
+    server = fake_api(error_status=429, error_rate=1.0)
+    with pytest.raises(openai.RateLimitError):
+        client_for(server, max_attempts=3).chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert server.stats["requests"] == 3
+
+
+def test_bad_request_is_not_retried(fake_api):
+    server = fake_api(error_status=400, fail_first=1)
+    with pytest.raises(openai.BadRequestError):
+        client_for(server, max_attempts=3).chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert server.stats["requests"] == 1
+
+
+def test_deadline_covers_every_attempt_and_backoff(fake_api):
+    server = fake_api(error_status=500, error_rate=1.0, base_delay=0.05)
+    client = client_for(server, deadline=0.5, max_attempts=50, backoff_base=0.1, backoff_max=0.2)
+    start = time.monotonic()
+    with pytest.raises((openai.InternalServerError, openai.APITimeoutError)):
+        client.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert time.monotonic() - start < 0.5 + 0.2
+    assert server.stats["requests"] < 50
+
+
+def test_with_options_timeout_becomes_the_deadline(fake_api):
+    server = fake_api(base_delay=0.5)
+    client = client_for(server, deadline=30.0)
+    start = time.monotonic()
+    with pytest.raises(openai.APITimeoutError):
+        client.with_options(timeout=0.2).chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert time.monotonic() - start < 0.45
+
+
+def test_slow_embedding_request_is_hedged(fake_api):
+    server = fake_api(base_delay=0.3)
+    response = client_for(server, hedge_after=0.05).embeddings.create(model="m", input=["warm tent"])
+    assert len(response.data[0].embedding) == 8
+    assert server.stats["requests"] == 2
+
+
+def test_chat_completions_are_not_hedged_by_default(fake_api):
+    server = fake_api(base_delay=0.3)
+    client_for(server, hedge_after=0.05).chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert server.stats["requests"] == 1
+
+
+def test_streamed_calls_are_never_hedged(fake_api):
+    server = fake_api(base_delay=0.3)
+    client = client_for(server, hedge_after=0.05, hedge_resources=("embeddings", "chat"))
+    chunks = list(client.chat.completions.create(model="gpt-4o", messages=MESSAGES, stream=True))
+    assert chunks
+    assert server.stats["requests"] == 1
+    # The same resource is hedged when not streaming
+    client.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+    assert server.stats["requests"] == 3
+
+
+def test_async_client_retries_and_hedges_the_same_way(fake_api):
+    server = fake_api(error_status=429, fail_first=1)
+    factory = OpenAIClientFactory(api_key="fake", base_url=server.base_url,
+                                  retry_policy=RetryPolicy(backoff_base=0.01, hedge_after=0.05))
+
+    async def calls():
+        client = factory.async_client()
+        await client.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+        server.faults.base_delay = 0.3
+        await client.embeddings.create(model="m", input=["warm tent"])
+
+    asyncio.run(calls())
+    # One retried chat call, then an embedding call and its hedge
+    assert server.stats["requests"] == 4
+
+
+def test_scheduler_admits_every_attempt_and_refunds_failed_ones(fake_api):
+    server = fake_api(error_status=429, fail_first=2)
+    scheduler = UpstreamScheduler(requests_per_minute=6000, tokens_per_minute=60000)
+    client = scheduler.bind(client_for(server, max_attempts=3), "interactive")
+    client.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+
+    stats = scheduler.get_stats()
+    assert stats["interactive"]["granted"] == 3
+    # The rate-limited attempts are refunded, only the successful call's usage is charged
+    assert stats["tokens_available"] >= 60000 - 20
+
+
+def test_async_scheduler_admits_every_attempt(fake_api):
+    server = fake_api(error_status=500, fail_first=1)
+    scheduler = UpstreamScheduler(requests_per_minute=6000, tokens_per_minute=60000)
+    factory = OpenAIClientFactory(api_key="fake", base_url=server.base_url, retry_policy=RetryPolicy(backoff_base=0.01))
+    client = scheduler.bind(factory.async_client(), "judge")
+    asyncio.run(client.chat.completions.create(model="gpt-4o", messages=MESSAGES))
+    assert scheduler.get_stats()["judge"]["granted"] == 2
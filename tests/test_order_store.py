@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from store.order_store import OrderStore
+from store.sqlite_order_backend import SqliteOrderBackend
+
+ORDERS = [
+    {"Email": "  Jane.Doe@Example.com ", "OrderNumber": "w001", "Status": "shipped", "TrackingNumber": "TN1"},
+    {"Email": "jane.doe@example.com", "OrderNumber": "#W002", "Status": "processing"},
+    {"Email": "sam@example.com", "OrderNumber": "#W003", "Status": "delivered"},
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(orders):
+        source = tmp_path / "CustomerOrders.json"
+        source.write_text(json.dumps({"orders": orders}))
+        backend = SqliteOrderBackend(tmp_path / "orders.db", source) if request.param == "sqlite" else None
+        store = OrderStore(source, backend=backend)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store._backend.close()
+
+
+def rewrite(store, orders):
+    # A distinct size and mtime so the SQLite backend re-ingests
+    store._orders_file.write_text(json.dumps({"orders": orders}) + " " * 16)
+
+
+def test_lookups_normalize_email_and_order_number(make_store):
+    store = make_store(ORDERS)
+    assert store.get_order_by_email_and_number("JANE.DOE@example.COM", " #w001")["Status"] == "shipped"
+    assert store.get_order_by_email_and_number("jane.doe@example.com", "W002")["Status"] == "processing"
+    assert store.get_order_by_number("w003")["Status"] == "delivered"
+    assert [order["OrderNumber"] for order in store.get_orders_by_email(" Jane.Doe@example.com")] == ["w001", "#W002"]
+    assert store.get_order_by_email_and_number("sam@example.com", "#W001") is None
+
+
+def test_update_reindexes_a_changed_order_number(make_store):
+    store = make_store(ORDERS)
+    updated = store.update_order("sam@example.com", "w003", {"OrderNumber": "W009"})
+    assert updated["OrderNumber"] == "W009"
+    assert store.get_order_by_number("#W003") is None
+    assert store.get_order_by_email_and_number("SAM@example.com", "w009")["Status"] == "delivered"
+
+
+def test_runtime_writes_survive_a_reload(make_store):
+    store = make_store(ORDERS)
+    store.add_order({"Email": "new@example.com", "OrderNumber": "#W100", "Status": "processing"})
+    store.update_order("sam@example.com", "#W003", {"Status": "returned"})
+
+    rewrite(store, ORDERS + [{"Email": "late@example.com", "OrderNumber": "#W200", "Status": "shipped"}])
+    store.reload()
+
+    assert store.get_order_by_email_and_number("new@example.com", "#W100")["Status"] == "processing"
+    assert store.get_order_by_number("#W003")["Status"] == "returned"
+    assert store.get_order_by_number("#W200")["Status"] == "shipped"
+
+
+def test_added_order_the_file_caught_up_with_is_kept_as_the_file_has_it(make_store):
+    store = make_store(ORDERS)
+    store.add_order({"Email": "new@example.com", "OrderNumber": "#W100", "Status": "processing"})
+
+    rewrite(store, ORDERS + [{"Email": "new@example.com", "OrderNumber": "#W100", "Status": "shipped"}])
+    store.reload()
+
+    assert store.get_order_by_number("#W100")["Status"] == "shipped"
+    assert len(store.get_orders_by_email("new@example.com")) == 1
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from store.order_stream import iter_json_records
+
+RECORDS = [
+    {"OrderNumber": "#W001", "Total": 123456789, "Price": -12.5e-3, "Paid": True, "Notes": None},
+    {"OrderNumber": "#W002", "Email": "Ünïcode@example.com", "Notes": "Quote \" and \\ and ☃"},
+    {"OrderNumber": "#W003", "ProductsOrdered": ["SOBP001", "SOGS002"], "Nested": {"a": [1, {"b": 2}]}},
+    1234567890123,
+    [],
+]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 18))
+def test_values_straddling_the_buffer_boundary_decode_intact(tmp_path, chunk_size):
+    # Every chunk size up to a record's length puts a boundary inside numbers, strings and escapes
+    source = tmp_path / "orders.json"
+    source.write_text(json.dumps({"skipped": {"x": [1, 2]}, "orders": RECORDS, "trailing": 7}, ensure_ascii=False),
+                      encoding="utf-8")
+    assert list(iter_json_records(source, "orders", chunk_size=chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_top_level_array_and_whitespace(tmp_path, chunk_size):
+    source = tmp_path / "orders.json"
+    source.write_text("  [\n  10 ,\n 20.25 , \"x\"  ]\n")
+    assert list(iter_json_records(source, "orders", chunk_size=chunk_size)) == [10, 20.25, "x"]
+
+
+def test_missing_key_yields_nothing(tmp_path):
+    source = tmp_path / "orders.json"
+    source.write_text('{"products": [1, 2]}')
+    assert list(iter_json_records(source, "orders", chunk_size=4)) == []
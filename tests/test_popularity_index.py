@@ -0,0 +1,43 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import store.popularity_index as popularity_index
+from store.popularity_index import PopularityIndex
+
+
+def stores(orders, skus=("A", "B", "C")):
+    product_store = SimpleNamespace(get_all_products=lambda: {sku: {} for sku in skus}, get_inventory=lambda sku: 1)
+    order_store = SimpleNamespace(iter_orders=lambda: iter(orders), add_listener=lambda listener: None)
+    return product_store, order_store
+
+
+def order(number, skus, at=None):
+    placed = {"Email": "a@example.com", "OrderNumber": number, "ProductsOrdered": skus}
+    if at is not None:
+        placed["OrderDate"] = datetime.fromtimestamp(at).isoformat()
+    return placed
+
+
+def test_ranking_survives_a_weight_rescale():
+    # A one-second half-life makes an order 1000s ahead weigh 2 ** 1000, past the rescale threshold
+    index = PopularityIndex(*stores([]), half_life_days=1 / 86400)
+    later = time.time() + 1000
+    index.record_order(order("#W1", ["A"], at=later))
+    index.record_order(order("#W2", ["A"], at=later))
+    index.record_order(order("#W3", ["B"], at=later))
+    assert index.get_top_skus(2) == ["A", "B"]
+    assert index._scores["A"] == 2 * index._scores["B"]
+
+
+def test_undated_orders_keep_their_weight_across_rebuilds(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(popularity_index.time, "time", lambda: now[0])
+    orders = [order("#W1", ["A"]), order("#W2", ["B"], at=now[0] - 1)]
+    index = PopularityIndex(*stores(orders), half_life_days=1 / 86400)
+    scores = dict(index._scores)
+
+    now[0] += 10
+    index.rebuild()
+    assert index._scores == scores
+    assert index.get_top_skus(2) == ["A", "B"]
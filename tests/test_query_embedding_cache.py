@@ -0,0 +1,56 @@
+import numpy as np
+
+from store.query_embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        return [float(len(self.queries)), 1.0]
+
+
+def test_normalize_query_ignores_case_and_whitespace():
+    assert normalize_query("  Warm   Sleeping\tBag ") == "warm sleeping bag"
+
+
+def test_hits_misses_and_normalized_keys():
+    cache = QueryEmbeddingCache("model")
+    embed = CountingEmbedder()
+    first = cache.get_or_compute("Warm  tent", embed)
+    second = cache.get_or_compute("warm tent", embed)
+
+    assert embed.queries == ["warm tent"]
+    np.testing.assert_array_equal(first, second)
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryEmbeddingCache("model", max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_persistent_tier_serves_other_instances_of_the_same_model(tmp_path):
+    path = tmp_path / "queries.sqlite"
+    QueryEmbeddingCache("model", persist_path=path).put("warm tent", [0.5, 0.25])
+
+    cache = QueryEmbeddingCache("model", persist_path=path)
+    np.testing.assert_array_equal(cache.get("Warm Tent"), np.array([0.5, 0.25], dtype=np.float32))
+    # Promoted into memory, so the next read is an in-memory hit
+    cache.get("warm tent")
+    stats = cache.get_stats()
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+    assert QueryEmbeddingCache("other-model", persist_path=path).get("warm tent") is None
@@ -0,0 +1,38 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from tools.recommend_product import RecommendProduct
+from utils.openai_client_factory import OpenAIClientFactory, RetryPolicy
+
+PRODUCTS = {sku: {"SKU": sku, "ProductName": f"Tent {sku}", "Description": "Warm tent", "Tags": ["camping"]}
+            for sku in ("A", "B", "C")}
+
+
+def concurrent_tool(server, **options):
+    factory = OpenAIClientFactory(api_key="fake", base_url=server.base_url, retry_policy=RetryPolicy(backoff_base=0.01))
+    product_store = SimpleNamespace(get_product=PRODUCTS.get)
+    return RecommendProduct(None, product_store, relevance_mode="concurrent", client_factory=factory, **options)
+
+
+def test_concurrent_judgments_are_relevant_when_the_model_says_yes(fake_api):
+    tool = concurrent_tool(fake_api())
+    assert tool.filter_recommendations_with_llm("a warm tent", ["A", "B", "C"]) == ["A", "B", "C"]
+
+
+def test_timed_out_judgments_fall_back_and_free_their_workers(fake_api):
+    server = fake_api(base_delay=2.0)
+    tool = concurrent_tool(server, judge_timeout=0.6, max_judge_workers=1, fallback_policy="exclude")
+    # Another request keeps the only worker busy, so the judgment starts late
+    tool._judge_pool.submit(time.sleep, 0.4)
+
+    start = time.monotonic()
+    assert tool.filter_recommendations_with_llm("a warm tent", ["A", "B"]) == []
+    assert time.monotonic() - start < 0.9
+
+    # The late call only gets what is left of the fan-out deadline and the queued one is never
+    # sent, so the worker is free again soon after the fallback, not a full timeout later
+    freed = threading.Event()
+    tool._judge_pool.submit(freed.set)
+    assert freed.wait(0.3)
+    assert server.stats["requests"] == 1
@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+
+import store.sqlite_order_backend as sqlite_order_backend
+from store.sqlite_order_backend import SqliteOrderBackend
+
+
+def write_orders(path, orders, mtime_ns):
+    path.write_text(json.dumps({"orders": orders}))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_lookups_see_the_old_rows_while_a_reload_is_ingesting(tmp_path, monkeypatch):
+    source = tmp_path / "orders.json"
+    write_orders(source, [{"Email": "a@example.com", "OrderNumber": "#W1", "Status": "old"}], 1_000_000_000)
+    backend = SqliteOrderBackend(tmp_path / "orders.db", source)
+    write_orders(source, [{"Email": "a@example.com", "OrderNumber": "#W1", "Status": "new"}], 2_000_000_000)
+
+    ingesting, release = threading.Event(), threading.Event()
+    iter_json_records = sqlite_order_backend.iter_json_records
+
+    def slow_records(*args, **kwargs):
+        for record in iter_json_records(*args, **kwargs):
+            yield record
+            ingesting.set()
+            release.wait(5)
+
+    monkeypatch.setattr(sqlite_order_backend, "iter_json_records", slow_records)
+    reload = threading.Thread(target=backend.reload, args=(source,))
+    reload.start()
+    try:
+        assert ingesting.wait(5)
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(backend.find_by_email_and_number("a@example.com", "#W1")))
+        reader.start()
+        reader.join(2)
+        # The lookup finishes while the reload is still holding its write transaction open
+        assert not reader.is_alive()
+        assert seen[0]["Status"] == "old"
+        assert backend.find_by_number("#W1")["Status"] == "old"
+    finally:
+        release.set()
+        reload.join(5)
+
+    assert backend.find_by_email_and_number("a@example.com", "#W1")["Status"] == "new"
+    backend.close()
+
+
+def test_runtime_writes_are_visible_to_lookups(tmp_path):
+    backend = SqliteOrderBackend(tmp_path / "orders.db")
+    backend.add_order({"Email": "b@example.com", "OrderNumber": "#W2", "Status": "placed"})
+    backend.update_order("b@example.com", "#W2", {"Status": "shipped"})
+
+    assert backend.find_by_email("b@example.com") == [{"Email": "b@example.com", "OrderNumber": "#W2", "Status": "shipped"}]
+    backend.close()
@@ -0,0 +1,76 @@
+import json
+from types import SimpleNamespace
+
+from agent.llm_chat_session import StreamedAssistantMessage, unpack_assistant_message
+from benchmark.fake_openai_server import ToolCallRule
+from utils.openai_client_factory import OpenAIClientFactory
+
+
+def chunk(content=None, tool_calls=None, usage=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=usage)
+
+
+def fragment(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def assemble(chunks):
+    message = StreamedAssistantMessage()
+    deltas = [message.add_chunk(c) for c in chunks]
+    return message, deltas
+
+
+def test_interleaved_tool_call_fragments_are_assembled_by_index():
+    message, _ = assemble([
+        chunk(tool_calls=[fragment(1, id="call_b", name="recommend_product", arguments="")]),
+        chunk(tool_calls=[fragment(0, id="call_a", name="lookup_order", arguments='{"email": ')]),
+        chunk(tool_calls=[fragment(1, arguments='{"preferences": "tent"}')]),
+        chunk(tool_calls=[fragment(0, arguments='"a@example.com"}')]),
+    ])
+    calls = message.to_message()["tool_calls"]
+    # Ordered by index, not by arrival
+    assert [call["id"] for call in calls] == ["call_a", "call_b"]
+    assert json.loads(calls[0]["function"]["arguments"]) == {"email": "a@example.com"}
+    assert json.loads(calls[1]["function"]["arguments"]) == {"preferences": "tent"}
+
+
+def test_arguments_split_across_many_chunks_are_concatenated():
+    arguments = json.dumps({"email": "a@example.com", "order_number": "#W001"})
+    pieces = [arguments[i:i + 3] for i in range(0, len(arguments), 3)]
+    message, _ = assemble([chunk(tool_calls=[fragment(0, id="call_a", name="lookup_order")])]
+                          + [chunk(tool_calls=[fragment(0, arguments=piece)]) for piece in pieces])
+    unpacked = unpack_assistant_message(message.to_message())
+    assert unpacked["function_calls"] == [{"function_tool": "lookup_order", "tool_call_id": "call_a",
+                                           "function_arguments": {"email": "a@example.com", "order_number": "#W001"}}]
+
+
+def test_content_and_tool_call_in_one_stream():
+    usage = SimpleNamespace(total_tokens=42)
+    message, deltas = assemble([
+        chunk(content="Let me "),
+        chunk(content="check."),
+        chunk(tool_calls=[fragment(0, id="call_a", name="lookup_order", arguments="{}")]),
+        SimpleNamespace(choices=[], usage=usage),
+    ])
+    assert deltas == ["Let me ", "check.", None, None]
+    assert message.usage is usage
+    assembled = message.to_message()
+    assert assembled["content"] == "Let me check."
+    assert assembled["tool_calls"][0]["function"] == {"name": "lookup_order", "arguments": "{}"}
+
+
+def test_streamed_tool_calls_from_the_api_round_trip(fake_api):
+    server = fake_api()
+    server.tool_calls = [ToolCallRule(r"(?P<number>W\d+)", "lookup_order", {"order_number": "#{number}"}),
+                         ToolCallRule(r"tent", "recommend_product", {"preferences": "tent"})]
+    client = OpenAIClientFactory(api_key="fake", base_url=server.base_url).client()
+    tools = [{"type": "function", "function": {"name": name, "parameters": {}}}
+             for name in ("lookup_order", "recommend_product")]
+    message = StreamedAssistantMessage()
+    for c in client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "W42 and a tent"}],
+                                            tools=tools, stream=True):
+        message.add_chunk(c)
+    calls = unpack_assistant_message(message.to_message())["function_calls"]
+    assert [(call["function_tool"], call["function_arguments"]) for call in calls] == [
+        ("lookup_order", {"order_number": "#W42"}), ("recommend_product", {"preferences": "tent"})]
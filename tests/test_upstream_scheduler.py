@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils.upstream_scheduler import UpstreamScheduler
+
+
+def drained_scheduler() -> UpstreamScheduler:
+    """Scheduler whose request budget is used up, so new calls queue."""
+    scheduler = UpstreamScheduler(requests_per_minute=60, tokens_per_minute=100000)
+    for _ in range(60):
+        scheduler.acquire("interactive")
+    return scheduler
+
+
+async def grant_order(scheduler: UpstreamScheduler, calls):
+    """Queue `calls` of (priority, session, label) in order, refill the budget and record the order of grants."""
+    granted = []
+
+    async def call(priority, session, label):
+        await scheduler.acquire_async(priority, session)
+        granted.append(label)
+
+    tasks = []
+    for priority, session, label in calls:
+        tasks.append(asyncio.create_task(call(priority, session, label)))
+        # Let the task enqueue before the next one
+        await asyncio.sleep(0.001)
+    scheduler.set_limits(requests_per_minute=6000, tokens_per_minute=100000)
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+    return granted
+
+
+def test_priority_classes_are_served_in_order():
+    scheduler = drained_scheduler()
+    granted = asyncio.run(grant_order(scheduler, [("background", "a", "background"), ("judge", "b", "judge"),
+                                                  ("interactive", "c", "interactive")]))
+    assert granted == ["interactive", "judge", "background"]
+
+
+def test_sessions_take_turns_within_a_priority():
+    scheduler = drained_scheduler()
+    granted = asyncio.run(grant_order(scheduler, [("interactive", "a", "a1"), ("interactive", "a", "a2"),
+                                                  ("interactive", "a", "a3"), ("interactive", "b", "b1"),
+                                                  ("interactive", "c", "c1")]))
+    assert granted == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_cancelled_waiter_does_not_block_later_calls():
+    scheduler = drained_scheduler()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acquire_async("judge", "judge-session"), timeout=0.1)
+        scheduler.set_limits(requests_per_minute=6000, tokens_per_minute=100000)
+        await asyncio.wait_for(scheduler.acquire_async("background"), timeout=1)
+
+    asyncio.run(scenario())
+    stats = scheduler.get_stats()
+    assert stats["judge"]["queue_depth"] == 0
+    assert stats["background"]["granted"] == 1
+
+
+def test_settle_refunds_unused_tokens_and_charges_overruns():
+    scheduler = UpstreamScheduler(requests_per_minute=6000, tokens_per_minute=60000)
+    granted = scheduler.acquire("interactive", tokens=1000)
+    scheduler.settle(granted, 100)
+    assert scheduler.get_stats()["tokens_available"] >= 59900 - 1
+    granted = scheduler.acquire("interactive", tokens=100)
+    scheduler.settle(granted, 5000)
+    assert scheduler.get_stats()["tokens_available"] < 55000
+
+
+def fake_client(chunks):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: iter(chunks))))
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=None))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def test_streamed_completion_settles_from_its_usage_chunk():
+    scheduler = UpstreamScheduler(requests_per_minute=6000, tokens_per_minute=60000)
+    client = scheduler.bind(fake_client([chunk("Hello"), chunk(usage=SimpleNamespace(total_tokens=30))]), "interactive")
+    stream = client.chat.completions.create(messages=[{"role": "user", "content": "Hi"}], max_tokens=10000, stream=True)
+    # Only the expected reply length is reserved, not max_tokens
+    assert scheduler.get_stats()["tokens_available"] > 59000
+    assert [c.choices[0].delta.content for c in stream if c.choices] == ["Hello"]
+    assert scheduler.get_stats()["tokens_available"] >= 60000 - 30
+
+
+def test_streamed_completion_without_usage_settles_from_streamed_length():
+    scheduler = UpstreamScheduler(requests_per_minute=6000, tokens_per_minute=60000)
+    client = scheduler.bind(fake_client([chunk("x" * 400)]), "interactive")
+    list(client.chat.completions.create(messages=[{"role": "user", "content": "Hi"}], stream=True))
+    available = scheduler.get_stats()["tokens_available"]
+    # About 100 output tokens plus a few prompt tokens were charged
+    assert 60000 - 120 <= available <= 60000 - 100